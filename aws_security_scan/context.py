@@ -0,0 +1,51 @@
+# context.py: One shared AWS session, client cache and caller identity per run
+import threading
+import boto3
+from botocore.config import Config
+
+# botocore's default pool of 10 connections per client is too small when many
+# collector threads share one client
+DEFAULT_MAX_POOL_CONNECTIONS = 32
+
+
+class AwsContext:
+    def __init__(self, profile=None, session=None, max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS):
+        if session is not None:
+            self.session = session
+        elif profile:
+            self.session = boto3.Session(profile_name=profile)
+        else:
+            self.session = boto3.Session()
+        self.max_pool_connections = max_pool_connections
+        # {(service, region): client}; boto3 clients are thread-safe once created
+        self._clients = {}
+        self._identity = None
+        # boto3 sessions are not thread-safe, so client creation is serialized
+        self._lock = threading.Lock()
+
+    @property
+    def region_name(self):
+        return self.session.region_name
+
+    def client(self, service, region_name=None):
+        # Same signature as boto3.Session.client, so the context can stand in for a session
+        region = region_name or self.session.region_name
+        with self._lock:
+            key = (service, region)
+            if key not in self._clients:
+                self._clients[key] = self.session.client(
+                    service, region_name=region, config=Config(max_pool_connections=self.max_pool_connections))
+            return self._clients[key]
+
+    def identity(self):
+        # STS caller identity, fetched once per context
+        if self._identity is None:
+            self._identity = self.client('sts').get_caller_identity()
+        return self._identity
+
+    @property
+    def account_id(self):
+        return self.identity()['Account']
+
+    def get_partition_for_region(self, region):
+        return self.session.get_partition_for_region(region)
@@ -0,0 +1,158 @@
+# delta.py: Incremental rule evaluation over resource fingerprints and finding deltas
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import time
+from datetime import datetime, timezone
+from aws_security_scan.finding import Finding
+from aws_security_scan.rules import CONTEXT_KEYS, DERIVED_TYPES, available, build_derived, derived_types, dispatch, prepare, select_rules
+from aws_security_scan.snapshot import SnapshotEncoder, region_key, decode_json_object
+
+STATE_VERSION = 2
+STATE_FILENAME = 'incremental.state.gz'
+# Fields identifying "the same finding" across runs
+FINDING_KEY_FIELDS = ('rule_id', 'resource_id', 'region', 'finding', 'port_range')
+
+
+def change_key(value):
+    # Cheap content key used to detect changed resources. Pickling runs in C
+    # without the per-object callbacks JSON encoding needs; equal data pickled
+    # differently (e.g. live vs snapshot datetimes) only costs a re-evaluation
+    return hashlib.sha1(pickle.dumps(value, protocol=4)).hexdigest()
+
+
+def finding_key(finding):
+    return tuple(finding.get(field) for field in FINDING_KEY_FIELDS)
+
+
+def state_path(directory, account_id, regions):
+    return os.path.join(directory, str(account_id), region_key(regions), STATE_FILENAME)
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return None
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        state = json.load(f, object_hook=decode_json_object)
+    # An incompatible state just means a full evaluation
+    return state if state.get('version') == STATE_VERSION else None
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(state, f, cls=SnapshotEncoder, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def diff_findings(previous, current):
+    # Split findings into new / unchanged (current run) and resolved (previous run only)
+    previous_keys = {finding_key(f) for f in previous}
+    current_keys = {finding_key(f) for f in current}
+    return {
+        'new': [f for f in current if finding_key(f) not in previous_keys],
+        'unchanged': [f for f in current if finding_key(f) in previous_keys],
+        'resolved': [f for f in previous if finding_key(f) not in current_keys],
+    }
+
+
+def _items(value):
+    # (item, single-item collection) pairs for a resource list or per-key dict
+    if isinstance(value, dict):
+        return [(item, {key: item}) for key, item in value.items()]
+    return [(item, [item]) for item in value]
+
+
+class IncrementalEvaluator:
+    def __init__(self, previous_state=None):
+        previous_state = previous_state or {}
+        # {rule_id: {'key': inputs key, 'items': [[item key, [finding values]]]}} from the previous run
+        self.previous_cache = previous_state.get('rules', {})
+        self.previous_findings = previous_state.get('findings', [])
+        self.cache = {}
+        self.findings = []
+
+    def evaluate(self, resources, enabled=None, disabled=None, stats=None):
+        # Rules run only for resources that were added or changed since the
+        # previous run; findings of unchanged resources are carried forward.
+        # Rules that are not per-resource, or depend on the clock, always run.
+        # Each resource type is keyed once as a whole, and its items only when
+        # it changed, so an unchanged rule input costs one key per type.
+        rules = dispatch(select_rules(enabled, disabled), resources)
+        # Derived inputs are only built if a rule has something to evaluate
+        env = prepare(rules, resources, derive=False)
+        types = available(resources)
+        # {resource type: change key}, and {resource type: [item change keys]}
+        digests = {}
+        item_keys = {}
+
+        def digest(t):
+            if t not in digests:
+                digests[t] = digest(DERIVED_TYPES[t][0]) if t in DERIVED_TYPES else change_key(resources[t])
+            return digests[t]
+
+        def inputs(r):
+            for name in derived_types([r], resources):
+                if name not in env:
+                    env[name] = build_derived(name, resources[DERIVED_TYPES[name][0]])
+            return r.inputs(env)
+
+        findings = []
+        for r in rules:
+            start = time.perf_counter()
+            evaluated = carried = 0
+            if r.shard_by and r.incremental:
+                t = r.shard_by
+                # Secondary inputs (e.g. bucket ACLs for buckets) are keyed as a
+                # whole, together with the rule's own version: results of a
+                # changed rule are never carried forward
+                context = hashlib.sha1('|'.join([r.fingerprint] + [f'{u}={digest(u)}' for u in sorted(r.read_types(types) + [k for k in CONTEXT_KEYS if k in resources])
+                                                                   if u != t]).encode('utf-8')).hexdigest()
+                key = f'{digest(t)}:{context}'
+                previous = self.previous_cache.get(r.rule_id, {})
+                if previous.get('key') == key:
+                    # Nothing the rule reads changed: carry every finding forward
+                    items = previous['items']
+                    carried = len(items)
+                else:
+                    by_key = dict(previous.get('items', ()))
+                    if t not in item_keys:
+                        item_keys[t] = [change_key(single) for _, single in _items(resources[t])]
+                    items = []
+                    rule_inputs = None
+                    for item_key, (_, single) in zip(item_keys[t], _items(resources[t])):
+                        fp = f'{item_key}:{context}'
+                        if fp in by_key:
+                            values = by_key[fp]
+                            carried += 1
+                        else:
+                            rule_inputs = rule_inputs or inputs(r)
+                            values = [f.to_values() for f in r.evaluate(dict(rule_inputs, **{t: single}))]
+                            evaluated += 1
+                        items.append([fp, values])
+                self.cache[r.rule_id] = {'key': key, 'items': items}
+                rule_findings = [Finding.from_values(v) for _, values in items for v in values]
+            else:
+                rule_findings = r.evaluate(inputs(r))
+                evaluated = 1
+            if stats is not None:
+                stats[r.rule_id] = {'seconds': time.perf_counter() - start, 'findings': len(rule_findings),
+                                    'evaluated': evaluated, 'carried': carried}
+            findings.extend(rule_findings)
+        self.findings = findings
+        return findings
+
+    def delta(self):
+        return diff_findings(self.previous_findings, self.findings)
+
+    def state(self, account_id=None):
+        return {
+            'version': STATE_VERSION,
+            'account_id': account_id,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'rules': self.cache,
+            'findings': self.findings,
+        }
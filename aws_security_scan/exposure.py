@@ -0,0 +1,176 @@
+# exposure.py: Internet reachability of EC2 instances, joined from security group rules
+import ipaddress
+import socket
+
+ALL_PORTS = (0, 65535)
+# IpProtocol values as the EC2 API reports them; '-1' means all traffic
+PROTOCOL_NAMES = {'-1': 'all', '6': 'tcp', '17': 'udp'}
+# ICMP rules carry type/code in FromPort/ToPort rather than ports
+PORTLESS_PROTOCOLS = {'icmp', '1', 'icmpv6', '58'}
+# A source range this broad that is not wholly private counts as "the internet"
+BROAD_PREFIX = {4: 8, 6: 32}
+PRIVATE_NETWORKS = ('10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '100.64.0.0/10', '127.0.0.0/8', '169.254.0.0/16',
+                    'fc00::/7', 'fe80::/10', '::1/128')
+# Ports whose exposure is High severity (remote administration, databases, caches)
+SENSITIVE_PORTS = (21, 22, 23, 445, 1433, 2375, 3306, 3389, 5432, 5601, 5900, 6379, 9200, 11211, 27017)
+
+# {cidr string: (version, first address, last address, internet)}; each distinct CIDR is parsed once
+_cidrs = {}
+
+
+def parse_cidr(cidr):
+    parsed = _cidrs.get(cidr)
+    if parsed is None:
+        # inet_pton instead of ipaddress: inventories hold tens of thousands of distinct CIDRs
+        address, _, prefix = cidr.partition('/')
+        version, family, bits = (6, socket.AF_INET6, 128) if ':' in address else (4, socket.AF_INET, 32)
+        try:
+            value = int.from_bytes(socket.inet_pton(family, address), 'big')
+            length = int(prefix) if prefix else bits
+        except (OSError, ValueError):
+            return None
+        if not 0 <= length <= bits:
+            return None
+        host = (1 << (bits - length)) - 1
+        first = value & ~host
+        last = first | host
+        parsed = _cidrs[cidr] = (version, first, last, length <= BROAD_PREFIX[version] and not _is_private(version, first, last))
+    return parsed
+
+
+def _integer_ranges(cidrs):
+    networks = [ipaddress.ip_network(c) for c in cidrs]
+    return [(n.version, int(n.network_address), int(n.broadcast_address)) for n in networks]
+
+
+_PRIVATE_RANGES = _integer_ranges(PRIVATE_NETWORKS)
+
+
+def _is_private(version, first, last):
+    # Wholly inside one private/reserved block
+    return any(v == version and start <= first and last <= end for v, start, end in _PRIVATE_RANGES)
+
+
+def is_internet_cidr(cidr):
+    parsed = parse_cidr(cidr)
+    return parsed is not None and parsed[3]
+
+
+def internet_sources(permission):
+    # IPv4 and IPv6 source ranges of an ingress permission that count as the internet
+    cidrs = [r.get('CidrIp') for r in permission.get('IpRanges', [])] + [r.get('CidrIpv6') for r in permission.get('Ipv6Ranges', [])]
+    return [c for c in cidrs if c and is_internet_cidr(c)]
+
+
+def permission_ports(permission):
+    # (protocol, (from, to)) of an ingress permission, or None for ICMP
+    protocol = str(permission.get('IpProtocol', '-1')).lower()
+    if protocol in PORTLESS_PROTOCOLS:
+        return None
+    protocol = PROTOCOL_NAMES.get(protocol, protocol)
+    start, end = permission.get('FromPort'), permission.get('ToPort')
+    if protocol == 'all' or start is None or end is None or start < 0:
+        return protocol, ALL_PORTS
+    return protocol, (start, end)
+
+
+def merge_intervals(intervals):
+    # Sorted, non-overlapping port intervals; adjacent intervals are joined
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def group_exposure(group):
+    # {protocol: merged port intervals} the group opens to the internet
+    exposure = {}
+    for permission in group.get('IpPermissions', []):
+        ports = permission_ports(permission)
+        if ports is not None and internet_sources(permission):
+            exposure.setdefault(ports[0], []).append(ports[1])
+    return {protocol: merge_intervals(intervals) for protocol, intervals in exposure.items()}
+
+
+def public_interfaces(instance):
+    # [(interface id, public IP, group IDs)] through which the instance is reachable.
+    # Without interface details, the instance's own public IP and groups stand in
+    interfaces = []
+    for eni in instance.get('NetworkInterfaces') or []:
+        public_ip = (eni.get('Association') or {}).get('PublicIp')
+        if public_ip:
+            interfaces.append((eni.get('NetworkInterfaceId'), public_ip, [g['GroupId'] for g in eni.get('Groups', [])]))
+    if not interfaces and instance.get('PublicIpAddress'):
+        interfaces.append((None, instance['PublicIpAddress'], [g['GroupId'] for g in instance.get('SecurityGroups', [])]))
+    return interfaces
+
+
+def format_ports(protocol, interval):
+    start, end = interval
+    ports = 'all' if interval == ALL_PORTS else str(start) if start == end else f'{start}-{end}'
+    if protocol == 'tcp':
+        return ports
+    return 'all' if protocol == 'all' else f'{ports}/{protocol}'
+
+
+def is_sensitive(interval):
+    return any(interval[0] <= port <= interval[1] for port in SENSITIVE_PORTS)
+
+
+class ExposureIndex:
+    # Security group exposure is computed once per group, and public interfaces
+    # are indexed by group ID, so the join costs one step per (interface, group)
+    # attachment plus one per group rule, instead of instances x rules.
+    # Groups can be added in chunks, so a streamed group list is read once
+    def __init__(self, security_groups=()):
+        self.known_groups = set()
+        self.exposed_groups = {}
+        self.add(security_groups)
+
+    def add(self, security_groups):
+        for group in security_groups:
+            self.known_groups.add(group['GroupId'])
+            exposure = group_exposure(group)
+            if exposure:
+                self.exposed_groups[group['GroupId']] = exposure
+
+    def covers(self, instance):
+        # True when every group of every public interface was collected, so
+        # reachability can be decided from security group data
+        return all(set(groups) and self.known_groups.issuperset(groups) for _, _, groups in public_interfaces(instance))
+
+    def instance_exposure(self, reservations):
+        # Yields (reservation, instance, {protocol: merged intervals}, public IPs, exposing group IDs)
+        # for every instance reachable from the internet on at least one port, in input order
+        instances = []
+        # {group ID: [(instance position, public IP)]} over public interfaces only
+        attached = {}
+        for reservation in reservations:
+            for instance in reservation.get('Instances', []):
+                for _, public_ip, group_ids in public_interfaces(instance):
+                    for group_id in group_ids:
+                        attached.setdefault(group_id, []).append((len(instances), public_ip))
+                instances.append((reservation, instance))
+        # {instance position: ({protocol: intervals}, public IPs, group IDs)}
+        exposed = {}
+        for group_id, exposure in self.exposed_groups.items():
+            for position, public_ip in attached.get(group_id, ()):
+                by_protocol, public_ips, groups = exposed.setdefault(position, ({}, [], []))
+                if public_ip not in public_ips:
+                    public_ips.append(public_ip)
+                if group_id not in groups:
+                    groups.append(group_id)
+                for protocol, intervals in exposure.items():
+                    by_protocol.setdefault(protocol, []).extend(intervals)
+        for position in sorted(exposed):
+            by_protocol, public_ips, groups = exposed[position]
+            # All traffic already covers every port of every protocol
+            if 'all' in by_protocol:
+                merged = {'all': [ALL_PORTS]}
+            else:
+                merged = {protocol: merge_intervals(intervals) for protocol, intervals in sorted(by_protocol.items())}
+            yield instances[position] + (merged, public_ips, sorted(groups))
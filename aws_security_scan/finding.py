@@ -0,0 +1,157 @@
+# finding.py: Compact finding records and JSONL/Parquet export
+import json
+import os
+import sys
+from collections.abc import MutableMapping
+
+FIELDS = ('rule_id', 'service', 'resource_id', 'region', 'account_id', 'finding', 'port_range', 'severity',
+          'recommendation', 'cis_control', 'metrics')
+# Low-cardinality text repeated across many findings; interned so each value is stored once
+INTERNED_FIELDS = frozenset(('rule_id', 'service', 'region', 'account_id', 'finding', 'port_range', 'severity',
+                             'recommendation', 'cis_control'))
+
+
+class Finding(MutableMapping):
+    # A security finding with fixed slots instead of a per-instance dict. It still
+    # behaves like the dicts rules used to yield (f['severity'], f.get('region'),
+    # f['account_id'] = ...); unset fields are absent. Extra keys, e.g. metric
+    # values such as a key's age, live in the metrics dict.
+    __slots__ = FIELDS
+
+    def __init__(self, service, resource_id, finding, severity, recommendation=None, cis_control=None, region=None,
+                 account_id=None, port_range=None, rule_id=None, metrics=None):
+        self.service = _intern(service)
+        self.resource_id = resource_id
+        self.finding = _intern(finding)
+        self.severity = _intern(severity)
+        self.recommendation = _intern(recommendation)
+        self.cis_control = _intern(cis_control)
+        self.region = _intern(region)
+        self.account_id = _intern(account_id)
+        self.port_range = _intern(port_range)
+        self.rule_id = _intern(rule_id)
+        self.metrics = metrics or None
+
+    @classmethod
+    def from_dict(cls, data):
+        finding = cls.__new__(cls)
+        for field in FIELDS:
+            setattr(finding, field, None)
+        for key, value in data.items():
+            finding[key] = value
+        return finding
+
+    @classmethod
+    def from_values(cls, values):
+        # Inverse of to_values()
+        finding = cls.__new__(cls)
+        for field, value in zip(FIELDS, values):
+            setattr(finding, field, _intern(value) if field in INTERNED_FIELDS else value)
+        return finding
+
+    def to_values(self):
+        # Field values in FIELDS order; a compact form for persisted state
+        return [getattr(self, field) for field in FIELDS]
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS if getattr(self, field) is not None}
+
+    def __getitem__(self, key):
+        value = getattr(self, key, None) if key in FIELDS else (self.metrics or {}).get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in FIELDS:
+            setattr(self, key, _intern(value) if key in INTERNED_FIELDS else value)
+        else:
+            self.metrics = dict(self.metrics or {}, **{key: value})
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if key in FIELDS:
+            setattr(self, key, None)
+        else:
+            del self.metrics[key]
+
+    def __iter__(self):
+        return (field for field in FIELDS if getattr(self, field) is not None)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"Finding({self.to_dict()!r})"
+
+    def __reduce__(self):
+        # Compact pickling for the rule evaluation process pool
+        return (_from_values, (tuple(getattr(self, field) for field in FIELDS),))
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _from_values(values):
+    finding = Finding.__new__(Finding)
+    for field, value in zip(FIELDS, values):
+        setattr(finding, field, value)
+    return finding
+
+
+def as_finding(value):
+    return value if isinstance(value, Finding) else Finding.from_dict(value)
+
+
+def export_jsonl(findings, path):
+    # One JSON object per line, written as findings are iterated
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for finding in findings:
+            f.write(json.dumps(dict(finding), default=str, separators=(',', ':')))
+            f.write('\n')
+            count += 1
+    return count
+
+
+PARQUET_BATCH_ROWS = 50000
+
+
+def export_parquet(findings, path, batch_rows=PARQUET_BATCH_ROWS):
+    # Streamed in record batches; text fields are dictionary-encoded and metrics
+    # are stored as a JSON string column. Requires the optional pyarrow package
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow: pip install pyarrow")
+    schema = pa.schema([(field, pa.dictionary(pa.int32(), pa.string()) if field in INTERNED_FIELDS else pa.string())
+                        for field in FIELDS])
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for finding in findings:
+            batch.append(finding)
+            if len(batch) == batch_rows:
+                writer.write_batch(_record_batch(pa, schema, batch))
+                count += len(batch)
+                batch = []
+        if batch or not count:
+            writer.write_batch(_record_batch(pa, schema, batch))
+            count += len(batch)
+    return count
+
+
+def _record_batch(pa, schema, findings):
+    columns = []
+    for field in FIELDS:
+        values = [finding.get(field) for finding in findings]
+        if field == 'metrics':
+            values = [json.dumps(v, default=str) if v else None for v in values]
+        column = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+        columns.append(column.dictionary_encode() if field in INTERNED_FIELDS else column)
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
@@ -0,0 +1,252 @@
+# history.py: Local SQLite history of findings and cost aggregates across runs, with trend queries
+import os
+import sqlite3
+from datetime import datetime, timezone
+from aws_security_scan.delta import FINDING_KEY_FIELDS
+
+SCHEMA_VERSION = 1
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+# Columns identifying an issue: the account plus the fields delta.py uses for "the same finding"
+ISSUE_KEY_COLUMNS = ('account_id',) + FINDING_KEY_FIELDS
+# Services collected account-wide (global collectors): their findings are in scope
+# of every run whatever region they are tagged with (e.g. an S3 bucket's home region)
+GLOBAL_SERVICES = ('S3', 'IAM', 'CloudTrail')
+
+# issues: one row per distinct finding ever seen; opened_run/resolved_run describe
+# its current open period (resolved_run is NULL while open).
+# findings: which issues each run saw. remediations: every closed open period.
+# run_summary: per-run counts, so findings-over-time never scans the findings table.
+# costs: monthly cost aggregates reported by each run
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    scanned_at TEXT NOT NULL,
+    source TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_scanned_at ON runs (scanned_at);
+CREATE TABLE IF NOT EXISTS issues (
+    issue_id INTEGER PRIMARY KEY,
+    account_id TEXT NOT NULL,
+    rule_id TEXT NOT NULL,
+    resource_id TEXT NOT NULL,
+    region TEXT NOT NULL,
+    finding TEXT NOT NULL,
+    port_range TEXT NOT NULL,
+    service TEXT,
+    severity TEXT,
+    first_run INTEGER NOT NULL,
+    opened_run INTEGER NOT NULL,
+    resolved_run INTEGER,
+    UNIQUE ({', '.join(ISSUE_KEY_COLUMNS)})
+);
+CREATE INDEX IF NOT EXISTS issues_open ON issues (account_id, resolved_run);
+CREATE INDEX IF NOT EXISTS issues_rule ON issues (rule_id);
+CREATE INDEX IF NOT EXISTS issues_resource ON issues (resource_id);
+CREATE TABLE IF NOT EXISTS findings (
+    run_id INTEGER NOT NULL,
+    issue_id INTEGER NOT NULL,
+    PRIMARY KEY (run_id, issue_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS findings_issue ON findings (issue_id, run_id);
+CREATE TABLE IF NOT EXISTS remediations (
+    issue_id INTEGER NOT NULL,
+    opened_run INTEGER NOT NULL,
+    resolved_run INTEGER NOT NULL,
+    PRIMARY KEY (issue_id, opened_run)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS remediations_resolved ON remediations (resolved_run);
+CREATE TABLE IF NOT EXISTS run_summary (
+    run_id INTEGER NOT NULL,
+    account_id TEXT NOT NULL,
+    severity TEXT NOT NULL,
+    open INTEGER NOT NULL,
+    new INTEGER NOT NULL,
+    resolved INTEGER NOT NULL,
+    PRIMARY KEY (run_id, account_id, severity)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS costs (
+    account_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    service TEXT NOT NULL,
+    region TEXT NOT NULL,
+    cost REAL NOT NULL,
+    PRIMARY KEY (account_id, month, run_id, service, region)
+) WITHOUT ROWID;
+'''
+
+
+def format_time(value):
+    value = value or datetime.now(timezone.utc)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime(TIMESTAMP_FORMAT)
+
+
+def issue_key(finding, account_id):
+    # Missing region/port range are stored as '' so they take part in the unique key
+    values = [finding.get('account_id') or account_id] + [finding.get(field) for field in FINDING_KEY_FIELDS]
+    return tuple('' if v is None else str(v) for v in values)
+
+
+class HistoryStore:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        version = self.conn.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            self.conn.close()
+            raise RuntimeError(f"{path} has history schema version {version}; expected {SCHEMA_VERSION}")
+        self.conn.executescript(SCHEMA)
+        self.conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record_run(self, findings=None, account_ids=(), scanned_at=None, rules=None, regions=None, costs=None, source='scan'):
+        # Appends one run in a single transaction. findings=None records costs only.
+        # An open issue of a scanned account that the run did not report is resolved,
+        # unless its rule (rules) or region (regions) was outside the run's scope;
+        # None means everything was in scope. regions may also map each account to
+        # the regions scanned in it. costs: [(account, month, service, region, cost)]
+        with self.conn:
+            cur = self.conn.cursor()
+            cur.execute('INSERT INTO runs (scanned_at, source) VALUES (?, ?)', (format_time(scanned_at), source))
+            run_id = cur.lastrowid
+            if findings is not None:
+                self._record_findings(cur, run_id, findings, [str(a) for a in account_ids], rules, regions)
+            if costs:
+                cur.executemany('INSERT OR REPLACE INTO costs (account_id, month, run_id, service, region, cost) VALUES (?, ?, ?, ?, ?, ?)',
+                                [(str(a), m, run_id, s, r, float(c)) for a, m, s, r, c in costs])
+        return run_id
+
+    def _record_findings(self, cur, run_id, findings, account_ids, rules, regions):
+        default_account = account_ids[0] if len(account_ids) == 1 else ''
+        current = {}
+        for f in findings:
+            current.setdefault(issue_key(f, default_account), f)
+        accounts = sorted(set(account_ids) | {key[0] for key in current})
+        # Every issue ever seen in these accounts: {key: (issue_id, severity, resolved_run)}
+        known = {}
+        # Issues of global services: {key}
+        global_issues = set()
+        for account_id in accounts:
+            for row in cur.execute(f"SELECT {', '.join(ISSUE_KEY_COLUMNS)}, service, issue_id, severity, resolved_run FROM issues "
+                                   "WHERE account_id = ?", (account_id,)):
+                known[row[:-4]] = row[-3:]
+                if row[-4] in GLOBAL_SERVICES:
+                    global_issues.add(row[:-4])
+        counts = {}
+
+        def count(account_id, severity, field):
+            stat = counts.setdefault((account_id, severity or ''), {'open': 0, 'new': 0, 'resolved': 0})
+            stat[field] += 1
+
+        seen, reopened, severity_changes = [], [], []
+        for key, f in current.items():
+            severity = f.get('severity')
+            count(key[0], severity, 'open')
+            if key not in known:
+                cur.execute(f"INSERT INTO issues ({', '.join(ISSUE_KEY_COLUMNS)}, service, severity, first_run, opened_run) "
+                            f"VALUES ({', '.join('?' * len(ISSUE_KEY_COLUMNS))}, ?, ?, ?, ?)", key + (f.get('service'), severity, run_id, run_id))
+                seen.append((run_id, cur.lastrowid))
+                count(key[0], severity, 'new')
+                continue
+            issue_id, previous_severity, resolved_run = known[key]
+            seen.append((run_id, issue_id))
+            if resolved_run is not None:
+                # Reported again after being resolved: a new open period starts
+                reopened.append((run_id, issue_id))
+                count(key[0], severity, 'new')
+            if severity != previous_severity:
+                severity_changes.append((severity, issue_id))
+        cur.executemany('INSERT OR IGNORE INTO findings (run_id, issue_id) VALUES (?, ?)', seen)
+        cur.executemany('UPDATE issues SET opened_run = ?, resolved_run = NULL WHERE issue_id = ?', reopened)
+        cur.executemany('UPDATE issues SET severity = ? WHERE issue_id = ?', severity_changes)
+        rules = set(rules) if rules is not None else None
+        if isinstance(regions, dict):
+            scanned = {str(a): set(r) for a, r in regions.items()}
+        else:
+            scanned = dict.fromkeys(account_ids, set(regions)) if regions is not None else None
+        resolved = []
+        for key, (issue_id, severity, resolved_run) in known.items():
+            if resolved_run is not None or key in current or key[0] not in account_ids:
+                continue
+            # Global findings ('' region, or a global service) are in scope of every run
+            regional = key[3] and key not in global_issues
+            if (rules is not None and key[1] not in rules) or (scanned is not None and regional and key[3] not in scanned.get(key[0], ())):
+                continue
+            resolved.append(issue_id)
+            count(key[0], severity, 'resolved')
+        if resolved:
+            cur.executemany('INSERT OR REPLACE INTO remediations (issue_id, opened_run, resolved_run) '
+                            'SELECT issue_id, opened_run, ? FROM issues WHERE issue_id = ?', [(run_id, i) for i in resolved])
+            cur.executemany('UPDATE issues SET resolved_run = ? WHERE issue_id = ?', [(run_id, i) for i in resolved])
+        # A scanned account with nothing to report still gets a (zero) row for this run
+        for account_id in account_ids:
+            if not any(a == account_id for a, _ in counts):
+                counts[(account_id, '')] = {'open': 0, 'new': 0, 'resolved': 0}
+        cur.executemany('INSERT INTO run_summary (run_id, account_id, severity, open, new, resolved) VALUES (?, ?, ?, ?, ?, ?)',
+                        [(run_id, a, s, c['open'], c['new'], c['resolved']) for (a, s), c in sorted(counts.items())])
+
+    def open_findings_over_time(self, account_id=None, since=None):
+        # [{'run_id', 'scanned_at', 'severity', 'open', 'new', 'resolved'}] per run and severity,
+        # summed over accounts unless account_id is given. open counts the findings the run reported
+        where, params = self._filters(account_id=account_id, since=since)
+        rows = self.conn.execute(
+            'SELECT r.run_id, r.scanned_at, s.severity, SUM(s.open), SUM(s.new), SUM(s.resolved) '
+            f'FROM run_summary s JOIN runs r ON r.run_id = s.run_id {where} '
+            'GROUP BY r.run_id, s.severity ORDER BY r.run_id, s.severity', params)
+        return [dict(zip(('run_id', 'scanned_at', 'severity', 'open', 'new', 'resolved'), row)) for row in rows]
+
+    def time_to_remediate(self, account_id=None, since=None):
+        # Per rule and severity: remediated open periods and their mean/max length in days
+        where, params = self._filters(account_id=account_id, since=since, table='i', time_column='resolved.scanned_at')
+        rows = self.conn.execute(
+            'SELECT i.rule_id, i.severity, COUNT(*), '
+            'AVG(julianday(resolved.scanned_at) - julianday(opened.scanned_at)), '
+            'MAX(julianday(resolved.scanned_at) - julianday(opened.scanned_at)) '
+            'FROM remediations m JOIN issues i ON i.issue_id = m.issue_id '
+            'JOIN runs opened ON opened.run_id = m.opened_run JOIN runs resolved ON resolved.run_id = m.resolved_run '
+            f'{where} GROUP BY i.rule_id, i.severity ORDER BY 4 DESC', params)
+        return [dict(zip(('rule_id', 'severity', 'remediated', 'mean_days', 'max_days'), row)) for row in rows]
+
+    def open_issues(self, account_id=None):
+        # Currently open issues, oldest first, with the time they were first reported in this open period
+        where, params = self._filters(account_id=account_id, table='i')
+        where = f"{where} {'AND' if where else 'WHERE'} i.resolved_run IS NULL"
+        rows = self.conn.execute(
+            f"SELECT {', '.join('i.' + c for c in ISSUE_KEY_COLUMNS)}, i.severity, r.scanned_at "
+            f'FROM issues i JOIN runs r ON r.run_id = i.opened_run {where} ORDER BY i.opened_run, i.issue_id', params)
+        return [dict(zip(ISSUE_KEY_COLUMNS + ('severity', 'open_since'), row)) for row in rows]
+
+    def cost_trend(self, account_id=None, service=None):
+        # [{'month', 'service', 'cost'}]: each account's month comes from the latest run that reported it,
+        # so a partial month is superseded once later runs see more of it
+        where, params = self._filters(account_id=account_id, table='c')
+        if service is not None:
+            where = f"{where} {'AND' if where else 'WHERE'} c.service = ?"
+            params.append(service)
+        rows = self.conn.execute(
+            'SELECT c.month, c.service, SUM(c.cost) FROM costs c '
+            'JOIN (SELECT account_id, month, MAX(run_id) AS run_id FROM costs GROUP BY account_id, month) latest '
+            'ON latest.account_id = c.account_id AND latest.month = c.month AND latest.run_id = c.run_id '
+            f'{where} GROUP BY c.month, c.service ORDER BY c.month, c.service', params)
+        return [dict(zip(('month', 'service', 'cost'), row)) for row in rows]
+
+    def _filters(self, account_id=None, since=None, table='s', time_column='r.scanned_at'):
+        clauses, params = [], []
+        if account_id is not None:
+            clauses.append(f'{table}.account_id = ?')
+            params.append(str(account_id))
+        if since is not None:
+            clauses.append(f'{time_column} >= ?')
+            params.append(format_time(since))
+        return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
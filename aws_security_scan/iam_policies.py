@@ -0,0 +1,161 @@
+# iam_policies.py: Role policy collection and cached least-privilege analysis of policy documents
+import fnmatch
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from urllib.parse import unquote
+from botocore.exceptions import ClientError
+
+# Actions that are dangerous when granted on every resource: privilege escalation,
+# credential and secret access, and destructive operations
+SENSITIVE_ACTIONS = (
+    'iam:PassRole', 'iam:CreateAccessKey', 'iam:CreateLoginProfile', 'iam:UpdateLoginProfile', 'iam:AttachRolePolicy',
+    'iam:AttachUserPolicy', 'iam:PutRolePolicy', 'iam:PutUserPolicy', 'iam:CreatePolicyVersion', 'iam:UpdateAssumeRolePolicy',
+    'sts:AssumeRole', 'kms:Decrypt', 'secretsmanager:GetSecretValue', 'ssm:GetParameter', 'ssm:GetParameters',
+    's3:GetObject', 's3:PutObject', 's3:DeleteObject', 's3:PutBucketPolicy', 's3:DeleteBucket',
+    'dynamodb:DeleteTable', 'ec2:TerminateInstances', 'rds:DeleteDBInstance', 'lambda:UpdateFunctionCode',
+    'lambda:CreateFunction', 'cloudtrail:StopLogging', 'cloudtrail:DeleteTrail',
+)
+
+
+def role_name(role_arn):
+    # arn:aws:iam::123456789012:role/service-role/name -> name
+    return role_arn.rsplit('/', 1)[-1]
+
+
+def decode_document(document):
+    # boto3 decodes policy documents; raw API responses carry URL-encoded JSON
+    if isinstance(document, str):
+        return json.loads(unquote(document))
+    return document
+
+
+def _error_code(error):
+    return error.response['Error'].get('Code', str(error))
+
+
+def fetch_role(iam, role_arn):
+    # Attached managed policy ARNs and inline policy documents of one role
+    name = role_name(role_arn)
+    try:
+        attached = [p['PolicyArn'] for page in iam.get_paginator('list_attached_role_policies').paginate(RoleName=name)
+                    for p in page['AttachedPolicies']]
+        inline = {}
+        for page in iam.get_paginator('list_role_policies').paginate(RoleName=name):
+            for policy_name in page['PolicyNames']:
+                inline[policy_name] = decode_document(iam.get_role_policy(RoleName=name, PolicyName=policy_name)['PolicyDocument'])
+    except ClientError as e:
+        return {'Error': _error_code(e)}
+    return {'AttachedPolicies': attached, 'InlinePolicies': inline}
+
+
+def fetch_managed_policy(iam, policy_arn):
+    # Default version of a managed policy
+    try:
+        version = iam.get_policy(PolicyArn=policy_arn)['Policy']['DefaultVersionId']
+        document = iam.get_policy_version(PolicyArn=policy_arn, VersionId=version)['PolicyVersion']['Document']
+    except ClientError as e:
+        return {'Error': _error_code(e)}
+    return {'VersionId': version, 'Document': decode_document(document)}
+
+
+def collect_role_policies(iam, role_arns, max_workers=8):
+    # Roles are fetched once each, then every managed policy once, however many
+    # roles attach it. Thousands of functions sharing a few roles cost a few calls
+    role_arns = sorted(set(role_arns))
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        roles = dict(zip(role_arns, pool.map(lambda arn: fetch_role(iam, arn), role_arns)))
+        policy_arns = sorted({arn for role in roles.values() for arn in role.get('AttachedPolicies', [])})
+        managed = dict(zip(policy_arns, pool.map(lambda arn: fetch_managed_policy(iam, arn), policy_arns)))
+    return {'iam_role_policies': roles, 'iam_managed_policies': managed}
+
+
+@lru_cache(maxsize=4096)
+def compile_actions(patterns):
+    # One case-insensitive regex for a statement's action patterns ('s3:Get*', 'iam:*', '*')
+    return re.compile('|'.join(fnmatch.translate(p) for p in patterns), re.IGNORECASE)
+
+
+def _as_tuple(value):
+    if value is None:
+        return ()
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+def analyze_document(document):
+    # Allow statements only (explicit denies are not subtracted). Returns what the
+    # document grants: full admin, wildcard action patterns, and sensitive actions
+    # allowed on every resource
+    admin, wildcards, sensitive = False, set(), set()
+    statements = document.get('Statement', []) if isinstance(document, dict) else []
+    for statement in [statements] if isinstance(statements, dict) else statements:
+        if statement.get('Effect') != 'Allow':
+            continue
+        all_resources = 'NotResource' in statement or '*' in _as_tuple(statement.get('Resource'))
+        if 'NotAction' in statement:
+            # Everything except the listed actions
+            excluded = compile_actions(_as_tuple(statement['NotAction']))
+            wildcards.add('NotAction')
+            granted = [a for a in SENSITIVE_ACTIONS if not excluded.fullmatch(a)]
+        else:
+            patterns = _as_tuple(statement.get('Action'))
+            if not patterns:
+                continue
+            if all_resources and any(p in ('*', '*:*') for p in patterns):
+                admin = True
+            wildcards.update(p for p in patterns if p == '*' or p.endswith(':*'))
+            matcher = compile_actions(patterns)
+            granted = [a for a in SENSITIVE_ACTIONS if matcher.fullmatch(a)]
+        if all_resources:
+            sensitive.update(granted)
+    return {'admin': admin, 'wildcard_actions': wildcards, 'sensitive_actions': sensitive}
+
+
+# Analyses are cached for the life of the process: managed policies by (ARN, version),
+# which never change, and inline documents by their content
+_analyses = {}
+
+
+def cached_analysis(key, document):
+    analysis = _analyses.get(key)
+    if analysis is None:
+        analysis = _analyses[key] = analyze_document(document)
+    return analysis
+
+
+class RoleAnalyzer:
+    # Combined grants of each role, computed once per role
+    def __init__(self, role_policies, managed_policies):
+        self.role_policies = role_policies
+        self.managed_policies = managed_policies
+        self._roles = {}
+
+    def role(self, role_arn):
+        if role_arn not in self._roles:
+            self._roles[role_arn] = self._analyze(role_arn)
+        return self._roles[role_arn]
+
+    def _analyze(self, role_arn):
+        role = self.role_policies.get(role_arn)
+        if role is None:
+            return None
+        if role.get('Error'):
+            return {'error': role['Error']}
+        combined = {'admin': False, 'wildcard_actions': {}, 'sensitive_actions': {}, 'unanalyzed': []}
+        documents = []
+        for policy_arn in role.get('AttachedPolicies', []):
+            policy = self.managed_policies.get(policy_arn) or {}
+            if 'Document' not in policy:
+                combined['unanalyzed'].append(policy_arn)
+                continue
+            documents.append((policy_arn, (policy_arn, policy['VersionId']), policy['Document']))
+        for name, document in sorted(role.get('InlinePolicies', {}).items()):
+            documents.append((name, json.dumps(document, sort_keys=True), document))
+        for source, key, document in documents:
+            analysis = cached_analysis(key, document)
+            combined['admin'] = combined['admin'] or analysis['admin']
+            for field in ('wildcard_actions', 'sensitive_actions'):
+                for action in analysis[field]:
+                    combined[field].setdefault(action, []).append(source)
+        return combined
@@ -0,0 +1,149 @@
+# instrumentation.py: Per-API call statistics from botocore events and wall/CPU time per run phase
+import html
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from aws_security_scan.throttle import THROTTLE_CODES
+
+# Upper bounds (milliseconds) of the call latency histogram buckets; slower calls fall in the last bucket
+LATENCY_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+HISTOGRAM_LABELS = tuple(f'<={b}ms' for b in LATENCY_BUCKETS_MS) + (f'>{LATENCY_BUCKETS_MS[-1]}ms',)
+# Key under which a call's start time rides along in botocore's per-request context
+START_KEY = 'instrumentation_start'
+
+
+class ApiProfiler:
+    def __init__(self, clock=time.perf_counter, cpu_clock=time.process_time):
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        # {(service, operation): counters}; service is botocore's hyphenized service ID
+        self.apis = {}
+        # {phase: {'seconds', 'cpu_seconds'}} in the order phases finished
+        self.phases = {}
+        # Phases still running: {phase: (wall start, cpu start)}
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def install(self, session):
+        # Hook a boto3 session's event system; covers every client created from it afterwards.
+        # before-call/after-call bracket a whole API call (all retries included);
+        # response-received fires once per attempt
+        events = session.events
+        events.register('before-call', self.before_call, unique_id='api-profiler-before-call')
+        events.register('response-received', self.response_received, unique_id='api-profiler-response-received')
+        events.register('after-call', self.after_call, unique_id='api-profiler-after-call')
+        events.register('after-call-error', self.after_call_error, unique_id='api-profiler-after-call-error')
+        return self
+
+    def _stat(self, event_name):
+        _, service, operation = event_name.split('.', 2)
+        key = (service, operation)
+        stat = self.apis.get(key)
+        if stat is None:
+            stat = self.apis[key] = {'calls': 0, 'errors': 0, 'attempts': 0, 'retries': 0, 'throttles': 0, 'bytes': 0,
+                                     'seconds': 0.0, 'max_seconds': 0.0, 'histogram': [0] * len(HISTOGRAM_LABELS)}
+        return stat
+
+    def before_call(self, event_name, context=None, **kwargs):
+        if context is not None:
+            context[START_KEY] = self.clock()
+
+    def response_received(self, event_name, response_dict=None, parsed_response=None, exception=None, context=None, **kwargs):
+        size, throttled = 0, False
+        if response_dict is not None:
+            body = response_dict.get('body')
+            # Streaming bodies have not been read yet; their size comes from the headers
+            size = len(body) if isinstance(body, (bytes, bytearray)) else int(response_dict.get('headers', {}).get('content-length') or 0)
+            throttled = response_dict.get('status_code') == 429
+        if parsed_response:
+            throttled = throttled or parsed_response.get('Error', {}).get('Code') in THROTTLE_CODES
+        with self._lock:
+            stat = self._stat(event_name)
+            stat['attempts'] += 1
+            stat['bytes'] += size
+            stat['throttles'] += throttled
+
+    def after_call(self, event_name, http_response=None, parsed=None, context=None, **kwargs):
+        failed = http_response is not None and http_response.status_code >= 300
+        retries = (parsed or {}).get('ResponseMetadata', {}).get('RetryAttempts', 0)
+        self._finish(event_name, context, failed, retries)
+
+    def after_call_error(self, event_name, context=None, **kwargs):
+        self._finish(event_name, context, True, 0)
+
+    def _finish(self, event_name, context, failed, retries):
+        start = (context or {}).pop(START_KEY, None)
+        seconds = self.clock() - start if start is not None else 0.0
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS_MS) if seconds * 1000 <= bound), len(LATENCY_BUCKETS_MS))
+        with self._lock:
+            stat = self._stat(event_name)
+            stat['calls'] += 1
+            stat['errors'] += failed
+            stat['retries'] += retries or 0
+            stat['seconds'] += seconds
+            stat['max_seconds'] = max(stat['max_seconds'], seconds)
+            stat['histogram'][bucket] += 1
+
+    @contextmanager
+    def phase(self, name):
+        # Wall and process CPU time (all threads) of one pipeline phase; a phase
+        # entered again (e.g. once per account) accumulates
+        wall, cpu = self.clock(), self.cpu_clock()
+        with self._lock:
+            self._open[name] = (wall, cpu)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._open.pop(name, None)
+                stat = self.phases.setdefault(name, {'seconds': 0.0, 'cpu_seconds': 0.0})
+                stat['seconds'] += self.clock() - wall
+                stat['cpu_seconds'] += self.cpu_clock() - cpu
+
+    def profile(self):
+        # JSON-ready snapshot; APIs are ordered by total time spent in them.
+        # Phases still running are included with their elapsed time so far
+        with self._lock:
+            phases = [dict(name=name, running=False, **stat) for name, stat in self.phases.items()]
+            now, cpu_now = self.clock(), self.cpu_clock()
+            phases.extend({'name': name, 'running': True, 'seconds': now - wall, 'cpu_seconds': cpu_now - cpu}
+                          for name, (wall, cpu) in self._open.items())
+            apis = []
+            for (service, operation), stat in self.apis.items():
+                row = dict(stat, service=service, operation=operation, histogram=dict(zip(HISTOGRAM_LABELS, stat['histogram'])))
+                row['mean_ms'] = stat['seconds'] * 1000 / stat['calls'] if stat['calls'] else 0.0
+                apis.append(row)
+        apis.sort(key=lambda row: -row['seconds'])
+        totals = {field: sum(row[field] for row in apis) for field in ('calls', 'errors', 'attempts', 'retries', 'throttles', 'bytes', 'seconds')}
+        return {'phases': phases, 'apis': apis, 'totals': totals}
+
+    def write_profile(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.profile(), f, indent=1)
+
+    def diagnostics_html(self):
+        # Report tab fragment: phase times, then the API calls that took longest
+        profile = self.profile()
+        rows = []
+        for p in profile['phases']:
+            name = html.escape(p['name']) + (' (still running)' if p['running'] else '')
+            rows.append(f"<tr><td>{name}</td><td>{p['seconds']:.2f}</td><td>{p['cpu_seconds']:.2f}</td></tr>")
+        parts = ['<h2>Scan Diagnostics</h2>', '<h3>Phases</h3>',
+                 '<table border="1"><tr><th>Phase</th><th>Wall (s)</th><th>CPU (s)</th></tr>', *rows, '</table>']
+        totals = profile['totals']
+        parts.append(f"<h3>AWS API calls</h3><p>{totals['calls']} calls, {totals['retries']} retries, {totals['throttles']} throttled "
+                     f"attempts, {totals['bytes'] / 1e6:.1f} MB received, {totals['seconds']:.1f}s spent in calls (summed across threads).</p>")
+        if profile['apis']:
+            header = ''.join(f'<th>{html.escape(label)}</th>' for label in HISTOGRAM_LABELS)
+            parts.append('<table border="1"><tr><th>Service</th><th>Operation</th><th>Calls</th><th>Errors</th><th>Retries</th>'
+                         f'<th>Throttles</th><th>KB</th><th>Total (s)</th><th>Mean (ms)</th><th>Max (ms)</th>{header}</tr>')
+            for a in profile['apis']:
+                histogram = ''.join(f'<td>{n}</td>' for n in a['histogram'].values())
+                parts.append(f"<tr><td>{html.escape(a['service'])}</td><td>{html.escape(a['operation'])}</td><td>{a['calls']}</td>"
+                             f"<td>{a['errors']}</td><td>{a['retries']}</td><td>{a['throttles']}</td><td>{a['bytes'] / 1024:.1f}</td>"
+                             f"<td>{a['seconds']:.2f}</td><td>{a['mean_ms']:.1f}</td><td>{a['max_seconds'] * 1000:.1f}</td>{histogram}</tr>")
+            parts.append('</table>')
+        return ''.join(parts)
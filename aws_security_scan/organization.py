@@ -0,0 +1,88 @@
+# organization.py: Scans many AWS accounts in parallel by assuming a role in each
+import time
+from concurrent.futures import ThreadPoolExecutor
+import boto3
+from aws_security_scan.context import AwsContext
+from aws_security_scan.scanner import Scanner
+
+DEFAULT_ROLE_NAME = 'OrganizationAccountAccessRole'
+
+
+def list_member_accounts(session):
+    # Active accounts of the AWS Organization the session belongs to
+    org = session.client('organizations')
+    accounts = []
+    for page in org.get_paginator('list_accounts').paginate():
+        accounts.extend(a['Id'] for a in page['Accounts'] if a.get('Status') == 'ACTIVE')
+    return accounts
+
+
+def assume_role_session(session, account_id, role_name, region=None):
+    sts = session.client('sts')
+    partition = session.get_partition_for_region(region or session.region_name or 'us-east-1')
+    credentials = sts.assume_role(
+        RoleArn=f"arn:{partition}:iam::{account_id}:role/{role_name}",
+        RoleSessionName='aws-compliance-scan',
+    )['Credentials']
+    return boto3.Session(
+        aws_access_key_id=credentials['AccessKeyId'],
+        aws_secret_access_key=credentials['SecretAccessKey'],
+        aws_session_token=credentials['SessionToken'],
+        region_name=region or session.region_name,
+    )
+
+
+class OrganizationScanner:
+    def __init__(self, context, account_ids, role_name=DEFAULT_ROLE_NAME, max_accounts=4, scanner_kwargs=None,
+                 session_factory=assume_role_session, configure_session=None):
+        # The caller's AwsContext (a plain boto3 session is wrapped in one)
+        self.context = context if isinstance(context, AwsContext) else AwsContext(session=context)
+        self.session = self.context.session
+        self.account_ids = list(account_ids)
+        self.role_name = role_name
+        self.max_accounts = max_accounts
+        self.scanner_kwargs = scanner_kwargs or {}
+        # Injectable for tests; (session, account_id, role_name) -> session
+        self.session_factory = session_factory
+        # Optional hook applied to each assumed-role session (e.g. installing a CallScheduler)
+        self.configure_session = configure_session
+        # Per-account outcome: findings count, seconds, regions scanned and error (None on success)
+        self.results = {}
+
+    def run_all_checks(self, **run_kwargs):
+        # Scan every account on a thread pool so boto3/pandas are loaded once.
+        # A failing account is recorded in self.results and does not abort the run.
+        caller_account = self.context.account_id
+        with ThreadPoolExecutor(max_workers=max(1, self.max_accounts)) as pool:
+            futures = [pool.submit(self._scan_account, account_id, caller_account, run_kwargs) for account_id in self.account_ids]
+            per_account = [future.result() for future in futures]
+        findings = []
+        for account_id, account_findings in zip(self.account_ids, per_account):
+            findings.extend(account_findings)
+        return findings
+
+    def failed_accounts(self):
+        return {a: r['error'] for a, r in self.results.items() if r['error']}
+
+    def _scan_account(self, account_id, caller_account, run_kwargs):
+        start = time.perf_counter()
+        try:
+            # The caller's own account is scanned with its existing credentials
+            if account_id == caller_account:
+                context = self.context
+            else:
+                session = self.session_factory(self.session, account_id, self.role_name)
+                if self.configure_session:
+                    self.configure_session(session)
+                context = AwsContext(session=session, max_pool_connections=self.context.max_pool_connections)
+            scanner = Scanner(context=context, account_id=account_id, **self.scanner_kwargs)
+            findings, _ = scanner.run_all_checks(**run_kwargs)
+            for f in findings:
+                f['account_id'] = account_id
+            self.results[account_id] = {'findings': len(findings), 'seconds': time.perf_counter() - start,
+                                        'regions': scanner.last_regions, 'error': None}
+            return findings
+        except Exception as e:
+            self.results[account_id] = {'findings': 0, 'seconds': time.perf_counter() - start, 'regions': [],
+                                        'error': f"{type(e).__name__}: {e}"}
+            return []
@@ -1,32 +1,17 @@
-import boto3
 from botocore.exceptions import ClientError, NoCredentialsError, EndpointConnectionError
+from aws_security_scan.throttle import is_throttle_error
 
-def check_permissions(session):
-    # Check Security Scan permissions (EC2, S3, IAM, etc.)
-    try:
-        ec2 = session.client('ec2')
-        ec2.describe_instances(MaxResults=5)
-    except (ClientError, NoCredentialsError, EndpointConnectionError) as e:
-        print("[ERROR] Missing required EC2 permissions or credentials for security scan.")
-        print(f"Details: {e}")
-        return False
-    try:
-        s3 = session.client('s3')
-        s3.list_buckets()
-    except (ClientError, NoCredentialsError, EndpointConnectionError) as e:
-        print("[ERROR] Missing required S3 permissions or credentials for security scan.")
-        print(f"Details: {e}")
-        return False
-    try:
-        iam = session.client('iam')
-        iam.list_users(MaxItems=1)
-    except (ClientError, NoCredentialsError, EndpointConnectionError) as e:
-        print("[ERROR] Missing required IAM permissions or credentials for security scan.")
-        print(f"Details: {e}")
+def check_permissions(context, security=True, cost=True):
+    # Check Security Scan permissions (EC2, S3, IAM, etc.) and/or Cost Explorer
+    # access. Clients come from the run's AwsContext (or any boto3 session), so
+    # the scan reuses them afterwards
+    if security and not _check_security_permissions(context):
         return False
+    if not cost:
+        return True
     # Check Cost Explorer permissions
     try:
-        ce = session.client('ce')
+        ce = context.client('ce')
         ce.get_cost_and_usage(
             TimePeriod={'Start': '2023-01-01', 'End': '2023-01-02'},
             Granularity='DAILY',
@@ -34,6 +19,9 @@ def check_permissions(session):
         )
     except (ClientError, NoCredentialsError, EndpointConnectionError) as e:
         msg = str(e)
+        if is_throttle_error(e):
+            print("[WARNING] Cost Explorer permission check was throttled; continuing.")
+            return True
         if 'historical data beyond' in msg or 'You haven\'t enabled historical data' in msg:
             print("[WARNING] Cost Explorer is enabled, but historical data is not available. Cost report will be limited.")
             return True
@@ -41,3 +29,37 @@ def check_permissions(session):
         print(f"Details: {e}")
         return False
     return True
+
+def _check_security_permissions(context):
+    try:
+        ec2 = context.client('ec2')
+        ec2.describe_instances(MaxResults=5)
+    except (ClientError, NoCredentialsError, EndpointConnectionError) as e:
+        # Throttling is not a missing permission; the scan retries throttled calls itself
+        if is_throttle_error(e):
+            print("[WARNING] EC2 permission check was throttled; continuing.")
+        else:
+            print("[ERROR] Missing required EC2 permissions or credentials for security scan.")
+            print(f"Details: {e}")
+            return False
+    try:
+        s3 = context.client('s3')
+        s3.list_buckets()
+    except (ClientError, NoCredentialsError, EndpointConnectionError) as e:
+        if is_throttle_error(e):
+            print("[WARNING] S3 permission check was throttled; continuing.")
+        else:
+            print("[ERROR] Missing required S3 permissions or credentials for security scan.")
+            print(f"Details: {e}")
+            return False
+    try:
+        iam = context.client('iam')
+        iam.list_users(MaxItems=1)
+    except (ClientError, NoCredentialsError, EndpointConnectionError) as e:
+        if is_throttle_error(e):
+            print("[WARNING] IAM permission check was throttled; continuing.")
+        else:
+            print("[ERROR] Missing required IAM permissions or credentials for security scan.")
+            print(f"Details: {e}")
+            return False
+    return True
@@ -1,79 +1,179 @@
 # report.py: Generates HTML report using Jinja2 and Plotly
+import html
 import pandas as pd
 import jinja2
 import plotly.graph_objs as go
+import json
 import os
+from collections import Counter
 from datetime import datetime
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+# Findings are embedded as JSON pages and rendered in the browser one page at a time
+FINDINGS_PAGE_SIZE = 500
+FINDING_COLUMNS = ('account_id', 'service', 'resource_id', 'region', 'finding', 'port_range', 'severity', 'recommendation', 'cis_control')
+
+def json_for_script(value):
+    # JSON that is safe inside a <script> element
+    return json.dumps(value, separators=(',', ':'), default=str).replace('<', '\\u003c')
+
+def write_chunks(chunks, output_path):
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+# How Plotly's JavaScript reaches the page: a CDN <script> tag, the bundled
+# minified library inlined once (renders offline), or nothing when the
+# enclosing page already loads it
+PLOTLY_JS_MODES = ('cdn', 'embed', 'none')
+SEVERITIES = ('High', 'Medium', 'Low')
+
+def plotly_script(mode):
+    if mode == 'cdn':
+        return f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js" charset="utf-8"></script>'
+    if mode == 'embed':
+        return f'<script type="text/javascript">{get_plotlyjs()}</script>'
+    return ''
+
+def write_combined_report(output_path, tabs, title='AWS Security & Cost Report', plotly_js='cdn'):
+    # tabs: [{'id', 'title', 'chunks'}]; each tab's chunks (e.g. ReportGenerator.iter_html())
+    # are streamed into the file as the page is rendered. The page loads Plotly
+    # once for all tabs, so tab content should be rendered with plotly_js='none'
+    env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=os.path.dirname(__file__)))
+    template = env.get_template('combined_template.html')
+    write_chunks(template.generate(title=title, tabs=tabs, plotly_script=plotly_script(plotly_js)), output_path)
 
 class ReportGenerator:
-    def generate_html_string(self):
-        df = pd.DataFrame(self.findings)
-        summary = self._generate_summary(df)
-        charts = self._generate_charts(df)
-        template = self._get_template()
-        html = template.render(
-            summary=summary,
-            findings=df.to_dict(orient='records'),
-            charts=charts,
-            account_id=self.account_id,
-            timestamp=datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
-        )
-        return html
-    def __init__(self, findings, account_id):
+    def __init__(self, findings, account_id, delta=None, account_errors=None, page_size=FINDINGS_PAGE_SIZE, plotly_js='cdn'):
         self.findings = findings
         self.account_id = account_id
+        # Accounts that could not be scanned in an organization run: {account_id: error}
+        self.account_errors = account_errors or {}
+        # Optional {'new', 'unchanged', 'resolved'} finding lists from an incremental scan
+        self.delta = delta
+        self.page_size = page_size
+        if plotly_js not in PLOTLY_JS_MODES:
+            raise ValueError(f"plotly_js must be one of {', '.join(PLOTLY_JS_MODES)}")
+        self.plotly_js = plotly_js
 
     def generate(self, output_path):
-        df = pd.DataFrame(self.findings)
-        summary = self._generate_summary(df)
-        charts = self._generate_charts(df)
+        # Rendered chunks go straight to the file; the page is never held as one string
+        write_chunks(self.iter_html(), output_path)
+
+    def generate_html_string(self):
+        return ''.join(self.iter_html())
+
+    def iter_html(self):
+        aggregates = self._aggregate()
         template = self._get_template()
-        html = template.render(
-            summary=summary,
-            findings=df.to_dict(orient='records'),
-            charts=charts,
+        return template.generate(
+            summary=self._generate_summary(aggregates),
+            finding_pages=self._finding_pages(),
+            charts=self._generate_charts(aggregates),
+            plotly_script=plotly_script(self.plotly_js),
             account_id=self.account_id,
-            timestamp=datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
+            timestamp=datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC'),
+            delta=self.delta,
+            account_errors=self.account_errors
         )
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(html)
 
-    def _generate_summary(self, df):
+    def _finding_pages(self):
+        # One JSON array of rows per page, built lazily while the template renders;
+        # the last column flags findings that are new since the previous scan
+        new_ids = {id(f) for f in self.delta['new']} if self.delta is not None else set()
+        for start in range(0, len(self.findings), self.page_size):
+            rows = []
+            for f in self.findings[start:start + self.page_size]:
+                row = [f.get(column) for column in FINDING_COLUMNS]
+                row[3] = row[3] if isinstance(row[3], str) else '-'
+                row[5] = '-' if row[5] is None else row[5]
+                row[8] = row[8] or ''
+                rows.append(row + [id(f) in new_ids])
+            yield json_for_script(rows)
+
+    def _aggregate(self):
+        # Single pass over the findings: counts per (account, service, severity).
+        # Every summary table and chart series is derived from this small frame
+        counts = Counter((f.get('account_id'), f.get('service'), f.get('severity')) for f in self.findings)
+        return pd.DataFrame([(a, s, sev, n) for (a, s, sev), n in counts.items()],
+                            columns=['account_id', 'service', 'severity', 'count'])
+
+    def _generate_summary(self, aggregates):
+        by_severity = aggregates.groupby('severity')['count'].sum()
         summary = {
-            'total': len(df),
-            'high': (df['severity'] == 'High').sum() if 'severity' in df else 0,
-            'medium': (df['severity'] == 'Medium').sum() if 'severity' in df else 0,
-            'low': (df['severity'] == 'Low').sum() if 'severity' in df else 0,
+            'total': int(aggregates['count'].sum()),
+            'high': int(by_severity.get('High', 0)),
+            'medium': int(by_severity.get('Medium', 0)),
+            'low': int(by_severity.get('Low', 0)),
         }
         # Per-service severity breakdown
-        if 'service' in df and 'severity' in df:
-            service_table = (
-                df.groupby(['service', 'severity']).size()
-                .unstack(fill_value=0)
-                .reset_index()
-                .to_dict(orient='records')
-            )
-            summary['service_table'] = service_table
+        summary['service_table'] = self._severity_table(aggregates, 'service').reset_index().to_dict(orient='records')
+        # Per-account rollup for multi-account (organization) scans
+        if aggregates['account_id'].notna().any():
+            account_table = self._severity_table(aggregates, 'account_id')
+            account_table['total'] = account_table.sum(axis=1)
+            summary['account_table'] = account_table.reset_index().to_dict(orient='records')
         else:
-            summary['service_table'] = []
+            summary['account_table'] = []
         return summary
 
-    def _generate_charts(self, df):
+    def _severity_table(self, aggregates, key):
+        # key x severity counts; rows without the key are left out
+        rows = aggregates.dropna(subset=[key, 'severity'])
+        return rows.pivot_table(index=key, columns='severity', values='count', aggfunc='sum', fill_value=0)
+
+    def _generate_charts(self, aggregates):
         # Pie chart: compliant vs non-compliant
-        severity_counts = df['severity'].value_counts() if 'severity' in df else {}
-        pie = go.Figure(data=[go.Pie(labels=severity_counts.index, values=severity_counts.values)])
-        pie_html = pie.to_html(full_html=False, include_plotlyjs='cdn')
+        by_severity = aggregates.groupby('severity')['count'].sum()
+        pie = go.Figure(data=[go.Pie(labels=list(by_severity.index), values=list(by_severity.values))])
+        # Plotly is loaded once by the page (see plotly_script), never per chart
+        pie_html = pie.to_html(full_html=False, include_plotlyjs=False)
         # Bar chart: risk levels by service
         bar = go.Figure()
-        if 'service' in df and 'severity' in df:
-            bar_data = df.groupby(['service', 'severity']).size().unstack(fill_value=0)
-            for sev in ['High', 'Medium', 'Low']:
-                if sev in bar_data:
-                    bar.add_bar(name=sev, x=bar_data.index, y=bar_data[sev])
+        bar_data = self._severity_table(aggregates, 'service')
+        for sev in SEVERITIES:
+            if sev in bar_data:
+                bar.add_bar(name=sev, x=list(bar_data.index), y=list(bar_data[sev]))
         bar_html = bar.to_html(full_html=False, include_plotlyjs=False)
         return {'pie': pie_html, 'bar': bar_html}
 
     def _get_template(self):
         env = jinja2.Environment(loader=jinja2.FileSystemLoader(searchpath=os.path.dirname(__file__)))
         return env.get_template('report_template.html')
+
+def history_html(open_over_time, remediation, cost_trend):
+    # Report tab fragment from HistoryStore queries: open findings per run, cost per
+    # month and service, and time to remediate per rule
+    parts = ['<h2>Findings &amp; Cost History</h2>']
+    if open_over_time:
+        runs = sorted({(r['run_id'], r['scanned_at']) for r in open_over_time})
+        by_severity = {(r['run_id'], r['severity']): r['open'] for r in open_over_time}
+        trend = go.Figure()
+        for sev in SEVERITIES:
+            trend.add_scatter(name=sev, mode='lines+markers', x=[at for _, at in runs], y=[by_severity.get((run, sev), 0) for run, _ in runs])
+        parts += [f'<h3>Open Findings ({len(runs)} runs)</h3>', trend.to_html(full_html=False, include_plotlyjs=False)]
+    else:
+        parts.append('<p>No findings history recorded yet.</p>')
+    if cost_trend:
+        months = sorted({r['month'] for r in cost_trend})
+        services = {}
+        for r in cost_trend:
+            services.setdefault(r['service'], {})[r['month']] = r['cost']
+        cost = go.Figure()
+        for service, values in sorted(services.items(), key=lambda item: -sum(item[1].values())):
+            cost.add_bar(name=service, x=months, y=[values.get(m, 0.0) for m in months])
+        cost.update_layout(barmode='stack')
+        parts += ['<h3>Monthly Cost by Service</h3>', cost.to_html(full_html=False, include_plotlyjs=False)]
+    parts.append('<h3>Time to Remediate</h3>')
+    if remediation:
+        parts.append('<table border="1"><tr><th>Rule</th><th>Severity</th><th>Remediated</th><th>Mean (days)</th><th>Max (days)</th></tr>')
+        for r in remediation:
+            parts.append(f"<tr><td>{html.escape(r['rule_id'])}</td><td>{html.escape(r['severity'] or '')}</td><td>{r['remediated']}</td>"
+                         f"<td>{r['mean_days']:.1f}</td><td>{r['max_days']:.1f}</td></tr>")
+        parts.append('</table>')
+    else:
+        parts.append('<p>No findings have been remediated yet.</p>')
+    return ''.join(parts)
@@ -1,21 +1,285 @@
 # rules.py: Maps findings to AWS best practices and CIS Benchmarks
+import datetime
+import hashlib
+import time
+import types
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from aws_security_scan.exposure import ExposureIndex, format_ports, internet_sources, is_sensitive
+from aws_security_scan.finding import Finding, as_finding
+from aws_security_scan.iam_policies import RoleAnalyzer
 
-def evaluate_all_rules(resources):
+# Resource keys that describe the scan rather than resources; passed to every rule
+CONTEXT_KEYS = ('regions',)
+# Inputs derived once per evaluation from a collected resource type, so rules
+# share them instead of each re-reading the source: {name: (source type, factory)}.
+# The factory's object is the input; its add(items) consumes the source in chunks
+DERIVED_TYPES = {
+    'exposure_index': ('security_groups', ExposureIndex),
+}
+# Default number of resources per shard in parallel evaluation (and per chunk
+# of a streamed resource list)
+DEFAULT_CHUNK_SIZE = 5000
+
+# Registered rules by ID, in registration (and therefore evaluation) order
+RULES = {}
+
+def code_key(code):
+    # Content key of a function's code: bytecode, names and constants (nested
+    # functions included), but not line numbers, so editing other code in the
+    # module does not change it
+    parts = [code.co_code.hex(), repr(code.co_names), repr(code.co_varnames)]
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            parts.append(code_key(const))
+        elif isinstance(const, frozenset):
+            parts.append(repr(sorted(const, key=repr)))
+        else:
+            parts.append(repr(const))
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+class Rule:
+    def __init__(self, rule_id, resource_types, fn, group, shard=True, incremental=True, optional=(), version=1):
+        self.rule_id = rule_id
+        # Resource types (keys of the resources dict) the rule reads; the rule
+        # is only dispatched when all of them were collected
+        self.resource_types = tuple(resource_types)
+        # Resource types the rule also reads when they were collected
+        self.optional = tuple(optional)
+        self.fn = fn
+        self.group = group
+        # The first resource type can be split into chunks evaluated
+        # independently, unless the rule reasons about the collection as a
+        # whole (e.g. "no trails at all")
+        self.shard_by = self.resource_types[0] if shard else None
+        # Whether a resource's findings can be carried forward while the
+        # resource is unchanged (False for rules that depend on the clock)
+        self.incremental = incremental
+        # Identifies the rule's logic, so results carried forward from an older
+        # version are discarded. Edits to the rule function change it; bump
+        # version when behaviour changes in a helper the rule calls
+        self.fingerprint = f'{version}:{code_key(fn.__code__)}'
+
+    def inputs(self, resources):
+        # The slice of resources this rule reads
+        subset = {t: resources[t] for t in self.resource_types}
+        subset.update({t: resources[t] for t in self.optional if t in resources})
+        subset.update({k: resources[k] for k in CONTEXT_KEYS if k in resources})
+        return subset
+
+    def evaluate(self, resources):
+        findings = []
+        for finding in self.fn(resources):
+            # Rules may still yield plain dicts; they are stored as Finding records
+            finding = as_finding(finding)
+            finding['rule_id'] = self.rule_id
+            findings.append(finding)
+        return findings
+
+    def read_types(self, resources):
+        # Every collected resource type the rule reads
+        return [t for t in self.resource_types + self.optional if t in resources]
+
+def rule(rule_id, resource_types, group, shard=True, incremental=True, optional=(), version=1):
+    # Decorator registering a generator function that yields findings
+    def register(fn):
+        if rule_id in RULES:
+            raise ValueError(f"Duplicate rule ID: {rule_id}")
+        RULES[rule_id] = Rule(rule_id, resource_types, fn, group, shard=shard, incremental=incremental, optional=optional, version=version)
+        return fn
+    return register
+
+def select_rules(enabled=None, disabled=None):
+    # enabled/disabled are iterables of rule IDs or group names
+    known = set(RULES) | {r.group for r in RULES.values()}
+    unknown = sorted((set(enabled or ()) | set(disabled or ())) - known)
+    if unknown:
+        raise ValueError(f"Unknown rule IDs or groups: {', '.join(unknown)}")
+    selected = []
+    for r in RULES.values():
+        if enabled and r.rule_id not in enabled and r.group not in enabled:
+            continue
+        if disabled and (r.rule_id in disabled or r.group in disabled):
+            continue
+        selected.append(r)
+    return selected
+
+def available(resources):
+    # Resource types rules can read: the collected ones and those derived from them
+    return set(resources) | {name for name, (source, _) in DERIVED_TYPES.items() if source in resources}
+
+def dispatch(rules, resources):
+    # Keep only the selected rules whose inputs were collected
+    types = available(resources)
+    return [r for r in rules if all(t in types for t in r.resource_types)]
+
+def is_stream(value):
+    # A one-shot resource iterator (Scanner streaming mode)
+    return isinstance(value, Iterator)
+
+def derived_types(rules, resources):
+    types = available(resources)
+    return [t for t in DERIVED_TYPES if any(t in r.read_types(types) for r in rules)]
+
+def build_derived(name, source):
+    value = DERIVED_TYPES[name][1]()
+    value.add(source)
+    return value
+
+def prepare(rules, resources, derive=True):
+    # Materializes every streamed list the rules read (directly or through a
+    # derived input) and returns the rules' view of the resources, including
+    # the derived inputs built for this evaluation unless derive is False
+    names = derived_types(rules, resources)
+    for t in {t for r in rules for t in r.read_types(resources)} | {DERIVED_TYPES[n][0] for n in names}:
+        if is_stream(resources[t]):
+            resources[t] = list(resources[t])
+    env = dict(resources)
+    for name in names if derive else ():
+        env[name] = build_derived(name, resources[DERIVED_TYPES[name][0]])
+    return env
+
+def stream_chunks(value, size):
+    # Consume a streamed resource list in lists of up to size items
+    chunk = []
+    for item in value:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def evaluate_all_rules(resources, enabled=None, disabled=None, stats=None, workers=1, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Resource lists may be one-shot generators (Scanner streaming mode). If
+    # stats is a dict it receives per-rule evaluation time and finding count.
+    # With workers > 1, large resource collections are sharded across a
+    # process pool; findings are identical to (and in the same order as) the
+    # serial path.
+    rules = dispatch(select_rules(enabled, disabled), resources)
+    if workers > 1:
+        return _evaluate_parallel(rules, prepare(rules, resources), stats, workers, chunk_size)
+    return _evaluate_serial(rules, resources, stats, chunk_size)
+
+def _evaluate_serial(rules, resources, stats, chunk_size):
+    # Each streamed list is read once: when every rule reading it shards by it,
+    # those rules (and any input derived from it) consume the same chunks, so
+    # memory stays bounded. Otherwise a list read by several rules is materialized.
+    env = dict(resources)
+    names = derived_types(rules, resources)
+    for name in names:
+        source = DERIVED_TYPES[name][0]
+        if not is_stream(resources[source]):
+            env[name] = build_derived(name, resources[source])
+    results = {r.rule_id: [] for r in rules}
+    seconds = dict.fromkeys(results, 0.0)
+
+    def run(r, inputs):
+        start = time.perf_counter()
+        results[r.rule_id].extend(r.evaluate(inputs))
+        seconds[r.rule_id] += time.perf_counter() - start
+
+    pending = list(rules)
+    # Sources of derived inputs first, so the rules reading those inputs can share later passes
+    sources = [DERIVED_TYPES[n][0] for n in names if n not in env]
+    streamed = dict.fromkeys(sources + [t for t in resources if is_stream(resources[t])])
+    for t in streamed:
+        readers = [r for r in pending if t in r.read_types(env)]
+        builders = {n: DERIVED_TYPES[n][1]() for n in names if n not in env and DERIVED_TYPES[n][0] == t}
+        shared = all(r.shard_by == t and all(u == t or (u in env and not is_stream(env[u])) for u in r.read_types(available(env)))
+                     for r in readers)
+        if shared and (builders or len(readers) > 1):
+            for chunk in stream_chunks(env[t], chunk_size):
+                for builder in builders.values():
+                    builder.add(chunk)
+                for r in readers:
+                    run(r, dict(r.inputs(env), **{t: chunk}))
+            env.update(builders)
+            pending = [r for r in pending if r not in readers]
+        elif builders or len(readers) > 1:
+            resources[t] = env[t] = list(env[t])
+            for name, builder in builders.items():
+                builder.add(env[t])
+                env[name] = builder
+    for r in pending:
+        run(r, r.inputs(env))
     findings = []
-    # EC2 public IP check
+    for r in rules:
+        if stats is not None:
+            stats[r.rule_id] = {'seconds': seconds[r.rule_id], 'findings': len(results[r.rule_id])}
+        findings.extend(results[r.rule_id])
+    return findings
+
+def chunks(value, size):
+    # Split a resource list, or a per-key resource dict, into shards
+    if isinstance(value, dict):
+        items = list(value.items())
+        for i in range(0, len(items), size):
+            yield dict(items[i:i + size])
+    else:
+        for i in range(0, len(value), size):
+            yield value[i:i + size]
+
+def evaluate_shard(rule_id, resources):
+    # Process pool entry point; the registry is rebuilt by importing this module
+    start = time.perf_counter()
+    findings = RULES[rule_id].evaluate(resources)
+    return findings, time.perf_counter() - start
+
+def _evaluate_parallel(rules, resources, stats, workers, chunk_size):
+    # resources is the prepared view: materialized lists plus derived inputs
+    pool = None
+    # (rule, [future or (findings, seconds)]) in rule order; shard order within a rule
+    parts = []
+    try:
+        for r in rules:
+            inputs = r.inputs(resources)
+            if r.shard_by and len(inputs[r.shard_by]) > chunk_size:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                parts.append((r, [pool.submit(evaluate_shard, r.rule_id, dict(inputs, **{r.shard_by: shard}))
+                                  for shard in chunks(inputs[r.shard_by], chunk_size)]))
+            else:
+                # Small inputs are cheaper to evaluate here than to pickle
+                parts.append((r, [evaluate_shard(r.rule_id, inputs)]))
+        findings = []
+        for r, results in parts:
+            results = [p.result() if isinstance(p, Future) else p for p in results]
+            rule_findings = [f for shard_findings, _ in results for f in shard_findings]
+            if stats is not None:
+                stats[r.rule_id] = {'seconds': sum(seconds for _, seconds in results), 'findings': len(rule_findings)}
+            findings.extend(rule_findings)
+        return findings
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+def arn_region(arn):
+    # arn:partition:service:region:account:resource -> region (None for plain names)
+    parts = arn.split(':')
+    return (parts[3] or None) if len(parts) > 5 and parts[0] == 'arn' else None
+
+# EC2 public IP check: a fallback for instances whose security groups were not
+# collected; otherwise ec2-internet-exposure reports the ports actually reachable
+@rule('ec2-public-ip', ('ec2_instances',), group='ec2', optional=('exposure_index',))
+def check_ec2_public_ip(resources):
+    index = resources.get('exposure_index')
     for reservation in resources.get('ec2_instances', []):
         for instance in reservation.get('Instances', []):
-            if instance.get('PublicIpAddress'):
-                findings.append({
-                    'service': 'EC2',
-                    'resource_id': instance['InstanceId'],
-                    'finding': 'EC2 instance has a public IP address.',
-                    'severity': 'Medium',
-                    'recommendation': 'Remove public IP or restrict access with security groups.',
-                    'cis_control': 'CIS 4.1'
-                })
-
-    # Security Groups open to 0.0.0.0/0
+            if instance.get('PublicIpAddress') and (index is None or not index.covers(instance)):
+                yield Finding(
+                    service='EC2',
+                    resource_id=instance['InstanceId'],
+                    region=reservation.get('Region'),
+                    finding='EC2 instance has a public IP address.',
+                    severity='Medium',
+                    recommendation='Remove public IP or restrict access with security groups.',
+                    cis_control='CIS 4.1'
+                )
+
+# Security Groups open to the internet: 0.0.0.0/0, ::/0 or another broad public range
+@rule('sg-open-ingress', ('security_groups',), group='ec2')
+def check_security_group_ingress(resources):
     for sg in resources.get('security_groups', []):
         for perm in sg.get('IpPermissions', []):
             port_range = None
@@ -24,127 +288,208 @@ def evaluate_all_rules(resources):
                     port_range = str(perm['FromPort'])
                 else:
                     port_range = f"{perm['FromPort']}-{perm['ToPort']}"
-            for ip_range in perm.get('IpRanges', []):
-                if ip_range.get('CidrIp') == '0.0.0.0/0':
-                    findings.append({
-                        'service': 'SecurityGroup',
-                        'resource_id': sg['GroupId'],
-                        'finding': 'Security group open to 0.0.0.0/0.',
-                        'port_range': port_range,
-                        'severity': 'High',
-                        'recommendation': 'Restrict security group ingress rules.',
-                        'cis_control': 'CIS 4.1'
-                    })
-
-    # S3 public buckets
+            for cidr in internet_sources(perm):
+                yield Finding(
+                    service='SecurityGroup',
+                    resource_id=sg['GroupId'],
+                    region=sg.get('Region'),
+                    finding=f'Security group open to {cidr}.',
+                    port_range=port_range,
+                    severity='High',
+                    recommendation='Restrict security group ingress rules.',
+                    cis_control='CIS 4.1'
+                )
+
+# EC2 instances reachable from the internet: public interfaces joined with the
+# ports their security groups open to internet sources
+@rule('ec2-internet-exposure', ('ec2_instances', 'exposure_index'), group='ec2')
+def check_ec2_internet_exposure(resources):
+    index = resources['exposure_index']
+    for reservation, instance, by_protocol, public_ips, groups in index.instance_exposure(resources.get('ec2_instances', [])):
+        for protocol, intervals in by_protocol.items():
+            for interval in intervals:
+                ports = format_ports(protocol, interval)
+                yield Finding(
+                    service='EC2',
+                    resource_id=instance['InstanceId'],
+                    region=reservation.get('Region'),
+                    finding='EC2 instance is reachable from the internet.',
+                    port_range=ports,
+                    severity='High' if is_sensitive(interval) else 'Medium',
+                    recommendation=f'Restrict internet ingress to port {ports} in the security groups, or remove the public IP.',
+                    cis_control='CIS 4.1',
+                    metrics={'public_ips': public_ips, 'security_groups': groups}
+                )
+
+# S3 public buckets
+@rule('s3-public-acl', ('s3_buckets', 's3_bucket_acls'), group='s3')
+def check_s3_public_acl(resources):
     for bucket in resources.get('s3_buckets', []):
         acl = resources.get('s3_bucket_acls', {}).get(bucket['Name'], {})
         grants = acl.get('Grants', [])
         for grant in grants:
             grantee = grant.get('Grantee', {})
             if grantee.get('Type') == 'Group' and 'AllUsers' in grantee.get('URI', ''):
-                findings.append({
-                    'service': 'S3',
-                    'resource_id': bucket['Name'],
-                    'finding': 'S3 bucket is public.',
-                    'severity': 'High',
-                    'recommendation': 'Enable bucket policies or block public access.',
-                    'cis_control': 'CIS 2.1.1'
-                })
-
-    # IAM users without MFA
+                yield Finding(
+                    service='S3',
+                    resource_id=bucket['Name'],
+                    region=bucket.get('Region'),
+                    finding='S3 bucket is public.',
+                    severity='High',
+                    recommendation='Enable bucket policies or block public access.',
+                    cis_control='CIS 2.1.1'
+                )
+
+# IAM users without MFA
+@rule('iam-user-mfa', ('iam_users', 'iam_mfa'), group='iam')
+def check_iam_user_mfa(resources):
     for user in resources.get('iam_users', []):
-        mfa_devices = resources.get('iam_mfa', {}).get(user['UserName'], {}).get('MFADevices', [])
-        if not mfa_devices:
-            findings.append({
-                'service': 'IAM',
-                'resource_id': user['UserName'],
-                'finding': 'User has no MFA enabled.',
-                'severity': 'Medium',
-                'recommendation': 'Enable MFA for all IAM users.',
-                'cis_control': 'CIS 1.14'
-            })
-
-    # IAM unused access keys (older than 90 days)
-    import datetime
+        mfa = resources.get('iam_mfa', {}).get(user['UserName'], {})
+        if not mfa.get('MFAActive', bool(mfa.get('MFADevices'))):
+            yield Finding(
+                service='IAM',
+                resource_id=user['UserName'],
+                finding='User has no MFA enabled.',
+                severity='Medium',
+                recommendation='Enable MFA for all IAM users.',
+                cis_control='CIS 1.14'
+            )
+
+# IAM unused access keys (not used, or never used and created, over 90 days ago)
+@rule('iam-stale-access-key', ('iam_access_keys',), group='iam', incremental=False)
+def check_iam_stale_access_keys(resources):
     for user, keys in resources.get('iam_access_keys', {}).items():
         for key in keys:
-            if 'CreateDate' in key:
-                age = (datetime.datetime.utcnow() - key['CreateDate'].replace(tzinfo=None)).days
+            last_used = key.get('LastUsedDate') or key.get('CreateDate')
+            if last_used:
+                age = (datetime.datetime.utcnow() - last_used.replace(tzinfo=None)).days
                 if age > 90:
-                    findings.append({
-                        'service': 'IAM',
-                        'resource_id': f"{user}:{key['AccessKeyId']}",
-                        'finding': 'Access key unused for over 90 days.',
-                        'severity': 'Low',
-                        'recommendation': 'Rotate or remove unused access keys.',
-                        'cis_control': 'CIS 1.3'
-                    })
-
-    # RDS unencrypted instances
+                    yield Finding(
+                        service='IAM',
+                        resource_id=f"{user}:{key['AccessKeyId']}",
+                        finding='Access key unused for over 90 days.',
+                        severity='Low',
+                        recommendation='Rotate or remove unused access keys.',
+                        cis_control='CIS 1.3',
+                        metrics={'days_unused': age}
+                    )
+
+# RDS unencrypted instances
+@rule('rds-encryption', ('rds_instances',), group='rds')
+def check_rds_encryption(resources):
     for db in resources.get('rds_instances', []):
         if not db.get('StorageEncrypted', False):
-            findings.append({
-                'service': 'RDS',
-                'resource_id': db['DBInstanceIdentifier'],
-                'finding': 'RDS instance is not encrypted.',
-                'severity': 'Low',
-                'recommendation': 'Enable encryption for RDS instances.',
-                'cis_control': 'CIS 2.2.1'
-            })
-
-    # Lambda functions without least privilege (role check placeholder)
+            yield Finding(
+                service='RDS',
+                resource_id=db['DBInstanceIdentifier'],
+                region=db.get('Region'),
+                finding='RDS instance is not encrypted.',
+                severity='Low',
+                recommendation='Enable encryption for RDS instances.',
+                cis_control='CIS 2.2.1'
+            )
+
+# Lambda execution roles: full admin access, wildcard actions and sensitive actions on every resource
+@rule('lambda-least-privilege', ('lambda_functions', 'iam_role_policies', 'iam_managed_policies'), group='lambda')
+def check_lambda_least_privilege(resources):
+    # Each role is analyzed once; policy documents are analyzed once per ARN and version
+    analyzer = RoleAnalyzer(resources['iam_role_policies'], resources['iam_managed_policies'])
     for fn in resources.get('lambda_functions', []):
-        # Placeholder: In real use, fetch and analyze role policy
-        findings.append({
-            'service': 'Lambda',
-            'resource_id': fn['FunctionName'],
-            'finding': 'Review Lambda function role for least privilege.',
-            'severity': 'Low',
-            'recommendation': 'Ensure Lambda function role follows least privilege.',
-            'cis_control': 'CIS 1.18'
-        })
-
-    # CloudTrail logging
+        grants = analyzer.role(fn['Role']) if fn.get('Role') else None
+        if grants is None:
+            continue
+        base = dict(service='Lambda', resource_id=fn['FunctionName'], region=fn.get('Region'))
+        if grants.get('error') or grants['unanalyzed']:
+            yield Finding(
+                finding='Lambda function role could not be analyzed.',
+                severity='Low',
+                recommendation='Allow the scanner to read IAM role and policy details (iam:List*RolePolicies, iam:GetRolePolicy, iam:GetPolicy, iam:GetPolicyVersion).',
+                cis_control='CIS 1.18',
+                metrics={'role': fn['Role'], 'error': grants.get('error'), 'policies': grants.get('unanalyzed')},
+                **base
+            )
+            if grants.get('error'):
+                continue
+        if grants['admin']:
+            yield Finding(
+                finding='Lambda function role grants full administrative access.',
+                severity='High',
+                recommendation='Replace "*:*" permissions with the specific actions and resources the function uses.',
+                cis_control='CIS 1.16',
+                metrics={'role': fn['Role']},
+                **base
+            )
+            continue
+        for field, finding in (('wildcard_actions', 'Lambda function role allows wildcard actions.'),
+                               ('sensitive_actions', 'Lambda function role allows sensitive actions on all resources.')):
+            if grants[field]:
+                yield Finding(
+                    finding=finding,
+                    severity='Medium',
+                    recommendation='Ensure Lambda function role follows least privilege: list specific actions and scope resources.',
+                    cis_control='CIS 1.18',
+                    metrics={'role': fn['Role'], 'actions': sorted(grants[field]),
+                             'policies': sorted({p for sources in grants[field].values() for p in sources})},
+                    **base
+                )
+
+# CloudTrail logging
+@rule('cloudtrail-enabled', ('cloudtrails',), group='cloudtrail', shard=False)
+def check_cloudtrail_enabled(resources):
     if not resources.get('cloudtrails', []):
-        findings.append({
-            'service': 'CloudTrail',
-            'resource_id': '-',
-            'finding': 'No CloudTrail trails found.',
-            'severity': 'High',
-            'recommendation': 'Enable CloudTrail logging in all regions.',
-            'cis_control': 'CIS 2.1.1'
-        })
-
-    # GuardDuty enabled
-    if not resources.get('guardduty', {}):
-        findings.append({
-            'service': 'GuardDuty',
-            'resource_id': '-',
-            'finding': 'GuardDuty is not enabled.',
-            'severity': 'Medium',
-            'recommendation': 'Enable GuardDuty for threat detection.',
-            'cis_control': 'CIS 4.2'
-        })
-
-    # ECS/EKS clusters (placeholder for compliance checks)
+        yield Finding(
+            service='CloudTrail',
+            resource_id='-',
+            finding='No CloudTrail trails found.',
+            severity='High',
+            recommendation='Enable CloudTrail logging in all regions.',
+            cis_control='CIS 2.1.1'
+        )
+
+# GuardDuty enabled (per scanned region when the scan is region-aware)
+@rule('guardduty-enabled', ('guardduty',), group='guardduty', shard=False)
+def check_guardduty_enabled(resources):
+    detectors = resources.get('guardduty', {})
+    if 'regions' in resources:
+        covered = {d.get('Region') for d in detectors.values()}
+        missing = [r for r in resources['regions'] if r not in covered]
+    else:
+        missing = [None] if not detectors else []
+    for region in missing:
+        yield Finding(
+            service='GuardDuty',
+            resource_id='-',
+            region=region,
+            finding='GuardDuty is not enabled.',
+            severity='Medium',
+            recommendation='Enable GuardDuty for threat detection.',
+            cis_control='CIS 4.2'
+        )
+
+# ECS clusters (placeholder for compliance checks)
+@rule('ecs-cluster-review', ('ecs_clusters',), group='ecs')
+def check_ecs_clusters(resources):
     for cluster in resources.get('ecs_clusters', []):
-        findings.append({
-            'service': 'ECS',
-            'resource_id': cluster,
-            'finding': 'ECS cluster discovered.',
-            'severity': 'Low',
-            'recommendation': 'Review ECS cluster security settings.',
-            'cis_control': 'CIS 5.1'
-        })
-    for cluster in resources.get('eks_clusters', []):
-        findings.append({
-            'service': 'EKS',
-            'resource_id': cluster,
-            'finding': 'EKS cluster discovered.',
-            'severity': 'Low',
-            'recommendation': 'Review EKS cluster security settings.',
-            'cis_control': 'CIS 5.1'
-        })
+        yield Finding(
+            service='ECS',
+            resource_id=cluster,
+            region=arn_region(cluster),
+            finding='ECS cluster discovered.',
+            severity='Low',
+            recommendation='Review ECS cluster security settings.',
+            cis_control='CIS 5.1'
+        )
 
-    return findings
+# EKS clusters (placeholder for compliance checks)
+@rule('eks-cluster-review', ('eks_clusters',), group='eks')
+def check_eks_clusters(resources):
+    for cluster in resources.get('eks_clusters', []):
+        yield Finding(
+            service='EKS',
+            resource_id=cluster,
+            region=arn_region(cluster),
+            finding='EKS cluster discovered.',
+            severity='Low',
+            recommendation='Review EKS cluster security settings.',
+            cis_control='CIS 5.1'
+        )
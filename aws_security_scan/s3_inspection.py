@@ -0,0 +1,99 @@
+# s3_inspection.py: Concurrent per-bucket inspection of S3 security settings
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import BotoCoreError, ClientError
+
+# Error codes meaning "this setting is not configured" rather than a failure
+MISSING_CONFIG_CODES = {
+    'policy': 'NoSuchBucketPolicy',
+    'public_access_block': 'NoSuchPublicAccessBlockConfiguration',
+    'encryption': 'ServerSideEncryptionConfigurationNotFoundError',
+}
+
+
+def bucket_region(location_constraint):
+    # get_bucket_location reports us-east-1 as None and eu-west-1 as the legacy 'EU'
+    if not location_constraint:
+        return 'us-east-1'
+    if location_constraint == 'EU':
+        return 'eu-west-1'
+    return location_constraint
+
+
+def error_code(error):
+    # AWS error code of a ClientError; the exception name of a BotoCoreError
+    # (e.g. EndpointConnectionError, ReadTimeoutError)
+    if isinstance(error, ClientError):
+        return error.response['Error'].get('Code', str(error))
+    return type(error).__name__
+
+
+class BucketInspector:
+    def __init__(self, client_factory, max_workers=8):
+        # client_factory(service, region=None) must return a boto3 client
+        self.client_factory = client_factory
+        self.max_workers = max_workers
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def inspect(self, buckets):
+        # Fetch ACL, policy, public access block and default encryption for
+        # every bucket concurrently, one call per attribute per bucket. Errors
+        # are recorded per bucket so one bad bucket does not discard the rest.
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            results = list(pool.map(self.inspect_bucket, buckets))
+        resources = {
+            's3_buckets': [],
+            's3_bucket_acls': {},
+            's3_bucket_policies': {},
+            's3_public_access_blocks': {},
+            's3_bucket_encryption': {},
+            's3_bucket_errors': {},
+        }
+        for bucket, settings, errors in results:
+            name = bucket['Name']
+            resources['s3_buckets'].append(bucket)
+            if settings['acl'] is not None:
+                resources['s3_bucket_acls'][name] = settings['acl']
+            if settings['policy'] is not None:
+                resources['s3_bucket_policies'][name] = settings['policy']
+            resources['s3_public_access_blocks'][name] = settings['public_access_block']
+            resources['s3_bucket_encryption'][name] = settings['encryption']
+            if errors:
+                resources['s3_bucket_errors'][name] = errors
+        return resources
+
+    def inspect_bucket(self, bucket):
+        name = bucket['Name']
+        errors = {}
+        region = bucket.get('BucketRegion')
+        if not region:
+            try:
+                region = bucket_region(self._client(None).get_bucket_location(Bucket=name).get('LocationConstraint'))
+            except (ClientError, BotoCoreError) as e:
+                errors['location'] = error_code(e)
+        bucket = dict(bucket, Region=region)
+        s3 = self._client(region)
+        fetchers = {
+            'acl': lambda: {k: v for k, v in s3.get_bucket_acl(Bucket=name).items() if k != 'ResponseMetadata'},
+            'policy': lambda: s3.get_bucket_policy(Bucket=name)['Policy'],
+            'public_access_block': lambda: s3.get_public_access_block(Bucket=name)['PublicAccessBlockConfiguration'],
+            'encryption': lambda: s3.get_bucket_encryption(Bucket=name)['ServerSideEncryptionConfiguration'],
+        }
+        settings = {}
+        for attribute, fetch in fetchers.items():
+            try:
+                settings[attribute] = fetch()
+            except (ClientError, BotoCoreError) as e:
+                code = error_code(e)
+                settings[attribute] = None
+                if code != MISSING_CONFIG_CODES.get(attribute):
+                    errors[attribute] = code
+        return bucket, settings, errors
+
+    def _client(self, region):
+        # One client per bucket home region avoids cross-region redirects
+        with self._lock:
+            if region not in self._clients:
+                self._clients[region] = self.client_factory('s3', region)
+            return self._clients[region]
@@ -1,64 +1,278 @@
 # Scanner module: discovers AWS resources and runs security checks
-import boto3
-from aws_security_scan.rules import evaluate_all_rules
+import contextlib
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from aws_security_scan.context import DEFAULT_MAX_POOL_CONNECTIONS, AwsContext
+from aws_security_scan.rules import evaluate_all_rules, is_stream, select_rules
+from aws_security_scan.delta import IncrementalEvaluator
+from aws_security_scan.s3_inspection import BucketInspector
+from aws_security_scan.iam_credentials import collect_from_credential_report
+from aws_security_scan.iam_policies import collect_role_policies
+
+# Resource types of the Lambda role collector, which only runs when a selected rule reads them
+LAMBDA_ROLE_TYPES = ('iam_role_policies', 'iam_managed_policies')
 
 class Scanner:
-    def __init__(self, profile=None):
-        if profile:
-            self.session = boto3.Session(profile_name=profile)
-        else:
-            self.session = boto3.Session()
-        self.account_id = self.session.client('sts').get_caller_identity()['Account']
+    def __init__(self, profile=None, max_workers=8, session=None, regions=None, account_id=None, context=None, profiler=None):
+        # The context's cached clients and identity are shared with the other phases of a run
+        self.context = context or AwsContext(profile=profile, session=session, max_pool_connections=max(DEFAULT_MAX_POOL_CONNECTIONS, max_workers))
+        self.session = self.context.session
+        # A known account ID (e.g. from a snapshot) avoids the STS call
+        self.account_id = account_id or self.context.account_id
+        self.max_workers = max_workers
+        # None scans the session's default region, 'all' every enabled region
+        self.regions = regions
+        self._enabled_regions = None
+        # Seconds spent in each collector and regions covered by the last discovery run
+        self.timings = {}
+        self.last_regions = []
+        self.resources = {}
+        # Compact (Region, InstanceId) reservations recorded while rules consume
+        # a streamed EC2 inventory, so later phases still see every instance
+        self.streamed_instances = []
+        self.rule_stats = {}
+        # Finding delta and state for the next run, set by incremental evaluation
+        self.delta = None
+        self.incremental_state = None
+        # Optional ApiProfiler timing the discovery and evaluation phases
+        self.profiler = profiler
 
-    def run_all_checks(self):
-        resources = self.discover_resources()
-        findings = evaluate_all_rules(resources)
+    def run_all_checks(self, stream=False, enabled_rules=None, disabled_rules=None, eval_workers=1, resources=None,
+                       incremental=False, previous_state=None):
+        # Pass previously discovered resources (e.g. a snapshot) to skip discovery
+        if resources is None:
+            # In stream mode most API calls happen lazily during evaluation
+            with self._phase('discovery'):
+                resources = self.discover_resources(stream=stream, enabled_rules=enabled_rules, disabled_rules=disabled_rules)
+        else:
+            self.last_regions = resources.get('regions', [])
+        # Kept so later phases (e.g. the cost report) can reuse discovered inventory
+        self.resources = resources
+        self.rule_stats = {}
+        with self._phase('evaluation'):
+            if incremental:
+                # Only added/changed resources are evaluated against previous_state
+                evaluator = IncrementalEvaluator(previous_state)
+                findings = evaluator.evaluate(resources, enabled=enabled_rules, disabled=disabled_rules, stats=self.rule_stats)
+                self.delta = evaluator.delta()
+                self.incremental_state = evaluator.state(self.account_id)
+            else:
+                findings = evaluate_all_rules(resources, enabled=enabled_rules, disabled=disabled_rules, stats=self.rule_stats, workers=eval_workers)
         return findings, self.account_id
 
-    def discover_resources(self):
-        # Discover resources from major AWS services
-        resources = {}
-        ec2 = self.session.client('ec2')
-        resources['ec2_instances'] = ec2.describe_instances()['Reservations']
-        resources['security_groups'] = ec2.describe_security_groups()['SecurityGroups']
-
-        s3 = self.session.client('s3')
-        resources['s3_buckets'] = s3.list_buckets()['Buckets']
-        # For each bucket, get ACL and policy
-        resources['s3_bucket_acls'] = {b['Name']: s3.get_bucket_acl(Bucket=b['Name']) for b in resources['s3_buckets']}
+    def _phase(self, name):
+        return self.profiler.phase(name) if self.profiler else contextlib.nullcontext()
+
+    def global_collectors(self):
+        # Account-wide services, collected once per scan
+        return {
+            's3': self._collect_s3,
+            'iam': self._collect_iam,
+            'cloudtrail': self._collect_cloudtrail,
+        }
+
+    def regional_collectors(self):
+        # Regional services, collected once per scanned region
+        return {
+            'ec2': self._collect_ec2,
+            'rds': self._collect_rds,
+            'lambda': self._collect_lambda,
+            'guardduty': self._collect_guardduty,
+            'ecs': self._collect_ecs,
+            'eks': self._collect_eks,
+        }
+
+    def resolve_regions(self):
+        if self.regions == 'all':
+            if self._enabled_regions is None:
+                ec2 = self._client('ec2')
+                self._enabled_regions = sorted(r['RegionName'] for r in ec2.describe_regions()['Regions'])
+            return list(self._enabled_regions)
+        if self.regions:
+            return list(self.regions)
+        return [self.session.region_name or 'us-east-1']
+
+    def discover_resources(self, stream=False, enabled_rules=None, disabled_rules=None):
+        # Discover resources from major AWS services. Global collectors and every
+        # (regional collector, region) pair share one bounded worker pool, so a
+        # multi-region scan takes roughly as long as the slowest region.
+        # With stream=True the large resource lists are returned as lazy
+        # page-by-page generators instead (see stream_resources). Collectors
+        # that cost per-resource calls (Lambda roles) are skipped unless one of
+        # the selected rules reads what they collect.
+        regions = self.resolve_regions()
+        self.timings = {}
+        self.last_regions = regions
+        read = {t for r in select_rules(enabled_rules, disabled_rules) for t in r.resource_types + r.optional}
+        lambda_roles = any(t in read for t in LAMBDA_ROLE_TYPES)
+        if stream:
+            return self.stream_resources(regions, lambda_roles=lambda_roles)
+        resources = {'regions': regions}
+        with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+            futures = {}
+            for name, fn in self.global_collectors().items():
+                futures[pool.submit(self._timed, name, materialize, fn)] = None
+            for region in regions:
+                for name, fn in self.regional_collectors().items():
+                    futures[pool.submit(self._timed, f"{name}@{region}", materialize, fn, region)] = region
+            # Merge in submission order so the merged lists are deterministic
+            for future, region in futures.items():
+                if region is None:
+                    resources.update(future.result())
+                else:
+                    merge_regional(resources, future.result(), region)
+        if lambda_roles:
+            self._timed('lambda-roles', self._collect_lambda_roles, resources)
+        return resources
+
+    def stream_resources(self, regions, lambda_roles=True):
+        # Lazy discovery: paginated resource lists are chained across regions and
+        # only fetched, one page at a time, while evaluate_all_rules consumes them.
+        # Each stream can therefore be iterated exactly once.
+        resources = {'regions': regions}
+        streams = {}
+        for name, fn in self.global_collectors().items():
+            resources.update(fn())
+        for region in regions:
+            for name, fn in self.regional_collectors().items():
+                for key, value in fn(region).items():
+                    if isinstance(value, dict):
+                        merge_regional(resources, {key: value}, region)
+                    else:
+                        streams.setdefault(key, []).append(tag_region(value, region))
+        for key, parts in streams.items():
+            resources[key] = itertools.chain.from_iterable(parts)
+        self.streamed_instances = []
+        if 'ec2_instances' in resources:
+            resources['ec2_instances'] = record_instances(resources['ec2_instances'], self.streamed_instances)
+        # Role lookups need the function list, so Lambda functions are then not streamed
+        if lambda_roles:
+            self._collect_lambda_roles(resources)
+        return resources
+
+    def instance_inventory(self):
+        # EC2 reservations of the last scan for the cost report. A streamed
+        # inventory is already consumed: its recorded instance IDs are returned
+        # instead, after fetching any pages the selected rules did not read
+        instances = self.resources.get('ec2_instances')
+        if instances is None or not is_stream(instances):
+            return instances
+        for _ in instances:
+            pass
+        return self.streamed_instances
+
+    def _timed(self, name, fn, *args):
+        start = time.perf_counter()
         try:
-            resources['s3_bucket_policies'] = {b['Name']: s3.get_bucket_policy(Bucket=b['Name'])['Policy'] for b in resources['s3_buckets'] if s3.get_bucket_policy(Bucket=b['Name'])}
-        except Exception:
-            resources['s3_bucket_policies'] = {}
+            return fn(*args)
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def _client(self, service, region=None):
+        return self.context.client(service, region)
 
-        iam = self.session.client('iam')
-        resources['iam_users'] = iam.list_users()['Users']
-        resources['iam_mfa'] = {u['UserName']: iam.list_mfa_devices(UserName=u['UserName']) for u in resources['iam_users']}
-        resources['iam_access_keys'] = {u['UserName']: iam.list_access_keys(UserName=u['UserName'])['AccessKeyMetadata'] for u in resources['iam_users']}
+    def _collect_ec2(self, region):
+        ec2 = self._client('ec2', region)
+        return {
+            'ec2_instances': paginate(ec2, 'describe_instances', 'Reservations'),
+            'security_groups': paginate(ec2, 'describe_security_groups', 'SecurityGroups'),
+            'vpcs': paginate(ec2, 'describe_vpcs', 'Vpcs'),
+        }
 
-        rds = self.session.client('rds')
-        resources['rds_instances'] = rds.describe_db_instances()['DBInstances']
+    def _collect_s3(self):
+        s3 = self._client('s3')
+        buckets = s3.list_buckets()['Buckets']
+        # Per-bucket ACL, policy, public access block and encryption, fetched concurrently
+        return BucketInspector(self._client, max_workers=self.max_workers).inspect(buckets)
 
-        lambda_client = self.session.client('lambda')
-        resources['lambda_functions'] = lambda_client.list_functions()['Functions']
+    def _collect_iam(self):
+        iam = self._client('iam')
+        # One bulk credential report download covers every user's MFA and keys
+        report = collect_from_credential_report(iam)
+        if report is not None:
+            return report
+        # Fall back to per-user calls when the report is unavailable.
+        # Users are materialized because the per-user lookups below iterate them
+        users = list(paginate(iam, 'list_users', 'Users'))
+        return {
+            'iam_users': users,
+            'iam_mfa': {u['UserName']: {'MFADevices': list(paginate(iam, 'list_mfa_devices', 'MFADevices', UserName=u['UserName']))} for u in users},
+            'iam_access_keys': {u['UserName']: list(paginate(iam, 'list_access_keys', 'AccessKeyMetadata', UserName=u['UserName'])) for u in users},
+        }
 
-        vpc = self.session.client('ec2')
-        resources['vpcs'] = vpc.describe_vpcs()['Vpcs']
+    def _collect_rds(self, region):
+        rds = self._client('rds', region)
+        return {'rds_instances': paginate(rds, 'describe_db_instances', 'DBInstances')}
 
-        cloudtrail = self.session.client('cloudtrail')
-        resources['cloudtrails'] = cloudtrail.describe_trails()['trailList']
+    def _collect_lambda(self, region):
+        lambda_client = self._client('lambda', region)
+        return {'lambda_functions': paginate(lambda_client, 'list_functions', 'Functions')}
 
-        guardduty = self.session.client('guardduty')
+    def _collect_lambda_roles(self, resources):
+        # Policies of the functions' execution roles (IAM is global), each role
+        # and managed policy fetched once however many functions share it
+        if 'lambda_functions' not in resources:
+            return
+        functions = resources['lambda_functions'] = list(resources['lambda_functions'])
+        roles = {fn['Role'] for fn in functions if fn.get('Role')}
+        resources.update(collect_role_policies(self._client('iam'), roles, max_workers=self.max_workers))
+
+    def _collect_cloudtrail(self):
+        cloudtrail = self._client('cloudtrail')
+        return {'cloudtrails': cloudtrail.describe_trails()['trailList']}
+
+    def _collect_guardduty(self, region):
+        guardduty = self._client('guardduty', region)
         try:
-            detectors = guardduty.list_detectors()['DetectorIds']
-            resources['guardduty'] = {d: guardduty.get_detector(DetectorId=d) for d in detectors}
+            detectors = list(paginate(guardduty, 'list_detectors', 'DetectorIds'))
+            return {'guardduty': {d: guardduty.get_detector(DetectorId=d) for d in detectors}}
         except Exception:
-            resources['guardduty'] = {}
+            return {'guardduty': {}}
 
-        ecs = self.session.client('ecs')
-        resources['ecs_clusters'] = ecs.list_clusters()['clusterArns']
+    def _collect_ecs(self, region):
+        ecs = self._client('ecs', region)
+        return {'ecs_clusters': paginate(ecs, 'list_clusters', 'clusterArns')}
 
-        eks = self.session.client('eks')
-        resources['eks_clusters'] = eks.list_clusters()['clusters']
+    def _collect_eks(self, region):
+        eks = self._client('eks', region)
+        # EKS only returns names; build ARNs so clusters stay unique across regions
+        partition = self.session.get_partition_for_region(region)
+        return {'eks_clusters': (f"arn:{partition}:eks:{region}:{self.account_id}:cluster/{name}" for name in paginate(eks, 'list_clusters', 'clusters'))}
 
-        return resources
+
+def paginate(client, operation, result_key, **kwargs):
+    # Yield resources page by page so only one page is held in memory at a time
+    for page in client.get_paginator(operation).paginate(**kwargs):
+        yield from page.get(result_key, [])
+
+
+def materialize(fn, *args):
+    # Run a collector and drain its streams into lists
+    partial = fn(*args)
+    return {key: value if isinstance(value, (dict, list)) else list(value) for key, value in partial.items()}
+
+
+def tag_region(items, region):
+    for item in items:
+        yield dict(item, Region=region) if isinstance(item, dict) else item
+
+
+def record_instances(reservations, inventory):
+    # Pass reservations through, keeping each one's region and instance IDs
+    for reservation in reservations:
+        inventory.append({'Region': reservation.get('Region'),
+                          'Instances': [{'InstanceId': i['InstanceId']} for i in reservation.get('Instances', [])]})
+        yield reservation
+
+
+def merge_regional(resources, partial, region):
+    # Merge one region's collector output into resources, tagging every
+    # dict-shaped resource with its region (string ARNs already carry it)
+    for key, value in partial.items():
+        if isinstance(value, dict):
+            merged = resources.setdefault(key, {})
+            for item_key, item in value.items():
+                merged[item_key] = dict(item, Region=region) if isinstance(item, dict) else item
+        else:
+            resources.setdefault(key, []).extend(tag_region(value, region))
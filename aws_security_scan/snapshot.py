@@ -0,0 +1,109 @@
+# snapshot.py: Compressed, versioned on-disk snapshots of discovered resources
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
+
+SNAPSHOT_VERSION = 1
+TIMESTAMP_FORMAT = '%Y%m%dT%H%M%SZ'
+AGE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Snapshots kept per account and region set when none is configured
+DEFAULT_KEEP_SNAPSHOTS = 10
+
+
+class SnapshotEncoder(json.JSONEncoder):
+    # boto3 responses carry datetimes; tag them so they round-trip.
+    # Finding records are stored as plain dicts
+    def default(self, o):
+        if isinstance(o, datetime):
+            return {'__datetime__': o.isoformat()}
+        if isinstance(o, Mapping):
+            return dict(o)
+        return super().default(o)
+
+
+def decode_json_object(obj):
+    if len(obj) == 1 and '__datetime__' in obj:
+        return datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def parse_age(value):
+    # '90' (seconds), '30m', '6h', '2d' -> timedelta
+    match = re.fullmatch(r'\s*(\d+)\s*([smhd]?)\s*', str(value))
+    if not match:
+        raise ValueError(f"Invalid age: {value!r} (use e.g. 30m, 6h, 2d)")
+    return timedelta(seconds=int(match.group(1)) * AGE_UNITS[match.group(2) or 's'])
+
+
+def region_key(regions):
+    # Short, filesystem-safe key for the set of scanned regions
+    regions = sorted(regions or [])
+    if len(regions) <= 3:
+        return '_'.join(regions) or 'default'
+    return f"{len(regions)}-regions-{hashlib.sha1(','.join(regions).encode()).hexdigest()[:8]}"
+
+
+def save_snapshot(resources, account_id, directory, regions=None, created_at=None):
+    # Write resources to <directory>/<account>/<regions>/<timestamp>.json.gz
+    created_at = created_at or datetime.now(timezone.utc)
+    regions = regions if regions is not None else resources.get('regions', [])
+    path = os.path.join(directory, str(account_id), region_key(regions), created_at.strftime(TIMESTAMP_FORMAT) + '.json.gz')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    document = {
+        'version': SNAPSHOT_VERSION,
+        'account_id': account_id,
+        'regions': list(regions),
+        'created_at': created_at.strftime(TIMESTAMP_FORMAT),
+        'resources': resources,
+    }
+    # Write to a temporary file first so readers never see a partial snapshot
+    tmp_path = path + '.tmp'
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(document, f, cls=SnapshotEncoder, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_snapshot(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        document = json.load(f, object_hook=decode_json_object)
+    if document.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {document.get('version')} in {path} (expected {SNAPSHOT_VERSION})")
+    return document
+
+
+def snapshot_time(path):
+    name = os.path.basename(path)[:-len('.json.gz')]
+    return datetime.strptime(name, TIMESTAMP_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def find_latest_snapshot(directory, account_id=None, regions=None, max_age=None, now=None):
+    # Newest snapshot path matching the account/regions (any if None) that is
+    # younger than max_age (a timedelta), or None
+    pattern = os.path.join(directory, str(account_id) if account_id else '*',
+                           region_key(regions) if regions is not None else '*', '*.json.gz')
+    paths = sorted(glob.glob(pattern), key=snapshot_time)
+    if not paths:
+        return None
+    latest = paths[-1]
+    now = now or datetime.now(timezone.utc)
+    if max_age is not None and now - snapshot_time(latest) > max_age:
+        return None
+    return latest
+
+
+def prune_snapshots(directory, account_id, regions, keep=DEFAULT_KEEP_SNAPSHOTS):
+    # Delete all but the newest `keep` snapshots of the account/regions
+    # (0 keeps every snapshot); returns the deleted paths
+    if not keep:
+        return []
+    pattern = os.path.join(directory, str(account_id), region_key(regions), '*.json.gz')
+    stale = sorted(glob.glob(pattern), key=snapshot_time)[:-keep]
+    for path in stale:
+        os.remove(path)
+    return stale
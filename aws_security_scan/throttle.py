@@ -0,0 +1,160 @@
+# throttle.py: Shared adaptive rate limiting and throttling-aware retries for AWS calls
+import random
+import threading
+import time
+from botocore.exceptions import ClientError
+
+# Error codes AWS services use to signal request throttling
+THROTTLE_CODES = {
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'RequestThrottledException',
+    'TooManyRequestsException', 'ProvisionedThroughputExceededException', 'RequestLimitExceeded',
+    'BandwidthLimitExceeded', 'RequestThrottled', 'SlowDown', 'PriorRequestNotComplete',
+    'EC2ThrottledException',
+}
+# Starting requests per second per service, keyed by botocore's hyphenized
+# service ID; each API starts at its service's rate and adapts from there
+DEFAULT_SERVICE_RATES = {
+    'iam': 10,
+    'sts': 10,
+    'cost-explorer': 5,
+    'cloudwatch': 20,
+    'organizations': 5,
+    'ec2': 50,
+    's3': 200,
+}
+DEFAULT_RATE = 25
+# Ceilings the rates may grow to while calls keep succeeding
+DEFAULT_SERVICE_CEILINGS = {
+    'iam': 20,
+    'sts': 50,
+    'cost-explorer': 10,
+    'cloudwatch': 50,
+    'organizations': 10,
+    'ec2': 100,
+    # S3 sustains thousands of requests per second per bucket prefix
+    's3': 3500,
+}
+DEFAULT_CEILING = 100
+# Fraction of the ceiling added to the rate per successful call
+INCREASE_STEP = 0.01
+
+
+def is_throttle_error(error):
+    # True for a botocore ClientError caused by throttling
+    if not isinstance(error, ClientError):
+        return False
+    return error.response.get('Error', {}).get('Code') in THROTTLE_CODES
+
+
+class TokenBucket:
+    def __init__(self, rate, max_rate=None, min_rate=0.5, increase=INCREASE_STEP, clock=time.monotonic):
+        self.rate = float(rate)
+        self.max_rate = max(self.rate, float(max_rate or rate))
+        # Rate added per successful call
+        self.increase = self.max_rate * increase
+        self.min_rate = min(min_rate, self.rate)
+        self.clock = clock
+        # Allow a burst of up to one second's worth of requests
+        self.tokens = self.rate
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        # Take one token and return how long the caller must wait for it.
+        # Tokens may go negative, which queues callers fairly.
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def on_throttle(self):
+        # Multiplicative decrease on throttling
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def on_success(self):
+        # Additive increase, probing up to the ceiling
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+class CallScheduler:
+    def __init__(self, service_rates=None, service_ceilings=None, max_attempts=8, base_delay=0.5, max_delay=20.0, sleep=time.sleep):
+        self.service_rates = dict(DEFAULT_SERVICE_RATES, **(service_rates or {}))
+        self.service_ceilings = dict(DEFAULT_SERVICE_CEILINGS, **(service_ceilings or {}))
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.buckets = {}
+        # {(service, operation): {'calls', 'throttles', 'retries', 'wait_seconds'}}
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def install(self, session):
+        # Hook into a boto3 session's event system; applies to every client
+        # created from the session afterwards (including paginators)
+        events = session.events
+        events.register('before-send', self.before_send, unique_id='call-scheduler-before-send')
+        # More specific than botocore's own needs-retry.<service> handler, so throttles are decided here
+        events.register('needs-retry.*.*', self.needs_retry, unique_id='call-scheduler-needs-retry')
+        return self
+
+    def bucket(self, service, operation=None):
+        key = (service, operation)
+        with self._lock:
+            if key not in self.buckets:
+                rate = self.service_rates.get(service, DEFAULT_RATE)
+                ceiling = self.service_ceilings.get(service, DEFAULT_CEILING)
+                self.buckets[key] = TokenBucket(rate, max_rate=ceiling)
+            return self.buckets[key]
+
+    def _record(self, service, operation, **increments):
+        with self._lock:
+            stat = self.stats.setdefault((service, operation), {'calls': 0, 'throttles': 0, 'retries': 0, 'wait_seconds': 0.0})
+            for field, value in increments.items():
+                stat[field] += value
+
+    def acquire(self, service, operation):
+        # Both the service-wide and the per-API bucket must admit the call
+        wait = max(self.bucket(service).reserve(), self.bucket(service, operation).reserve())
+        self._record(service, operation, calls=1, wait_seconds=wait)
+        if wait > 0:
+            self.sleep(wait)
+
+    def backoff(self, attempts):
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1)))
+
+    def before_send(self, event_name, **kwargs):
+        _, service, operation = event_name.split('.', 2)
+        self.acquire(service, operation)
+        # Returning None lets botocore send the request
+
+    def needs_retry(self, event_name, attempts, response=None, caught_exception=None, **kwargs):
+        _, service, operation = event_name.split('.', 2)
+        code = None
+        status = None
+        if response is not None:
+            http_response, parsed = response
+            code = parsed.get('Error', {}).get('Code')
+            status = http_response.status_code
+        if code in THROTTLE_CODES or status == 429:
+            self.bucket(service, operation).on_throttle()
+            if attempts >= self.max_attempts:
+                self._record(service, operation, throttles=1)
+                # Give up; False (rather than None) stops botocore retrying further
+                return False
+            self._record(service, operation, throttles=1, retries=1)
+            return self.backoff(attempts)
+        if caught_exception is None and status is not None and status < 400:
+            self.bucket(service).on_success()
+            self.bucket(service, operation).on_success()
+        # Anything else (e.g. transient network errors) is left to botocore's retry handler
+        return None
+
+    def throttle_summary(self):
+        return {f"{s}.{o}": stat for (s, o), stat in sorted(self.stats.items()) if stat['throttles']}
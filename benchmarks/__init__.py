@@ -0,0 +1 @@
+# benchmarks package: scan pipeline benchmarks against synthetic accounts
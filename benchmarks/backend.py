@@ -0,0 +1,277 @@
+# backend.py: Local mock AWS backend serving a synthetic account, with injectable latency and throttling
+import random
+import threading
+import time
+from collections import Counter
+from botocore.exceptions import ClientError
+from botocore.hooks import HierarchicalEmitter, first_non_none_response
+from aws_security_scan.s3_inspection import MISSING_CONFIG_CODES
+
+# botocore's hyphenized service IDs, used in event names (and CallScheduler rates)
+SERVICE_IDS = {'ce': 'cost-explorer'}
+# Error code and HTTP status each service uses when it throttles a caller
+THROTTLE_ERRORS = {
+    'ec2': ('RequestLimitExceeded', 503),
+    's3': ('SlowDown', 503),
+}
+DEFAULT_THROTTLE_ERROR = ('ThrottlingException', 400)
+# Items per page by result key, close to the services' own page sizes
+PAGE_SIZES = {
+    'Reservations': 250,
+    'SecurityGroups': 1000,
+    'DBInstances': 100,
+    'Functions': 50,
+}
+DEFAULT_PAGE_SIZE = 1000
+# Cost Explorer days per GetCostAndUsage page, so windows need NextPageToken
+COST_PAGE_DAYS = 7
+
+
+class MockHttpResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+class SyntheticBackend:
+    def __init__(self, account, latency=0.0, throttle_rate=0.0, seed=0):
+        self.account = account
+        # Seconds added to every request attempt
+        self.latency = latency
+        # Probability that an attempt is rejected with the service's throttling error
+        self.throttle_rate = throttle_rate
+        self.calls = Counter()
+        self.throttles = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.handlers = {
+            ('sts', 'get_caller_identity'): ('GetCallerIdentity', self.get_caller_identity),
+            ('ec2', 'describe_regions'): ('DescribeRegions', self.describe_regions),
+            ('ec2', 'describe_instances'): ('DescribeInstances', self.regional('reservations', 'Reservations')),
+            ('ec2', 'describe_security_groups'): ('DescribeSecurityGroups', self.regional('security_groups', 'SecurityGroups')),
+            ('ec2', 'describe_vpcs'): ('DescribeVpcs', self.regional('vpcs', 'Vpcs')),
+            ('s3', 'list_buckets'): ('ListBuckets', self.list_buckets),
+            ('s3', 'get_bucket_location'): ('GetBucketLocation', self.get_bucket_location),
+            ('s3', 'get_bucket_acl'): ('GetBucketAcl', self.bucket_setting('acl', None)),
+            ('s3', 'get_bucket_policy'): ('GetBucketPolicy', self.bucket_setting('policy', 'Policy')),
+            ('s3', 'get_public_access_block'): ('GetPublicAccessBlock', self.bucket_setting('public_access_block', 'PublicAccessBlockConfiguration')),
+            ('s3', 'get_bucket_encryption'): ('GetBucketEncryption', self.bucket_setting('encryption', 'ServerSideEncryptionConfiguration')),
+            ('iam', 'generate_credential_report'): ('GenerateCredentialReport', lambda region, params: (200, {'State': 'COMPLETE'})),
+            ('iam', 'get_credential_report'): ('GetCredentialReport', self.get_credential_report),
+            ('iam', 'list_attached_role_policies'): ('ListAttachedRolePolicies', self.list_attached_role_policies),
+            ('iam', 'list_role_policies'): ('ListRolePolicies', self.role_attribute(lambda role: {'PolicyNames': sorted(role['InlinePolicies'])})),
+            ('iam', 'get_role_policy'): ('GetRolePolicy', self.get_role_policy),
+            ('iam', 'get_policy'): ('GetPolicy', self.get_policy),
+            ('iam', 'get_policy_version'): ('GetPolicyVersion', self.get_policy_version),
+            ('rds', 'describe_db_instances'): ('DescribeDBInstances', self.regional('db_instances', 'DBInstances')),
+            ('lambda', 'list_functions'): ('ListFunctions', self.regional('functions', 'Functions')),
+            ('cloudtrail', 'describe_trails'): ('DescribeTrails', self.describe_trails),
+            ('guardduty', 'list_detectors'): ('ListDetectors', self.list_detectors),
+            ('guardduty', 'get_detector'): ('GetDetector', lambda region, params: (200, {'Status': 'ENABLED'})),
+            ('ecs', 'list_clusters'): ('ListClusters', lambda region, params: (200, {'clusterArns': [
+                f'arn:aws:ecs:{region}:{self.account.account_id}:cluster/cluster-{n}' for n in range(2)]})),
+            ('eks', 'list_clusters'): ('ListClusters', lambda region, params: (200, {'clusters': [f'cluster-{n}' for n in range(2)]})),
+            ('ce', 'get_cost_and_usage'): ('GetCostAndUsage', self.get_cost_and_usage),
+            ('cloudwatch', 'get_metric_data'): ('GetMetricData', self.get_metric_data),
+        }
+
+    def service_ids(self):
+        return sorted({SERVICE_IDS.get(service, service) for service, _ in self.handlers})
+
+    def session(self, region_name='us-east-1'):
+        return MockSession(self, region_name)
+
+    def handle(self, service, method, region, params):
+        # One request attempt; returns (http status, parsed response or error)
+        operation, handler = self.handlers[(service, method)]
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls[f'{service}.{operation}'] += 1
+            throttled = self.throttle_rate and self._random.random() < self.throttle_rate
+            if throttled:
+                self.throttles[f'{service}.{operation}'] += 1
+        if throttled:
+            code, status = THROTTLE_ERRORS.get(service, DEFAULT_THROTTLE_ERROR)
+            return error(status, code, 'Rate exceeded')
+        return handler(region, params)
+
+    def regional(self, attribute, key):
+        def handler(region, params):
+            return 200, page(getattr(self.account, attribute).get(region, []), params, key)
+        return handler
+
+    def get_caller_identity(self, region, params):
+        account_id = self.account.account_id
+        return 200, {'Account': account_id, 'Arn': f'arn:aws:iam::{account_id}:user/benchmark', 'UserId': 'AIDABENCHMARK'}
+
+    def describe_regions(self, region, params):
+        return 200, {'Regions': [{'RegionName': r, 'OptInStatus': 'opt-in-not-required'} for r in self.account.regions]}
+
+    def list_buckets(self, region, params):
+        return 200, {'Buckets': self.account.buckets, 'Owner': {'ID': 'owner'}}
+
+    def get_bucket_location(self, region, params):
+        name = params['Bucket']
+        bucket_region = next(b['BucketRegion'] for b in self.account.buckets if b['Name'] == name)
+        return 200, {'LocationConstraint': None if bucket_region == 'us-east-1' else bucket_region}
+
+    def bucket_setting(self, attribute, key):
+        def handler(region, params):
+            settings = self.account.bucket_settings.get(params['Bucket'])
+            if settings is None:
+                return error(404, 'NoSuchBucket', 'The specified bucket does not exist')
+            value = settings[attribute]
+            if value is None:
+                return error(404, MISSING_CONFIG_CODES[attribute], 'Not configured')
+            return 200, dict(value) if key is None else {key: value}
+        return handler
+
+    def get_credential_report(self, region, params):
+        return 200, {'Content': self.account.credential_report, 'ReportFormat': 'text/csv'}
+
+    def role_attribute(self, make):
+        def handler(region, params):
+            role = self.account.roles.get(params['RoleName'])
+            if role is None:
+                return error(404, 'NoSuchEntity', f"The role with name {params['RoleName']} cannot be found.")
+            return 200, make(role)
+        return handler
+
+    def list_attached_role_policies(self, region, params):
+        return self.role_attribute(lambda role: {'AttachedPolicies': [
+            {'PolicyArn': arn, 'PolicyName': arn.rsplit('/', 1)[-1]} for arn in role['AttachedPolicies']]})(region, params)
+
+    def get_role_policy(self, region, params):
+        return self.role_attribute(lambda role: {'RoleName': params['RoleName'], 'PolicyName': params['PolicyName'],
+                                                 'PolicyDocument': role['InlinePolicies'][params['PolicyName']]})(region, params)
+
+    def get_policy(self, region, params):
+        if params['PolicyArn'] not in self.account.managed_policies:
+            return error(404, 'NoSuchEntity', 'Policy not found')
+        return 200, {'Policy': {'Arn': params['PolicyArn'], 'DefaultVersionId': 'v1'}}
+
+    def get_policy_version(self, region, params):
+        document = self.account.managed_policies.get(params['PolicyArn'])
+        if document is None:
+            return error(404, 'NoSuchEntity', 'Policy not found')
+        return 200, {'PolicyVersion': {'Document': document, 'VersionId': params['VersionId'], 'IsDefaultVersion': True}}
+
+    def describe_trails(self, region, params):
+        account_id = self.account.account_id
+        return 200, {'trailList': [{'Name': 'management', 'TrailARN': f'arn:aws:cloudtrail:us-east-1:{account_id}:trail/management',
+                                    'IsMultiRegionTrail': True, 'HomeRegion': 'us-east-1'}]}
+
+    def list_detectors(self, region, params):
+        # GuardDuty is left disabled in the last region
+        return 200, {'DetectorIds': [] if region == self.account.regions[-1] else [f'detector-{region}']}
+
+    def get_cost_and_usage(self, region, params):
+        if params.get('Granularity') != 'DAILY':
+            return error(400, 'ValidationException', 'The synthetic backend serves DAILY granularity only')
+        start, end = params['TimePeriod']['Start'], params['TimePeriod']['End']
+        results = [r for r in self.account.cost_results if start <= r['TimePeriod']['Start'] < end]
+        offset = int(params.get('NextPageToken') or 0)
+        response = {'ResultsByTime': results[offset:offset + COST_PAGE_DAYS], 'DimensionValueAttributes': []}
+        if offset + COST_PAGE_DAYS < len(results):
+            response['NextPageToken'] = str(offset + COST_PAGE_DAYS)
+        return 200, response
+
+    def get_metric_data(self, region, params):
+        results = []
+        for query in params['MetricDataQueries']:
+            instance_id = query['MetricStat']['Metric']['Dimensions'][0]['Value']
+            values = self.account.cpu_values(instance_id)
+            results.append({'Id': query['Id'], 'Label': 'CPUUtilization', 'Timestamps': [], 'Values': values, 'StatusCode': 'Complete'})
+        return 200, {'MetricDataResults': results, 'Messages': []}
+
+
+def page(items, params, key):
+    # Offset-based NextToken pagination over a list
+    size = PAGE_SIZES.get(key, DEFAULT_PAGE_SIZE)
+    start = int(params.get('NextToken') or 0)
+    response = {key: items[start:start + size]}
+    if start + size < len(items):
+        response['NextToken'] = str(start + size)
+    return response
+
+
+def error(status, code, message):
+    return status, {'Error': {'Code': code, 'Message': message}, 'ResponseMetadata': {'HTTPStatusCode': status}}
+
+
+class MockSession:
+    # Stands in for a boto3 Session. Handlers registered on .events (e.g. a
+    # CallScheduler or ApiProfiler) see the same before-call, before-send,
+    # response-received, needs-retry and after-call events botocore emits
+    def __init__(self, backend, region_name='us-east-1'):
+        self.backend = backend
+        self.region_name = region_name
+        self.events = HierarchicalEmitter()
+
+    def client(self, service, region_name=None, **kwargs):
+        return MockClient(self, service, region_name or self.region_name)
+
+    def get_partition_for_region(self, region):
+        return 'aws'
+
+
+class MockClient:
+    def __init__(self, session, service, region):
+        self.session = session
+        self.service = service
+        self.region = region
+        self.service_id = SERVICE_IDS.get(service, service)
+
+    def __getattr__(self, name):
+        if (self.service, name) not in self.session.backend.handlers:
+            raise AttributeError(f"{self.service} has no synthetic operation {name}")
+        return lambda **params: self.call(name, params)
+
+    def get_paginator(self, name):
+        return MockPaginator(self, name)
+
+    def call(self, method, params):
+        # The botocore request loop: rate limiting before each attempt, then
+        # needs-retry handlers decide whether (and after how long) to retry
+        backend = self.session.backend
+        operation = backend.handlers[(self.service, method)][0]
+        events = self.session.events
+        event_suffix = f'{self.service_id}.{operation}'
+        # Per-call context shared by the events of one call, as botocore's request context is
+        context = {}
+        events.emit(f'before-call.{event_suffix}', model=None, params=params, request_signer=None, context=context)
+        attempts = 0
+        while True:
+            attempts += 1
+            events.emit(f'before-send.{event_suffix}', request=None)
+            status, parsed = backend.handle(self.service, method, self.region, params)
+            # Responses are never serialized, so no body size is reported
+            events.emit(f'response-received.{event_suffix}', exception=None, parsed_response=parsed, context=context,
+                        response_dict={'status_code': status, 'headers': {}, 'body': None})
+            responses = events.emit(f'needs-retry.{event_suffix}', response=(MockHttpResponse(status), parsed),
+                                    endpoint=None, operation=None, attempts=attempts, caught_exception=None, request_dict=params)
+            delay = first_non_none_response(responses)
+            if delay is None or delay is False:
+                break
+            time.sleep(delay)
+        parsed.setdefault('ResponseMetadata', {})['RetryAttempts'] = attempts - 1
+        events.emit(f'after-call.{event_suffix}', http_response=MockHttpResponse(status), parsed=parsed, model=None, context=context)
+        if status >= 300:
+            raise ClientError(parsed, operation)
+        return parsed
+
+
+class MockPaginator:
+    def __init__(self, client, method):
+        self.client = client
+        self.method = method
+
+    def paginate(self, **params):
+        token = None
+        while True:
+            response = self.client.call(self.method, dict(params, NextToken=token) if token else params)
+            yield response
+            token = response.get('NextToken')
+            if not token:
+                return
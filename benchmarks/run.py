@@ -0,0 +1,213 @@
+# run.py: Times each phase of the scan pipeline against a synthetic account and records the results
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+from aws_security_scan.context import DEFAULT_MAX_POOL_CONNECTIONS, AwsContext
+from aws_security_scan.delta import IncrementalEvaluator
+from aws_security_scan.instrumentation import ApiProfiler
+from aws_security_scan.report import ReportGenerator, write_combined_report
+from aws_security_scan.rules import evaluate_all_rules
+from aws_security_scan.scanner import Scanner
+from aws_security_scan.throttle import CallScheduler
+from benchmarks.backend import SyntheticBackend
+from benchmarks.synthetic import SCALES, SyntheticAccount, resolve_scale
+from reports import aws_cost_report as cost_mod
+
+PHASES = ('discovery', 'evaluation', 'incremental', 'cost_analysis', 'report')
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+# A phase regresses when it is this much slower than the previous comparable run
+DEFAULT_TOLERANCE = 0.25
+# Phases faster than this are too noisy to compare
+MIN_COMPARED_SECONDS = 0.05
+# Client-side rate used by the opt-in unlimited variant
+UNLIMITED_RATE = 1e9
+# Slowest APIs printed after a run
+TOP_APIS = 5
+
+
+def rate_limits(api_rate=None, unlimited=False):
+    # Label of the client-side rate limit variant a run measured
+    if unlimited:
+        return 'unlimited'
+    return f'{api_rate:g}/s' if api_rate else 'default'
+
+
+def run_benchmark(scale='small', latency=0.0, throttle_rate=0.0, max_workers=8, eval_workers=1, seed=0, api_rate=None, unlimited=False,
+                  output_path=None):
+    counts = resolve_scale(scale)
+    # Times each phase and records every mock API call, as in a live run
+    profiler = ApiProfiler()
+    with profiler.phase('setup'):
+        account = SyntheticAccount(counts, seed=seed)
+        backend = SyntheticBackend(account, latency=latency, throttle_rate=throttle_rate, seed=seed)
+        session = backend.session(account.regions[0])
+        # The same throttling-aware scheduler and shared context a live run uses, with
+        # the production rates unless api_rate (or the unlimited variant) overrides them
+        rate = UNLIMITED_RATE if unlimited else api_rate
+        overrides = {sid: rate for sid in backend.service_ids()} if rate else None
+        scheduler = CallScheduler(service_rates=overrides, service_ceilings=overrides).install(session)
+        profiler.install(session)
+        context = AwsContext(session=session, max_pool_connections=max(DEFAULT_MAX_POOL_CONNECTIONS, max_workers))
+
+    with profiler.phase('discovery'):
+        scanner = Scanner(max_workers=max_workers, regions=account.regions, context=context)
+        resources = scanner.discover_resources()
+
+    with profiler.phase('evaluation'):
+        findings = evaluate_all_rules(resources, workers=eval_workers)
+
+    # The previous run's state for a repeat (--incremental) scan of the unchanged account
+    previous = IncrementalEvaluator()
+    previous.evaluate(resources)
+    with profiler.phase('incremental'):
+        IncrementalEvaluator(previous.state(account.account_id)).evaluate(resources)
+
+    with profiler.phase('cost_analysis'):
+        end = account.end_date
+        month_start = end.replace(day=1)
+        last_month_start = (month_start - timedelta(days=1)).replace(day=1)
+        cost_data = cost_mod.get_cost_and_usage(str(end - timedelta(days=counts['cost_days'])), str(end), granularity='DAILY',
+                                                session=context, account_id=account.account_id, today=end)
+        series = cost_mod.cost_time_series(cost_data)
+        analytics = cost_mod.cost_analytics(series, end)
+        df = cost_mod.cost_totals(series, last_month_start, month_start)
+        to_datetime = lambda d: datetime.combine(d, datetime.min.time())
+        recs = cost_mod.generate_recommendations(df, session=context, start_date=to_datetime(last_month_start), end_date=to_datetime(month_start),
+                                                 instances=resources['ec2_instances'], max_workers=max_workers)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = output_path or os.path.join(tmp, 'report.html')
+        with profiler.phase('report'):
+            tabs = [
+                {'id': 'Security', 'title': 'Security Report',
+                 'chunks': ReportGenerator(findings, account.account_id, plotly_js='none').iter_html()},
+                {'id': 'Cost', 'title': 'Cost Report',
+                 'chunks': [cost_mod.generate_html_fragment(df, recs, account_id=account.account_id, analytics=analytics, include_plotlyjs=False)]},
+            ]
+            write_combined_report(path, tabs)
+        report_bytes = os.path.getsize(path)
+
+    return {
+        'timestamp': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'scale': counts,
+        'latency': latency,
+        'throttle_rate': throttle_rate,
+        'max_workers': max_workers,
+        'eval_workers': eval_workers,
+        'seed': seed,
+        'api_rate': api_rate,
+        'rate_limits': rate_limits(api_rate, unlimited),
+        'phases': {name: {k: round(v, 4) for k, v in stat.items()} for name, stat in profiler.phases.items()},
+        'counts': dict(account.counts(), findings=len(findings), recommendations=len(recs), anomalies=len(analytics['anomalies']),
+                       api_calls=sum(backend.calls.values()), injected_throttles=sum(backend.throttles.values()),
+                       retries=sum(s['retries'] for s in scheduler.stats.values()), report_bytes=report_bytes),
+        'apis': [{k: api[k] for k in ('service', 'operation', 'calls', 'errors', 'retries', 'throttles', 'seconds', 'mean_ms', 'histogram')}
+                 for api in profiler.profile()['apis']],
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__), capture_output=True,
+                              text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def history_path(results_dir):
+    return os.path.join(results_dir, 'history.jsonl')
+
+
+def save_result(result, results_dir=DEFAULT_RESULTS_DIR):
+    # Results are appended, one JSON object per run
+    os.makedirs(results_dir, exist_ok=True)
+    with open(history_path(results_dir), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(result, sort_keys=True))
+        f.write('\n')
+
+
+def comparable(a, b):
+    return all(a.get(k) == b.get(k) for k in ('scale', 'latency', 'throttle_rate', 'max_workers', 'eval_workers', 'seed', 'api_rate', 'rate_limits'))
+
+
+def previous_result(result, results_dir=DEFAULT_RESULTS_DIR):
+    # The latest stored run with the same scale and settings
+    path = history_path(results_dir)
+    if not os.path.exists(path):
+        return None
+    previous = None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                stored = json.loads(line)
+                if comparable(stored, result):
+                    previous = stored
+    return previous
+
+
+def compare(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Phases slower than the baseline by more than tolerance: [(phase, before, after)]
+    regressions = []
+    for phase in PHASES:
+        before = baseline['phases'].get(phase, {}).get('seconds')
+        after = result['phases'][phase]['seconds']
+        if before is not None and max(before, after) >= MIN_COMPARED_SECONDS and after > before * (1 + tolerance):
+            regressions.append((phase, before, after))
+    return regressions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the scan pipeline against a synthetic AWS account")
+    parser.add_argument('--scale', choices=sorted(SCALES), default='small', help='Resource count preset (default: small)')
+    for name in SCALES['large']:
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=None, help=f'Override the preset {name} count')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every mock API call')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Probability that a mock API call is throttled')
+    parser.add_argument('--api-rate', type=float, default=None, help='Client-side requests per second per service (default: the production rates)')
+    parser.add_argument('--unlimited', action='store_true', help='Disable client-side rate limits (recorded as a separate variant)')
+    parser.add_argument('--max-workers', type=int, default=8, help='Discovery worker threads')
+    parser.add_argument('--eval-workers', type=int, default=1, help='Rule evaluation processes')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the synthetic account')
+    parser.add_argument('--results-dir', default=DEFAULT_RESULTS_DIR, help='Directory of the results history')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='Allowed slowdown per phase before it is reported as a regression')
+    parser.add_argument('--no-save', action='store_true', help='Do not append this run to the results history')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 when a phase regressed')
+    parser.add_argument('--report', default=None, help='Keep the rendered HTML report at this path')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    scale = resolve_scale(args.scale, **{name: getattr(args, name) for name in SCALES['large']})
+    result = run_benchmark(scale, latency=args.latency, throttle_rate=args.throttle_rate, max_workers=args.max_workers,
+                           eval_workers=args.eval_workers, seed=args.seed, api_rate=args.api_rate, unlimited=args.unlimited,
+                           output_path=args.report)
+    print(f"Rate limits: {result['rate_limits']}")
+    print(f"Scale: {', '.join(f'{k}={v}' for k, v in result['scale'].items())}")
+    for phase in ('setup',) + PHASES:
+        stat = result['phases'][phase]
+        print(f"{phase:<14} {stat['seconds']:>9.3f}s wall {stat['cpu_seconds']:>9.3f}s cpu")
+    counts = result['counts']
+    print(f"{counts['findings']} findings, {counts['api_calls']} API calls, {counts['injected_throttles']} throttled, {counts['report_bytes']} report bytes")
+    for api in result['apis'][:TOP_APIS]:
+        print(f"  {api['service']}.{api['operation']}: {api['calls']} calls, {api['seconds']:.3f}s total, {api['mean_ms']:.2f}ms mean")
+    baseline = previous_result(result, args.results_dir)
+    regressions = compare(result, baseline, args.tolerance) if baseline else []
+    for phase, before, after in regressions:
+        print(f"[WARNING] {phase} regressed: {before:.3f}s -> {after:.3f}s (baseline {baseline['commit'] or baseline['timestamp']})")
+    if not args.no_save:
+        save_result(result, args.results_dir)
+        print(f"[INFO] Result appended to {history_path(args.results_dir)}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# synthetic.py: Deterministic synthetic AWS accounts at configurable scale
+import random
+from datetime import datetime, timedelta, timezone
+import numpy as np
+
+# Resource counts per preset; 'large' is the release benchmark
+SCALES = {
+    'tiny': dict(regions=2, instances=20, security_group_rules=100, buckets=10, users=20, functions=5, db_instances=5, cost_days=60, cost_services=4),
+    'small': dict(regions=2, instances=500, security_group_rules=2500, buckets=250, users=500, functions=100, db_instances=50, cost_days=120, cost_services=10),
+    'medium': dict(regions=4, instances=2000, security_group_rules=10000, buckets=1000, users=2000, functions=500, db_instances=200, cost_days=365, cost_services=15),
+    'large': dict(regions=4, instances=10000, security_group_rules=50000, buckets=5000, users=10000, functions=2000, db_instances=500, cost_days=365, cost_services=20),
+}
+ACCOUNT_ID = '123456789012'
+REGIONS = ('us-east-1', 'us-west-2', 'eu-west-1', 'ap-southeast-2', 'eu-central-1', 'ap-northeast-1', 'sa-east-1', 'ca-central-1')
+COST_SERVICES = (
+    'Amazon Elastic Compute Cloud - Compute', 'Amazon Simple Storage Service', 'Amazon Relational Database Service',
+    'AWS Lambda', 'Amazon CloudWatch', 'Amazon Elastic Container Service', 'Amazon Elastic Kubernetes Service',
+    'Amazon DynamoDB', 'Amazon CloudFront', 'Amazon Virtual Private Cloud',
+)
+RULES_PER_GROUP = 10
+# Execution roles shared by the Lambda functions
+LAMBDA_ROLES = 50
+INSTANCES_PER_RESERVATION = 4
+# Share of resources generated in a non-compliant state
+EXPOSED_SHARE = 0.05
+# Hourly CPU datapoints served per instance by GetMetricData
+METRIC_HOURS = 24 * 30
+PUBLIC_ACL_GRANT = {'Grantee': {'Type': 'Group', 'URI': 'http://acs.amazonaws.com/groups/global/AllUsers'}, 'Permission': 'READ'}
+CREDENTIAL_REPORT_HEADER = ('user,arn,user_creation_time,password_enabled,mfa_active,access_key_1_active,access_key_1_last_rotated,'
+                            'access_key_1_last_used_date,access_key_2_active,access_key_2_last_rotated,access_key_2_last_used_date\n')
+
+
+def resolve_scale(scale, **overrides):
+    # A preset name or a dict of counts; explicit overrides win
+    counts = dict(SCALES[scale] if isinstance(scale, str) else scale)
+    counts.update({k: v for k, v in overrides.items() if v is not None})
+    unknown = set(counts) - set(SCALES['large'])
+    if unknown:
+        raise ValueError(f"Unknown scale parameters: {', '.join(sorted(unknown))}")
+    return counts
+
+
+class SyntheticAccount:
+    def __init__(self, scale='small', seed=0, end_date=None, account_id=ACCOUNT_ID):
+        self.scale = resolve_scale(scale)
+        self.seed = seed
+        self.account_id = account_id
+        # Cost history ends (exclusive) on end_date
+        self.end_date = end_date or datetime.now(timezone.utc).date()
+        self.regions = list(REGIONS[:self.scale['regions']])
+        rng = random.Random(seed)
+        self.security_groups = self._security_groups(rng)
+        self.reservations = self._reservations(rng)
+        self.vpcs = {region: [{'VpcId': f'vpc-{region}', 'CidrBlock': '10.0.0.0/16', 'IsDefault': True}] for region in self.regions}
+        self.buckets, self.bucket_settings = self._buckets(rng)
+        self.credential_report = self._credential_report(rng)
+        self.functions = self._spread(rng, self.scale['functions'], lambda i, region: {
+            'FunctionName': f'function-{i:05d}',
+            'FunctionArn': f'arn:aws:lambda:{region}:{account_id}:function:function-{i:05d}',
+            'Runtime': 'python3.12',
+            'Role': f'arn:aws:iam::{account_id}:role/lambda-role-{i % LAMBDA_ROLES:02d}',
+        })
+        self.roles, self.managed_policies = self._roles(rng)
+        self.db_instances = self._spread(rng, self.scale['db_instances'], lambda i, region: {
+            'DBInstanceIdentifier': f'db-{i:05d}',
+            'Engine': 'postgres',
+            'StorageEncrypted': rng.random() > EXPOSED_SHARE,
+        })
+        self.cost_results = self._cost_results(seed)
+
+    def _spread(self, rng, count, make):
+        # {region: [resource]} with resources dealt round-robin across regions
+        by_region = {region: [] for region in self.regions}
+        for i in range(count):
+            region = self.regions[i % len(self.regions)]
+            by_region[region].append(make(i, region))
+        return by_region
+
+    def _roles(self, rng):
+        # Every role attaches the basic execution policy; some add an inline
+        # policy with a wildcard action, a few attach AdministratorAccess
+        basic = 'arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
+        admin = 'arn:aws:iam::aws:policy/AdministratorAccess'
+        managed = {
+            basic: {'Version': '2012-10-17', 'Statement': [{'Effect': 'Allow', 'Resource': '*', 'Action': [
+                'logs:CreateLogGroup', 'logs:CreateLogStream', 'logs:PutLogEvents']}]},
+            admin: {'Version': '2012-10-17', 'Statement': [{'Effect': 'Allow', 'Action': '*', 'Resource': '*'}]},
+        }
+        roles = {}
+        for i in range(LAMBDA_ROLES):
+            draw = rng.random()
+            attached = [basic, admin] if draw < EXPOSED_SHARE else [basic]
+            inline = {}
+            if draw > 1 - 4 * EXPOSED_SHARE:
+                inline['data-access'] = {'Version': '2012-10-17', 'Statement': [{'Effect': 'Allow', 'Action': 's3:*', 'Resource': '*'}]}
+            roles[f'lambda-role-{i:02d}'] = {'AttachedPolicies': attached, 'InlinePolicies': inline}
+        return roles, managed
+
+    def _security_groups(self, rng):
+        def make(i, region):
+            permissions = []
+            for n in range(RULES_PER_GROUP):
+                port = rng.choice((22, 80, 443, 3306, 3389, 5432, 8080))
+                cidr = '0.0.0.0/0' if rng.random() < EXPOSED_SHARE else f'10.{rng.randrange(256)}.{rng.randrange(256)}.0/24'
+                permissions.append({'IpProtocol': 'tcp', 'FromPort': port, 'ToPort': port + (n % 3),
+                                    'IpRanges': [{'CidrIp': cidr}], 'Ipv6Ranges': [], 'UserIdGroupPairs': []})
+            return {'GroupId': f'sg-{i:08x}', 'GroupName': f'group-{i}', 'VpcId': f'vpc-{region}', 'IpPermissions': permissions}
+        groups = -(-self.scale['security_group_rules'] // RULES_PER_GROUP)
+        return self._spread(rng, groups, make)
+
+    def _reservations(self, rng):
+        reservations = {region: [] for region in self.regions}
+        for i in range(self.scale['instances']):
+            region = self.regions[i % len(self.regions)]
+            groups = self.security_groups[region]
+            instance = {
+                'InstanceId': f'i-{i:017x}',
+                'InstanceType': rng.choice(('t3.micro', 't3.large', 'm5.xlarge', 'c5.2xlarge')),
+                'State': {'Name': 'running'},
+                'PrivateIpAddress': f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}',
+                'SecurityGroups': [{'GroupId': groups[rng.randrange(len(groups))]['GroupId']}] if groups else [],
+            }
+            if rng.random() < EXPOSED_SHARE:
+                instance['PublicIpAddress'] = f'198.51.{(i >> 8) & 255}.{i & 255}'
+            region_reservations = reservations[region]
+            if not region_reservations or len(region_reservations[-1]['Instances']) == INSTANCES_PER_RESERVATION:
+                region_reservations.append({'ReservationId': f'r-{i:017x}', 'OwnerId': self.account_id, 'Instances': []})
+            region_reservations[-1]['Instances'].append(instance)
+        return reservations
+
+    def _buckets(self, rng):
+        created = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        buckets, settings = [], {}
+        for i in range(self.scale['buckets']):
+            name = f'bucket-{i:06d}'
+            buckets.append({'Name': name, 'CreationDate': created, 'BucketRegion': self.regions[i % len(self.regions)]})
+            grants = [{'Grantee': {'Type': 'CanonicalUser', 'ID': 'owner'}, 'Permission': 'FULL_CONTROL'}]
+            if rng.random() < EXPOSED_SHARE:
+                grants.append(PUBLIC_ACL_GRANT)
+            settings[name] = {
+                'acl': {'Owner': {'ID': 'owner'}, 'Grants': grants},
+                # None means "not configured" and is served as the service's missing-configuration error
+                'policy': '{"Version":"2012-10-17","Statement":[]}' if i % 3 == 0 else None,
+                'public_access_block': {'BlockPublicAcls': True, 'IgnorePublicAcls': True, 'BlockPublicPolicy': True,
+                                        'RestrictPublicBuckets': True} if i % 2 == 0 else None,
+                'encryption': {'Rules': [{'ApplyServerSideEncryptionByDefault': {'SSEAlgorithm': 'AES256'}}]},
+            }
+        return buckets, settings
+
+    def _credential_report(self, rng):
+        now = datetime.now(timezone.utc)
+        iso = lambda days: (now - timedelta(days=days)).strftime('%Y-%m-%dT%H:%M:%S+00:00')
+        lines = [CREDENTIAL_REPORT_HEADER,
+                 f'<root_account>,arn:aws:iam::{self.account_id}:root,{iso(2000)},not_supported,true,false,N/A,N/A,false,N/A,N/A\n']
+        for i in range(self.scale['users']):
+            mfa = 'true' if rng.random() > EXPOSED_SHARE * 4 else 'false'
+            # Roughly a fifth of keys have not been used for over 90 days
+            rotated, used = rng.randrange(30, 900), rng.randrange(0, 120)
+            lines.append(f'user-{i:06d},arn:aws:iam::{self.account_id}:user/user-{i:06d},{iso(1000)},true,{mfa},'
+                         f'true,{iso(rotated)},{iso(min(used, rotated))},false,N/A,N/A\n')
+        return ''.join(lines).encode('utf-8')
+
+    def _cost_results(self, seed):
+        # Daily ResultsByTime with SERVICE x REGION groups: a per-pair base cost with
+        # weekly seasonality, noise and a few injected spikes for the anomaly detector
+        rng = np.random.default_rng(seed)
+        services = [COST_SERVICES[i] if i < len(COST_SERVICES) else f'Synthetic Service {i:02d}'
+                    for i in range(self.scale['cost_services'])]
+        pairs = [(s, r) for s in services for r in self.regions]
+        days = self.scale['cost_days']
+        base = rng.uniform(1, 200, len(pairs))
+        weekly = 1 + 0.1 * np.sin(np.arange(days) * 2 * np.pi / 7)
+        costs = base[None, :] * weekly[:, None] * rng.normal(1, 0.03, (days, len(pairs)))
+        spikes = rng.integers(0, days, max(1, len(pairs) // 10))
+        costs[spikes, rng.integers(0, len(pairs), len(spikes))] *= 4
+        start = self.end_date - timedelta(days=days)
+        results = []
+        for d in range(days):
+            day = start + timedelta(days=d)
+            results.append({
+                'TimePeriod': {'Start': day.isoformat(), 'End': (day + timedelta(days=1)).isoformat()},
+                'Total': {},
+                'Groups': [{'Keys': [s, r], 'Metrics': {'UnblendedCost': {'Amount': f'{costs[d, p]:.6f}', 'Unit': 'USD'}}}
+                           for p, (s, r) in enumerate(pairs)],
+                'Estimated': False,
+            })
+        return results
+
+    def cpu_values(self, instance_id, hours=METRIC_HOURS):
+        # Hourly average CPU: every tenth instance is mostly idle
+        number = int(instance_id[2:], 16)
+        rng = np.random.default_rng(number + self.seed)
+        level = 2.0 if number % 10 == 0 else 35.0
+        return np.clip(rng.normal(level, 3.0, hours), 0, 100).round(2).tolist()
+
+    def counts(self):
+        return {
+            'instances': sum(len(r['Instances']) for rs in self.reservations.values() for r in rs),
+            'security_groups': sum(len(g) for g in self.security_groups.values()),
+            'security_group_rules': sum(len(g['IpPermissions']) for gs in self.security_groups.values() for g in gs),
+            'buckets': len(self.buckets),
+            'users': self.scale['users'],
+            'functions': sum(len(f) for f in self.functions.values()),
+            'db_instances': sum(len(d) for d in self.db_instances.values()),
+            'cost_groups': sum(len(r['Groups']) for r in self.cost_results),
+        }
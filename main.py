@@ -1,89 +1,351 @@
+# Heavy dependencies (boto3, pandas, plotly, jinja2) are imported inside the
+# phases that use them, so --help and single-phase runs start quickly
 import argparse
-from aws_security_scan.scanner import Scanner
-from aws_security_scan.report import ReportGenerator
-from aws_security_scan.permission_check import check_permissions
-import boto3
-import sys
-import importlib.util
 import os
+import sys
+from datetime import datetime, timedelta
+
+FINDING_EXPORT_FORMATS = ('jsonl', 'parquet')
+# Slowest APIs listed on the console after a run
+PROFILE_TOP_APIS = 5
+
+def split_list(value):
+    # Comma-separated CLI value -> list (None when not given)
+    if value is None:
+        return None
+    return [v.strip() for v in value.split(',') if v.strip()]
 
-def main():
+def build_parser():
     parser = argparse.ArgumentParser(description="AWS Security & Best Practices Reporting Tool")
     parser.add_argument('--profile', type=str, help='AWS CLI profile name', default=None)
     parser.add_argument('--output', type=str, help='Output HTML report file', default='reports/report.html')
-    args = parser.parse_args()
+    parser.add_argument('--regions', type=str, help="Regions to scan: 'all' for every enabled region, or a comma-separated list", default=None)
+    parser.add_argument('--stream', action='store_true', help='Stream paginated resources into rule evaluation instead of loading them all first')
+    parser.add_argument('--enable-rules', type=str, help='Comma-separated rule IDs or groups to run (default: all)', default=None)
+    parser.add_argument('--disable-rules', type=str, help='Comma-separated rule IDs or groups to skip', default=None)
+    parser.add_argument('--snapshot-dir', type=str, help='Directory for discovery snapshots; each live scan saves one here', default=None)
+    parser.add_argument('--from-snapshot', type=str, help="Evaluate a saved snapshot (path, or 'latest' in --snapshot-dir) without calling AWS", default=None)
+    parser.add_argument('--max-age', type=str, help='Maximum snapshot age to reuse, e.g. 30m, 6h, 2d', default=None)
+    parser.add_argument('--keep-snapshots', type=int, help='Snapshots kept per account and region set in --snapshot-dir; older ones are deleted (0 = keep all, default: 10)', default=None)
+    parser.add_argument('--incremental', action='store_true', help='Only evaluate resources changed since the previous run (state kept in --snapshot-dir)')
+    parser.add_argument('--org', action='store_true', help='Scan every active account of the AWS Organization')
+    parser.add_argument('--accounts', type=str, help='Comma-separated account IDs to scan (implies organization mode)', default=None)
+    parser.add_argument('--role-name', type=str, help='Role assumed in each member account (default: OrganizationAccountAccessRole)', default=None)
+    parser.add_argument('--max-accounts', type=int, help='Accounts scanned in parallel in organization mode', default=4)
+    parser.add_argument('--max-workers', type=int, help='Maximum number of service collectors run concurrently', default=8)
+    parser.add_argument('--cost-months', type=int, help='Months of daily cost history used for trends and anomaly detection', default=12)
+    parser.add_argument('--cur-path', type=str, help='Exported Cost and Usage Report file or directory (gzip CSV or Parquet) for per-resource costs', default=None)
+    parser.add_argument('--cost-cache-dir', type=str, help='Directory caching Cost Explorer results for closed months', default='.cost-cache')
+    parser.add_argument('--export-findings', type=str, help='Comma-separated finding export formats written next to the report: jsonl, parquet', default=None)
+    parser.add_argument('--offline-charts', action='store_true', help='Embed the chart library once in the report instead of loading it from a CDN')
+    parser.add_argument('--diagnostics', action='store_true', help='Add a Scan Diagnostics tab with per-API call statistics and phase timings to the report')
+    parser.add_argument('--history-db', type=str, help='SQLite file each run appends its findings and cost aggregates to; adds a History tab with trends', default=None)
+    parser.add_argument('--eval-workers', type=int, help='Processes used to evaluate rules over large inventories (1 = serial)', default=1)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--security-only', action='store_true', help='Run only the security scan (no cost report)')
+    mode.add_argument('--cost-only', action='store_true', help='Run only the cost report (no security scan)')
+    return parser
 
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    enabled_rules = split_list(args.enable_rules)
+    disabled_rules = split_list(args.disable_rules)
+    if not args.cost_only:
+        from aws_security_scan.rules import select_rules
+        try:
+            select_rules(enabled_rules, disabled_rules)
+        except ValueError as e:
+            print(f"[FATAL] {e}")
+            sys.exit(1)
 
-    # Prepare session for permission check
-    if args.profile:
-        session = boto3.Session(profile_name=args.profile)
-    else:
-        session = boto3.Session()
+    export_formats = split_list(args.export_findings) or []
+    unknown_formats = sorted(set(export_formats) - set(FINDING_EXPORT_FORMATS))
+    if unknown_formats:
+        print(f"[FATAL] Unknown finding export formats: {', '.join(unknown_formats)}")
+        sys.exit(1)
+
+    org_mode = bool(args.org or args.accounts)
+    if args.cost_only and (org_mode or args.snapshot_dir or args.from_snapshot or args.incremental or export_formats):
+        print("[FATAL] --cost-only cannot be combined with organization, snapshot, incremental or finding export options.")
+        sys.exit(1)
+
+    if org_mode and (args.snapshot_dir or args.from_snapshot or args.incremental):
+        print("[FATAL] --org/--accounts cannot be combined with snapshot or incremental options.")
+        sys.exit(1)
 
-    # Check permissions before running scan
-    if not check_permissions(session):
-        print("[FATAL] Insufficient AWS permissions for security scan and/or cost explorer. Exiting.")
+    if args.incremental and not args.snapshot_dir:
+        print("[FATAL] --incremental requires --snapshot-dir.")
+        sys.exit(1)
+
+    if args.max_age and not args.snapshot_dir:
+        print("[FATAL] --max-age requires --snapshot-dir.")
+        sys.exit(1)
+    if args.keep_snapshots is not None and not args.snapshot_dir:
+        print("[FATAL] --keep-snapshots requires --snapshot-dir.")
+        sys.exit(1)
+    if args.keep_snapshots is not None and args.keep_snapshots < 0:
+        print("[FATAL] --keep-snapshots must be 0 or more.")
         sys.exit(1)
 
-    scanner = Scanner(profile=args.profile)
-    findings, account_id = scanner.run_all_checks()
+    max_age = None
+    if args.max_age:
+        from aws_security_scan.snapshot import parse_age
+        try:
+            max_age = parse_age(args.max_age)
+        except ValueError as e:
+            print(f"[FATAL] {e}")
+            sys.exit(1)
 
-    # Generate security report HTML fragment
-    report = ReportGenerator(findings, account_id)
-    security_html = report.generate_html_string()
+    from aws_security_scan.instrumentation import ApiProfiler
+    # Per-API call statistics and wall/CPU time per phase, written next to the report
+    profiler = ApiProfiler()
 
-    # Dynamically import cost report module from reports/
-    cost_report_path = os.path.join(os.path.dirname(__file__), 'reports', 'aws_cost_report.py')
-    spec = importlib.util.spec_from_file_location('aws_cost_report', cost_report_path)
-    cost_mod = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(cost_mod)
+    # Offline mode: evaluate rules and render the report from a saved snapshot, with no AWS calls
+    snapshot = None
+    # When the scanned state was observed: now, or when the snapshot was taken
+    scanned_at = None
+    if args.from_snapshot:
+        from aws_security_scan.snapshot import find_latest_snapshot, load_snapshot, snapshot_time
+        snapshot_path = args.from_snapshot
+        if snapshot_path == 'latest':
+            if not args.snapshot_dir:
+                print("[FATAL] --from-snapshot latest requires --snapshot-dir.")
+                sys.exit(1)
+            snapshot_path = find_latest_snapshot(args.snapshot_dir, max_age=max_age)
+            if snapshot_path is None:
+                print(f"[FATAL] No usable snapshot found in {args.snapshot_dir}.")
+                sys.exit(1)
+        with profiler.phase('snapshot_load'):
+            snapshot = load_snapshot(snapshot_path)
+        scanned_at = snapshot_time(snapshot_path)
+        print(f"[INFO] Using snapshot {snapshot_path} ({snapshot['created_at']})")
 
-    # Prepare session for cost report (already created above)
+    context = None
+    scheduler = None
+    if snapshot is None:
+        import boto3
+        from aws_security_scan.context import DEFAULT_MAX_POOL_CONNECTIONS, AwsContext
+        from aws_security_scan.permission_check import check_permissions
+        from aws_security_scan.throttle import CallScheduler
+        # Prepare the session shared by every phase of the run
+        if args.profile:
+            session = boto3.Session(profile_name=args.profile)
+        else:
+            session = boto3.Session()
+        # Rate-limit and retry throttled calls of every client created from the session
+        scheduler = CallScheduler().install(session)
+        profiler.install(session)
+        # One context per run: the permission check, scan and cost report share its
+        # clients and caller identity, so every phase targets the same account
+        context = AwsContext(session=session, max_pool_connections=max(DEFAULT_MAX_POOL_CONNECTIONS, args.max_workers))
 
-    today = cost_mod.datetime.utcnow().date()
+        # Check permissions before running scan
+        with profiler.phase('permission_check'):
+            permitted = check_permissions(context, security=not args.cost_only, cost=not args.security_only)
+        if not permitted:
+            print("[FATAL] Insufficient AWS permissions for security scan and/or cost explorer. Exiting.")
+            sys.exit(1)
+
+    tabs = []
+    scanner = findings = account_id = None
+    monthly_costs = []
+    if not args.cost_only:
+        from aws_security_scan.report import ReportGenerator
+        scanner, findings, account_id = run_security_scan(args, context, profiler, snapshot, max_age, org_mode, enabled_rules, disabled_rules)
+        # Generate security report HTML fragment
+        if org_mode:
+            report = ReportGenerator(findings, account_id, account_errors=scanner.failed_accounts(), plotly_js='none')
+        else:
+            report = ReportGenerator(findings, account_id, delta=scanner.delta, plotly_js='none')
+        tabs.append({'id': 'Security', 'title': 'Security Report', 'chunks': report.iter_html()})
+
+    if not args.security_only and snapshot is not None:
+        tabs.append({'id': 'Cost', 'title': 'Cost Report',
+                     'chunks': ['<h2>AWS Cost Report</h2><p>Cost data is not available when reporting from a snapshot.</p>']})
+    elif not args.security_only:
+        # Reuse the scanner's instance inventory (with --stream, the instance IDs
+        # recorded while the rules consumed it). Organization scans skip idle
+        # analysis: CPU metrics live in each member account.
+        if args.cost_only:
+            instances = None
+        elif org_mode:
+            instances = []
+        else:
+            instances = scanner.instance_inventory()
+        with profiler.phase('cost_report'):
+            cost_html, monthly_costs = run_cost_report(args, context, instances)
+            tabs.append({'id': 'Cost', 'title': 'Cost Report', 'chunks': [cost_html]})
+    if args.history_db:
+        with profiler.phase('history'):
+            history = record_history(args, context, scanner, findings, account_id, monthly_costs, scanned_at, org_mode, enabled_rules, disabled_rules)
+        history_account = None if org_mode else (account_id or context.account_id)
+        tabs.append({'id': 'History', 'title': 'History', 'chunks': render_later(lambda: render_history(history, history_account))})
+    if args.diagnostics:
+        # Rendered last, so it covers every phase up to report rendering itself
+        tabs.append({'id': 'Diagnostics', 'title': 'Scan Diagnostics', 'chunks': render_later(profiler.diagnostics_html)})
+
+    # Combine the reports in a tabbed HTML page, streamed straight to the output file
+    from aws_security_scan.report import write_combined_report
+    with profiler.phase('report'):
+        write_combined_report(args.output, tabs, plotly_js='embed' if args.offline_charts else 'cdn')
+    print(f"Combined report generated: {args.output}")
+    # Machine-readable findings (e.g. for SIEM ingestion) next to the HTML report
+    if export_formats:
+        from aws_security_scan.finding import export_jsonl, export_parquet
+        exporters = {'jsonl': export_jsonl, 'parquet': export_parquet}
+        with profiler.phase('export'):
+            for fmt in export_formats:
+                path = f"{os.path.splitext(args.output)[0]}.findings.{fmt}"
+                count = exporters[fmt](findings, path)
+                print(f"[INFO] Exported {count} findings to {path}")
+    if scheduler is not None:
+        for api, stat in scheduler.throttle_summary().items():
+            print(f"[INFO] {api} was throttled {stat['throttles']} times ({stat['retries']} retries)")
+    profile_path = f"{os.path.splitext(args.output)[0]}.profile.json"
+    profiler.write_profile(profile_path)
+    profile = profiler.profile()
+    for phase in profile['phases']:
+        print(f"[INFO] Phase {phase['name']}: {phase['seconds']:.2f}s wall, {phase['cpu_seconds']:.2f}s CPU")
+    for api in profile['apis'][:PROFILE_TOP_APIS]:
+        print(f"[INFO] API {api['service']}.{api['operation']}: {api['calls']} calls, {api['seconds']:.2f}s total, {api['mean_ms']:.0f}ms mean")
+    print(f"[INFO] Run profile written to {profile_path}")
+
+def render_later(render):
+    # A report tab chunk produced only when the template reaches it
+    yield render()
+
+def run_security_scan(args, context, profiler, snapshot, max_age, org_mode, enabled_rules, disabled_rules):
+    # Discovery and rule evaluation; returns (scanner, findings, account_id)
+    from aws_security_scan.delta import load_state, save_state, state_path
+    from aws_security_scan.scanner import Scanner
+    from aws_security_scan.snapshot import DEFAULT_KEEP_SNAPSHOTS, find_latest_snapshot, load_snapshot, prune_snapshots, save_snapshot
+    state_file = None
+    scan_kwargs = dict(stream=args.stream, enabled_rules=enabled_rules, disabled_rules=disabled_rules, eval_workers=args.eval_workers)
+    if snapshot is not None:
+        scanner = Scanner(account_id=snapshot['account_id'], profiler=profiler)
+        if args.incremental:
+            state_file = state_path(args.snapshot_dir, snapshot['account_id'], snapshot['regions'])
+            scan_kwargs.update(incremental=True, previous_state=load_state(state_file))
+        findings, account_id = scanner.run_all_checks(resources=snapshot['resources'], **scan_kwargs)
+    else:
+        regions = args.regions if args.regions in (None, 'all') else split_list(args.regions)
+        if org_mode:
+            from aws_security_scan.organization import DEFAULT_ROLE_NAME, OrganizationScanner, list_member_accounts
+            from aws_security_scan.throttle import CallScheduler
+            account_ids = split_list(args.accounts) if args.accounts else list_member_accounts(context)
+
+            def configure_member_session(session):
+                # Member accounts get their own rate limits; their calls are profiled with the rest of the run
+                CallScheduler().install(session)
+                profiler.install(session)
+
+            scanner = OrganizationScanner(context, account_ids, role_name=args.role_name or DEFAULT_ROLE_NAME, max_accounts=args.max_accounts,
+                                          scanner_kwargs=dict(max_workers=args.max_workers, regions=regions),
+                                          configure_session=configure_member_session)
+            # Accounts are scanned concurrently, so discovery and evaluation are timed as one phase
+            with profiler.phase('security_scan'):
+                findings = scanner.run_all_checks(**scan_kwargs)
+            account_id = f"Organization ({len(account_ids)} accounts)"
+        else:
+            scanner = Scanner(max_workers=args.max_workers, regions=regions, context=context, profiler=profiler)
+            if args.incremental:
+                state_file = state_path(args.snapshot_dir, scanner.account_id, scanner.resolve_regions())
+                scan_kwargs.update(incremental=True, previous_state=load_state(state_file))
+            # Reuse a fresh enough snapshot of this account/regions instead of rediscovering
+            cached = None
+            if args.snapshot_dir and max_age is not None:
+                cached = find_latest_snapshot(args.snapshot_dir, scanner.account_id, scanner.resolve_regions(), max_age=max_age)
+            if cached:
+                print(f"[INFO] Reusing snapshot {cached} (younger than {args.max_age})")
+                findings, account_id = scanner.run_all_checks(resources=load_snapshot(cached)['resources'], **scan_kwargs)
+            else:
+                findings, account_id = scanner.run_all_checks(**scan_kwargs)
+                if args.snapshot_dir:
+                    if args.stream:
+                        print("[WARNING] Snapshots are not saved in --stream mode (resources are consumed while evaluating).")
+                    else:
+                        path = save_snapshot(scanner.resources, account_id, args.snapshot_dir)
+                        print(f"[INFO] Saved discovery snapshot: {path}")
+                        keep = DEFAULT_KEEP_SNAPSHOTS if args.keep_snapshots is None else args.keep_snapshots
+                        pruned = prune_snapshots(args.snapshot_dir, account_id, scanner.resources.get('regions', []), keep)
+                        if pruned:
+                            print(f"[INFO] Deleted {len(pruned)} snapshots older than the newest {keep}")
+    if state_file:
+        save_state(state_file, scanner.incremental_state)
+        delta = scanner.delta
+        carried = sum(stat.get('carried', 0) for stat in scanner.rule_stats.values())
+        print(f"[INFO] Incremental scan: {len(delta['new'])} new, {len(delta['resolved'])} resolved, "
+              f"{len(delta['unchanged'])} unchanged findings; {carried} unchanged resources carried forward")
+    if org_mode:
+        for acct in scanner.account_ids:
+            result = scanner.results[acct]
+            if result['error']:
+                print(f"[WARNING] Account {acct} was not scanned: {result['error']}")
+            else:
+                print(f"[INFO] Account {acct}: {result['findings']} findings in {result['seconds']:.1f}s")
+    else:
+        print(f"[INFO] Scanned regions: {', '.join(scanner.last_regions)}")
+        for name, seconds in sorted(scanner.timings.items(), key=lambda t: -t[1]):
+            print(f"[INFO] Collector {name} took {seconds:.2f}s")
+        for rule_id, stat in sorted(scanner.rule_stats.items(), key=lambda t: -t[1]['seconds']):
+            print(f"[INFO] Rule {rule_id}: {stat['findings']} findings in {stat['seconds']:.3f}s")
+    return scanner, findings, account_id
+
+def record_history(args, context, scanner, findings, account_id, monthly_costs, scanned_at, org_mode, enabled_rules, disabled_rules):
+    # Append this run to the history store. Only what the run covered can resolve
+    # earlier findings: the accounts scanned successfully, the rules evaluated and
+    # the regions scanned
+    from aws_security_scan.history import HistoryStore
+    history = HistoryStore(args.history_db)
+    kwargs = dict(scanned_at=scanned_at, source='snapshot' if args.from_snapshot else 'scan')
+    if findings is not None:
+        if org_mode:
+            from aws_security_scan.rules import select_rules
+            # Each member account resolves its own default or enabled regions
+            scanned = [a for a in scanner.account_ids if not scanner.results[a]['error']]
+            kwargs.update(account_ids=scanned, regions={a: scanner.results[a]['regions'] for a in scanned},
+                          rules=[r.rule_id for r in select_rules(enabled_rules, disabled_rules)])
+        else:
+            kwargs.update(account_ids=[account_id], regions=scanner.last_regions, rules=list(scanner.rule_stats))
+    if monthly_costs:
+        kwargs['costs'] = [(context.account_id, month, service, region, cost) for month, service, region, cost in monthly_costs]
+    run_id = history.record_run(findings, **kwargs)
+    print(f"[INFO] Recorded run {run_id} in history database {args.history_db}")
+    return history
+
+def render_history(history, account_id):
+    from aws_security_scan.report import history_html
+    try:
+        return history_html(history.open_findings_over_time(account_id), history.time_to_remediate(account_id), history.cost_trend(account_id))
+    finally:
+        history.close()
+
+def run_cost_report(args, context, instances):
+    # Cost analysis for last month plus daily history; returns the cost tab HTML
+    # and monthly cost aggregates [(month, service, region, cost)]
+    from reports import aws_cost_report as cost_mod
+    today = datetime.utcnow().date()
     first = today.replace(day=1)
-    last_month_end = first - cost_mod.timedelta(days=1)
+    last_month_end = first - timedelta(days=1)
     last_month_start = last_month_end.replace(day=1)
-    cost_data = cost_mod.get_cost_and_usage(str(last_month_start), str(last_month_end + cost_mod.timedelta(days=1)), session=session)
-    df = cost_mod.analyze_costs(cost_data)
-    recs = cost_mod.generate_recommendations(df, session=session, start_date=cost_mod.datetime.combine(last_month_start, cost_mod.datetime.min.time()), end_date=cost_mod.datetime.combine(last_month_end + cost_mod.timedelta(days=1), cost_mod.datetime.min.time()))
-    cost_html = cost_mod.generate_html_fragment(df, recs)
-
-    # Combine both reports in a tabbed HTML page
-    html = f'''
-    <html><head><title>AWS Security & Cost Report</title>
-    <style>
-    .tab {{ overflow: hidden; border-bottom: 1px solid #ccc; }}
-    .tab button {{ background: #f1f1f1; float: left; border: none; outline: none; cursor: pointer; padding: 14px 16px; transition: 0.3s; }}
-    .tab button.active {{ background: #ccc; }}
-    .tabcontent {{ display: none; padding: 20px; }}
-    </style>
-    <script>
-    function openTab(evt, tabName) {{
-      var i, tabcontent, tablinks;
-      tabcontent = document.getElementsByClassName("tabcontent");
-      for (i = 0; i < tabcontent.length; i++) {{ tabcontent[i].style.display = "none"; }}
-      tablinks = document.getElementsByClassName("tablinks");
-      for (i = 0; i < tablinks.length; i++) {{ tablinks[i].className = tablinks[i].className.replace(" active", ""); }}
-      document.getElementById(tabName).style.display = "block";
-      evt.currentTarget.className += " active";
-    }}
-    window.onload = function() {{ document.getElementById('defaultOpen').click(); }}
-    </script>
-    </head><body>
-    <h1>AWS Security & Cost Report</h1>
-    <div class="tab">
-      <button class="tablinks" id="defaultOpen" onclick="openTab(event, 'Security')">Security Report</button>
-      <button class="tablinks" onclick="openTab(event, 'Cost')">Cost Report</button>
-    </div>
-    <div id="Security" class="tabcontent">{security_html}</div>
-    <div id="Cost" class="tabcontent">{cost_html}</div>
-    </body></html>
-    '''
-    os.makedirs(os.path.dirname(args.output), exist_ok=True)
-    with open(args.output, 'w', encoding='utf-8') as f:
-        f.write(html)
-    print(f"Combined report generated: {args.output}")
+    # Daily history for trends and anomalies; closed months come from the cache
+    history_start = first
+    for _ in range(max(1, args.cost_months)):
+        history_start = (history_start - timedelta(days=1)).replace(day=1)
+    cost_data = cost_mod.get_cost_and_usage(str(history_start), str(today), granularity='DAILY', session=context,
+                                          cache_dir=args.cost_cache_dir, account_id=context.account_id)
+    series = cost_mod.cost_time_series(cost_data)
+    analytics = cost_mod.cost_analytics(series, today) if len(series) else None
+    # The cost summary and recommendations cover last month
+    df = cost_mod.cost_totals(series, last_month_start, first) if len(series) else cost_mod.pd.DataFrame()
+    # Per-resource costs from a local CUR export replace the flat EC2 savings estimate
+    resource_costs = None
+    if args.cur_path:
+        resource_costs = cost_mod.read_cur(args.cur_path, last_month_start, first)
+        print(f"[INFO] Loaded CUR costs for {len(resource_costs)} resources from {args.cur_path}")
+    recs = cost_mod.generate_recommendations(df, session=context, start_date=datetime.combine(last_month_start, datetime.min.time()), end_date=datetime.combine(first, datetime.min.time()), instances=instances, max_workers=args.max_workers, resource_costs=resource_costs)
+    html = cost_mod.generate_html_fragment(df, recs, account_id=context.account_id, analytics=analytics, include_plotlyjs=False)
+    return html, cost_mod.monthly_costs(series)
 
 if __name__ == "__main__":
     main()
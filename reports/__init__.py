@@ -0,0 +1 @@
+# reports package: cost analysis and reporting
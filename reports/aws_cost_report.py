@@ -1,10 +1,10 @@
-def generate_html_fragment(df, recs):
+def generate_html_fragment(df, recs, account_id=None, analytics=None, include_plotlyjs='cdn'):
+    # account_id comes from the run's shared AWS context, so the cost tab always
+    # names the account that was actually queried. include_plotlyjs=False when
+    # the enclosing page already loads Plotly
+    account_id = account_id or 'Unknown'
     if df.empty or 'cost' not in df.columns or 'service' not in df.columns:
         # Friendly message if no cost data
-        try:
-            account_id = boto3.client('sts').get_caller_identity()['Account']
-        except Exception:
-            account_id = 'Unknown'
         scan_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
         return f'''
         <h2>AWS Cost Report</h2>
@@ -19,16 +19,11 @@ def generate_html_fragment(df, recs):
     projected_cost = total_cost - sum(r['potential_savings'] for r in recs)
     savings = total_cost - projected_cost
     pie = go.Figure([go.Pie(labels=df['service'], values=df['cost'])])
-    pie_html = pie.to_html(full_html=False, include_plotlyjs='cdn')
+    pie_html = pie.to_html(full_html=False, include_plotlyjs=include_plotlyjs)
     bar = go.Figure()
     bar.add_bar(name='Current', x=['Cost'], y=[total_cost])
     bar.add_bar(name='Optimized', x=['Cost'], y=[projected_cost])
     bar_html = bar.to_html(full_html=False, include_plotlyjs=False)
-    # Get account ID
-    try:
-        account_id = boto3.client('sts').get_caller_identity()['Account']
-    except Exception:
-        account_id = 'Unknown'
     scan_time = datetime.utcnow().strftime('%Y-%m-%d %H:%M UTC')
     template_str = '''
     <h2>AWS Cost Report</h2>
@@ -50,14 +45,32 @@ def generate_html_fragment(df, recs):
     {% if recs|selectattr('service', 'equalto', 'EC2')|list %}
     <table border=1><tr><th>Instance ID</th><th>Idle Hours</th><th>Total Hours</th><th>Recommendation</th></tr>
     {% for r in recs if r.service == 'EC2' %}
-    <tr><td>{{ r.resource_id }}</td><td>{{ r.recommendation.split('(')[1].split('h/')[0] }}</td><td>{{ r.recommendation.split('/')[1].split('h')[0] }}</td><td>{{ r.recommendation }}</td></tr>
+    <tr><td>{{ r.resource_id }}</td><td>{{ r.idle_hours }}</td><td>{{ r.total_hours }}</td><td>{{ r.recommendation }}</td></tr>
     {% endfor %}
     </table>
     {% else %}<p>No idle EC2 instances detected.</p>{% endif %}
+    {% if analytics %}
+    <h3>Cost Trends</h3>
+    {% for title, key, label in [('Month over Month', 'mom', analytics.month.strftime('%Y-%m')), ('Week over Week', 'wow', 'week of ' ~ analytics.week.strftime('%Y-%m-%d'))] %}
+    <h4>{{ title }} ({{ label }})</h4>
+    {% if analytics[key]|length %}
+    <table border=1><tr><th>Service</th><th>Region</th><th>Previous</th><th>Current</th><th>Change</th><th>Change %</th></tr>
+    {% for r in analytics[key].head(10).itertuples() %}<tr><td>{{ r.service }}</td><td>{{ r.region }}</td><td>${{ '%.2f' % r.previous }}</td><td>${{ '%.2f' % r.cost }}</td><td>${{ '%+.2f' % r.change }}</td><td>{{ '%+.1f%%' % r.pct_change if r.pct_change == r.pct_change else 'new' }}</td></tr>{% endfor %}
+    </table>
+    {% else %}<p>No changes.</p>{% endif %}
+    {% endfor %}
+    <h3>Cost Anomalies</h3>
+    {% if analytics.anomalies|length %}
+    <table border=1><tr><th>Date</th><th>Service</th><th>Region</th><th>Cost</th><th>Baseline</th><th>Z-Score</th></tr>
+    {% for r in analytics.anomalies.itertuples() %}<tr><td>{{ r.date.strftime('%Y-%m-%d') }}</td><td>{{ r.service }}</td><td>{{ r.region }}</td><td>${{ '%.2f' % r.cost }}</td><td>${{ '%.2f' % r.baseline }}</td><td>{{ '%.1f' % r.zscore }}</td></tr>{% endfor %}
+    </table>
+    {% else %}<p>No cost anomalies detected.</p>{% endif %}
+    {% endif %}
     <h3>Before vs After Optimization</h3>
     {{ bar_html | safe }}
     <h3>Raw Data</h3>
-    {{ df.to_html(index=False) }}
+    {% if df|length > raw_rows %}<p>Top {{ raw_rows }} of {{ df|length }} service/region rows by cost.</p>{% endif %}
+    {{ df.nlargest(raw_rows, 'cost').to_html(index=False) }}
     '''
     env = jinja2.Environment()
     template = env.from_string(template_str)
@@ -70,45 +83,196 @@ def generate_html_fragment(df, recs):
         recs=recs,
         df=df,
         account_id=account_id,
-        scan_time=scan_time
+        scan_time=scan_time,
+        analytics=analytics,
+        raw_rows=RAW_DATA_ROWS
     )
     return html
 
 import argparse
 import boto3
+import numpy as np
 import pandas as pd
 import plotly.graph_objs as go
+import glob
 import jinja2
+import json
 import os
-from datetime import datetime, timedelta
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+# Rows of the raw cost table embedded in the report
+RAW_DATA_ROWS = 100
 
-# 1. Fetch cost and usage data
-def get_cost_and_usage(start_date, end_date, granularity='MONTHLY', session=None):
+# 1. Fetch cost and usage data. session may be a boto3 Session or the run's
+# AwsContext, whose cached clients are then reused
+COST_GROUP_BY = [{'Type': 'DIMENSION', 'Key': 'SERVICE'}, {'Type': 'DIMENSION', 'Key': 'REGION'}]
+
+def month_windows(start_date, end_date):
+    # Split [start, end) into calendar-month windows of ISO date strings
+    start = date.fromisoformat(str(start_date))
+    end = date.fromisoformat(str(end_date))
+    windows = []
+    while start < end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+        windows.append((start.isoformat(), min(next_month, end).isoformat()))
+        start = next_month
+    return windows
+
+def fetch_cost_window(ce, start_date, end_date, granularity, group_by=COST_GROUP_BY):
+    # One window, following NextPageToken. A period's groups can continue on the
+    # next page, so pages are merged by period start
+    periods = {}
+    kwargs = {
+        'TimePeriod': {'Start': start_date, 'End': end_date},
+        'Granularity': granularity,
+        'Metrics': ['UnblendedCost'],
+        'GroupBy': group_by,
+    }
+    while True:
+        response = ce.get_cost_and_usage(**kwargs)
+        for result in response['ResultsByTime']:
+            period = periods.setdefault(result['TimePeriod']['Start'], dict(result, Groups=[]))
+            period['Groups'].extend(result.get('Groups', []))
+        if not response.get('NextPageToken'):
+            return [periods[k] for k in sorted(periods)]
+        kwargs['NextPageToken'] = response['NextPageToken']
+
+def cost_cache_path(cache_dir, account_id, start_date, end_date, granularity, group_by):
+    groups = '-'.join(g['Key'] for g in group_by).lower()
+    return os.path.join(cache_dir, str(account_id or 'default'), f'{granularity.lower()}-{groups}-{start_date}_{end_date}.json')
+
+def get_cost_and_usage(start_date, end_date, granularity='MONTHLY', session=None, cache_dir=None, account_id=None,
+                       max_workers=4, today=None, group_by=COST_GROUP_BY):
+    # Long ranges are split into monthly windows fetched concurrently. With
+    # cache_dir, closed months (which Cost Explorer never revises) are stored on
+    # disk and reused, so only the current month is downloaded again; every
+    # request Cost Explorer does not see is one it does not bill
     if session is None:
         session = boto3.Session()
     ce = session.client('ce')
-    response = ce.get_cost_and_usage(
-        TimePeriod={'Start': start_date, 'End': end_date},
-        Granularity=granularity,
-        Metrics=['UnblendedCost'],
-        GroupBy=[{'Type': 'DIMENSION', 'Key': 'SERVICE'}, {'Type': 'DIMENSION', 'Key': 'REGION'}]
-    )
-    return response
+    current_month = (today or datetime.utcnow().date()).replace(day=1)
+
+    def fetch(window):
+        path = cost_cache_path(cache_dir, account_id, *window, granularity, group_by) if cache_dir else None
+        closed = date.fromisoformat(window[1]) <= current_month
+        if path and closed and os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        results = fetch_cost_window(ce, *window, granularity, group_by)
+        if path and closed:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f)
+            os.replace(tmp_path, path)
+        return results
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        results = [r for window_results in pool.map(fetch, month_windows(start_date, end_date)) for r in window_results]
+    return {'ResultsByTime': results}
+
+# 2. Analyze costs: a columnar daily/monthly time series per service and region
+ANOMALY_WINDOW = 28
+ANOMALY_Z_THRESHOLD = 3.0
+ANOMALY_MIN_COST = 1.0
+# A flagged day must also exceed its baseline by this fraction
+ANOMALY_MIN_INCREASE = 0.2
+
+def cost_time_series(cost_data):
+    # Columns are filled straight from the Cost Explorer groups; service and
+    # region are categoricals so hundreds of pairs over a year stay compact
+    results = cost_data['ResultsByTime']
+    groups = [(result['TimePeriod']['Start'], group) for result in results for group in result.get('Groups', [])]
+    return pd.DataFrame({
+        'date': pd.to_datetime([start for start, _ in groups]),
+        'service': pd.Categorical([g['Keys'][0] for _, g in groups]),
+        'region': pd.Categorical([g['Keys'][1] for _, g in groups]),
+        'cost': pd.to_numeric(pd.Series([g['Metrics']['UnblendedCost']['Amount'] for _, g in groups], dtype=object)).astype(float),
+    })
+
+def cost_totals(series, start_date=None, end_date=None):
+    # Total cost per service/region over [start, end)
+    if start_date is not None:
+        series = series[series['date'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        series = series[series['date'] < pd.Timestamp(end_date)]
+    totals = series.groupby(['service', 'region'], observed=True, sort=False)['cost'].sum().reset_index()
+    totals['service'] = totals['service'].astype(str)
+    totals['region'] = totals['region'].astype(str)
+    return totals
+
+def monthly_costs(series):
+    # [(month 'YYYY-MM', service, region, cost)] aggregates, e.g. for the run history store
+    if not len(series):
+        return []
+    months = series['date'].dt.strftime('%Y-%m')
+    totals = series.groupby([months, 'service', 'region'], observed=True)['cost'].sum()
+    return [(month, str(service), str(region), float(cost)) for (month, service, region), cost in totals.items()]
 
-# 2. Analyze costs and build DataFrame
 def analyze_costs(cost_data):
-    rows = []
-    for result in cost_data['ResultsByTime']:
-        for group in result['Groups']:
-            service = group['Keys'][0]
-            region = group['Keys'][1]
-            amount = float(group['Metrics']['UnblendedCost']['Amount'])
-            rows.append({'service': service, 'region': region, 'cost': amount})
-    df = pd.DataFrame(rows)
-    return df
+    series = cost_time_series(cost_data)
+    return cost_totals(series) if len(series) else pd.DataFrame()
+
+def cost_matrix(series, freq='D'):
+    # Wide matrix: one row per period, one column per (service, region);
+    # periods without spend are zero. Weekly periods start on Monday
+    wide = series.pivot_table(index='date', columns=['service', 'region'], values='cost', aggfunc='sum', observed=True, fill_value=0.0)
+    if freq.startswith('W'):
+        return wide.resample(freq, label='left', closed='left').sum()
+    return wide.resample(freq).sum()
+
+def _long(wide, **columns):
+    # Flatten equally-shaped wide frames back to one row per (period, service, region)
+    periods, pairs = wide.shape
+    return pd.DataFrame({
+        'period': np.repeat(wide.index.to_numpy(), pairs),
+        'service': np.tile(wide.columns.get_level_values(0).astype(str), periods),
+        'region': np.tile(wide.columns.get_level_values(1).astype(str), periods),
+        **{name: frame.to_numpy().ravel() for name, frame in columns.items()},
+    })
+
+def period_changes(series, freq='MS'):
+    # Period-over-period deltas: 'MS' gives month-over-month, 'W-MON' week-over-week
+    wide = cost_matrix(series, freq)
+    previous = wide.shift(1)
+    change = wide - previous
+    pct_change = change / previous.where(previous > 0) * 100
+    return _long(wide, cost=wide, previous=previous, change=change, pct_change=pct_change)
+
+def detect_anomalies(series, window=ANOMALY_WINDOW, threshold=ANOMALY_Z_THRESHOLD, min_cost=ANOMALY_MIN_COST,
+                     min_increase=ANOMALY_MIN_INCREASE):
+    # Daily z-score against a rolling baseline of the preceding `window` days.
+    # The spread is floored at 5% of the baseline so a spike on flat spend is caught
+    wide = cost_matrix(series, 'D')
+    rolling = wide.rolling(window, min_periods=14)
+    baseline = rolling.mean().shift(1)
+    spread = np.maximum(rolling.std().shift(1), baseline * 0.05)
+    zscore = (wide - baseline) / spread.where(spread > 0)
+    flagged = ((zscore > threshold) & (wide >= min_cost) & (wide > baseline * (1 + min_increase))).to_numpy()
+    anomalies = _long(wide, cost=wide, baseline=baseline, zscore=zscore)[flagged.ravel()]
+    return anomalies.rename(columns={'period': 'date'}).reset_index(drop=True)
+
+def cost_analytics(series, as_of, anomaly_days=30):
+    # Latest complete month and week changes, and anomalies of the last anomaly_days
+    as_of = pd.Timestamp(as_of)
+    month = (as_of.replace(day=1) - pd.Timedelta(days=1)).replace(day=1)
+    week = (as_of - pd.Timedelta(days=as_of.weekday() + 7)).normalize()
+    mom = period_changes(series, 'MS')
+    wow = period_changes(series, 'W-MON')
+    anomalies = detect_anomalies(series)
+    by_change = lambda df: df.reindex(df['change'].abs().sort_values(ascending=False).index)
+    return {
+        'month': month,
+        'week': week,
+        'mom': by_change(mom[(mom['period'] == month) & mom['change'].notna() & (mom['change'] != 0)]),
+        'wow': by_change(wow[(wow['period'] == week) & wow['change'].notna() & (wow['change'] != 0)]),
+        'anomalies': anomalies[anomalies['date'] >= as_of - pd.Timedelta(days=anomaly_days)],
+    }
 
 # 3. Generate recommendations (simple heuristics)
-def generate_recommendations(df, session=None, start_date=None, end_date=None):
+def generate_recommendations(df, session=None, start_date=None, end_date=None, instances=None, max_workers=8, resource_costs=None):
     recs = []
     # Return empty if df is empty or missing 'service' column
     if df.empty or 'service' not in df.columns:
@@ -122,36 +286,204 @@ def generate_recommendations(df, session=None, start_date=None, end_date=None):
                 'recommendation': f'Consider rightsizing or reserved pricing for {service}.',
                 'potential_savings': round(total * 0.2, 2)
             })
-    # EC2 idle analysis
+    # EC2 idle analysis over batched GetMetricData series
     if session is not None and start_date and end_date:
-        ec2 = session.client('ec2')
-        cw = session.client('cloudwatch')
-        instances = ec2.describe_instances()
-        for reservation in instances['Reservations']:
-            for inst in reservation['Instances']:
-                instance_id = inst['InstanceId']
-                # Get average CPUUtilization for the month
-                metrics = cw.get_metric_statistics(
-                    Namespace='AWS/EC2',
-                    MetricName='CPUUtilization',
-                    Dimensions=[{'Name': 'InstanceId', 'Value': instance_id}],
-                    StartTime=start_date,
-                    EndTime=end_date,
-                    Period=3600,
-                    Statistics=['Average']
-                )
-                datapoints = metrics.get('Datapoints', [])
-                idle_hours = sum(1 for d in datapoints if d['Average'] < 5)
-                total_hours = len(datapoints)
-                if total_hours > 0 and idle_hours > 0:
-                    recs.append({
-                        'service': 'EC2',
-                        'resource_id': instance_id,
-                        'recommendation': f'Instance {instance_id} was idle ({idle_hours}h/{total_hours}h) last month. Consider stopping during off-hours.',
-                        'potential_savings': 0.1 * df[df['service']=='Amazon Elastic Compute Cloud - Compute']['cost'].sum()  # Example: 10% savings
-                    })
+        if instances is None:
+            ec2 = session.client('ec2')
+            instances = [r for page in ec2.get_paginator('describe_instances').paginate() for r in page['Reservations']]
+        idle = analyze_ec2_idle(session, instance_ids_by_region(instances, session.region_name), start_date, end_date, max_workers=max_workers)
+        ec2_cost = df[df['service']=='Amazon Elastic Compute Cloud - Compute']['cost'].sum()
+        idle = idle[(idle['total_hours'] > 0) & (idle['idle_hours'] > 0)]
+        # With CUR data an instance's savings are its own cost for the idle share
+        # of its hours, and an instance the CUR does not bill saves nothing;
+        # without it, fall back to a flat share of EC2 spend
+        if resource_costs is not None:
+            per_resource = resource_costs.groupby('resource_id')['cost'].sum()
+            idle = idle.assign(cost=idle['instance_id'].map(per_resource))
+            fallback = 0.0
+        else:
+            idle = idle.assign(cost=np.nan)
+            fallback = 0.1 * ec2_cost
+        idle = idle.assign(savings=(idle['cost'] * idle['idle_hours'] / idle['total_hours']).fillna(fallback))
+        for row in idle.itertuples(index=False):
+            recs.append({
+                'service': 'EC2',
+                'resource_id': row.instance_id,
+                'recommendation': f'Instance {row.instance_id} was idle ({row.idle_hours}h/{row.total_hours}h) last month. Consider stopping during off-hours.',
+                'potential_savings': round(row.savings, 2),
+                'idle_hours': int(row.idle_hours),
+                'total_hours': int(row.total_hours),
+                'resource_cost': None if pd.isna(row.cost) else round(row.cost, 2)
+            })
     return recs
 
+# GetMetricData accepts at most 500 metric queries per request
+METRIC_QUERY_LIMIT = 500
+IDLE_CPU_THRESHOLD = 5
+
+def instance_ids_by_region(reservations, default_region=None):
+    # Group instance IDs from describe_instances reservations (optionally
+    # region-tagged by the scanner) so each region gets its own CloudWatch client
+    by_region = {}
+    for reservation in reservations:
+        region = reservation.get('Region', default_region)
+        for inst in reservation.get('Instances', []):
+            by_region.setdefault(region, []).append(inst['InstanceId'])
+    return by_region
+
+def fetch_cpu_batch(cw, instance_ids, start_date, end_date):
+    # One GetMetricData batch (following NextToken); returns flat id/value lists
+    queries = [{
+        'Id': f'cpu{i}',
+        'MetricStat': {
+            'Metric': {'Namespace': 'AWS/EC2', 'MetricName': 'CPUUtilization',
+                       'Dimensions': [{'Name': 'InstanceId', 'Value': instance_id}]},
+            'Period': 3600,
+            'Stat': 'Average',
+        },
+    } for i, instance_id in enumerate(instance_ids)]
+    ids, values = [], []
+    kwargs = {'MetricDataQueries': queries, 'StartTime': start_date, 'EndTime': end_date}
+    while True:
+        response = cw.get_metric_data(**kwargs)
+        for result in response['MetricDataResults']:
+            instance_id = instance_ids[int(result['Id'][3:])]
+            ids.extend([instance_id] * len(result['Values']))
+            values.extend(result['Values'])
+        if not response.get('NextToken'):
+            return ids, values
+        kwargs['NextToken'] = response['NextToken']
+
+def analyze_ec2_idle(session, instances_by_region, start_date, end_date, max_workers=8):
+    # Hourly average CPU for every instance, fetched in concurrent batches of up
+    # to METRIC_QUERY_LIMIT queries, then reduced to idle/total hours per instance
+    batches = []
+    for region, instance_ids in instances_by_region.items():
+        cw = session.client('cloudwatch', region_name=region) if region else session.client('cloudwatch')
+        for i in range(0, len(instance_ids), METRIC_QUERY_LIMIT):
+            batches.append((cw, instance_ids[i:i + METRIC_QUERY_LIMIT]))
+    ids, values = [], []
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for batch_ids, batch_values in pool.map(lambda b: fetch_cpu_batch(b[0], b[1], start_date, end_date), batches):
+            ids.extend(batch_ids)
+            values.extend(batch_values)
+    series = pd.DataFrame({'instance_id': ids, 'value': values})
+    series['idle'] = series['value'] < IDLE_CPU_THRESHOLD
+    idle = series.groupby('instance_id', sort=False).agg(idle_hours=('idle', 'sum'), total_hours=('value', 'size'))
+    ordered = [i for instance_ids in instances_by_region.values() for i in instance_ids]
+    return idle.reindex(ordered, fill_value=0).astype(int).rename_axis('instance_id').reset_index()
+
+# Cost and Usage Report (CUR) ingestion. Legacy CUR CSV and CUR 2.0 Parquet
+# name the same columns differently
+CUR_COLUMNS = {
+    'resource_id': ('lineItem/ResourceId', 'line_item_resource_id'),
+    'product_code': ('lineItem/ProductCode', 'line_item_product_code'),
+    'cost': ('lineItem/UnblendedCost', 'line_item_unblended_cost'),
+    'usage_start': ('lineItem/UsageStartDate', 'line_item_usage_start_date'),
+}
+CUR_CHUNK_ROWS = 500000
+
+# Billing period directories: legacy CUR (20250101-20250201) and CUR 2.0 (BILLING_PERIOD=2025-01)
+CUR_PERIOD_DIR = re.compile(r'^(\d{8}-\d{8}|BILLING_PERIOD=\d{4}-\d{2})$')
+
+def _billing_period(path):
+    # (period directory, assembly) of a CUR file, or (None, None) outside the export layout.
+    # The assembly is the directory below the period ('' for overwritten reports)
+    directory = os.path.dirname(os.path.abspath(path))
+    while True:
+        if CUR_PERIOD_DIR.match(os.path.basename(directory)):
+            parts = os.path.relpath(path, directory).split(os.sep)
+            return directory, parts[0] if len(parts) > 1 else ''
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None, None
+        directory = parent
+
+def _current_assembly(period, assemblies):
+    # The period's manifest names its current assembly; without one, the most
+    # recently written assembly wins
+    for manifest in sorted(glob.glob(os.path.join(period, '*Manifest.json'))):
+        try:
+            with open(manifest, encoding='utf-8') as f:
+                assembly_id = json.load(f).get('assemblyId')
+        except (OSError, ValueError):
+            continue
+        if assembly_id in assemblies:
+            return assembly_id
+    return max(assemblies, key=lambda a: max(os.path.getmtime(f) for f in assemblies[a]))
+
+def cur_files(path):
+    # A single export file, or the CUR files below a directory. AWS writes a new
+    # assembly of a billing period each time it refreshes the report; only the
+    # latest one per period is read so costs are not counted once per refresh
+    if os.path.isfile(path):
+        return [path]
+    patterns = ('*.csv.gz', '*.csv', '*.parquet')
+    files = sorted(f for pattern in patterns for f in glob.glob(os.path.join(path, '**', pattern), recursive=True))
+    located = [(f,) + _billing_period(f) for f in files]
+    periods = {}
+    for f, period, assembly in located:
+        if period is not None:
+            periods.setdefault(period, {}).setdefault(assembly, []).append(f)
+    current = {period: _current_assembly(period, assemblies) for period, assemblies in periods.items()}
+    return [f for f, period, assembly in located if period is None or assembly == current[period]]
+
+def _cur_column_map(available, path):
+    # {actual column name: canonical name}
+    mapping = {}
+    for name, candidates in CUR_COLUMNS.items():
+        match = next((c for c in candidates if c in available), None)
+        if match is None:
+            raise ValueError(f"{path} is not a Cost and Usage Report: no {' or '.join(candidates)} column")
+        mapping[match] = name
+    return mapping
+
+def _cur_chunks(path, chunk_rows):
+    # Only the projected columns are read, chunk_rows rows at a time
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError(f"Reading Parquet CUR files ({path}) requires pyarrow: pip install pyarrow")
+        parquet = pq.ParquetFile(path)
+        mapping = _cur_column_map(parquet.schema_arrow.names, path)
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=list(mapping)):
+            yield batch.to_pandas().rename(columns=mapping)
+    else:
+        mapping = _cur_column_map(pd.read_csv(path, nrows=0).columns, path)
+        dtypes = {column: str for column, name in mapping.items() if name != 'cost'}
+        for chunk in pd.read_csv(path, usecols=list(mapping), dtype=dtypes, chunksize=chunk_rows):
+            yield chunk.rename(columns=mapping)
+
+def _utc(value):
+    stamp = pd.Timestamp(value)
+    return stamp.tz_localize('UTC') if stamp.tzinfo is None else stamp.tz_convert('UTC')
+
+def read_cur(path, start_date=None, end_date=None, chunk_rows=CUR_CHUNK_ROWS):
+    # Unblended cost per resource ID across the CUR files under path, for line
+    # items whose usage starts in [start_date, end_date). Each chunk is reduced
+    # to per-resource sums before the next is read, so memory is bounded by the
+    # chunk size and the number of resources
+    start = _utc(start_date) if start_date is not None else None
+    end = _utc(end_date) if end_date is not None else None
+    totals = None
+    for cur_path in cur_files(path):
+        for chunk in _cur_chunks(cur_path, chunk_rows):
+            keep = chunk['resource_id'].notna() & (chunk['resource_id'] != '')
+            if start is not None or end is not None:
+                usage_start = pd.to_datetime(chunk['usage_start'], utc=True, errors='coerce')
+                if start is not None:
+                    keep &= usage_start >= start
+                if end is not None:
+                    keep &= usage_start < end
+            chunk = chunk[keep]
+            chunk = chunk.assign(product_code=chunk['product_code'].fillna(''), cost=pd.to_numeric(chunk['cost'], errors='coerce').fillna(0.0))
+            partial = chunk.groupby(['resource_id', 'product_code'], sort=False)['cost'].sum()
+            totals = partial if totals is None else totals.add(partial, fill_value=0.0)
+    if totals is None:
+        return pd.DataFrame({'resource_id': pd.Series(dtype=str), 'product_code': pd.Series(dtype=str), 'cost': pd.Series(dtype=float)})
+    return totals.reset_index().sort_values('cost', ascending=False, ignore_index=True)
+
 # 4. Generate HTML report with charts
 def generate_html_report(df, recs, output_path, ec2_idle=None):
     total_cost = df['cost'].sum()
@@ -182,14 +514,15 @@ def generate_html_report(df, recs, output_path, ec2_idle=None):
     {% if recs|selectattr('service', 'equalto', 'EC2')|list %}
     <table border=1><tr><th>Instance ID</th><th>Idle Hours</th><th>Total Hours</th><th>Recommendation</th></tr>
     {% for r in recs if r.service == 'EC2' %}
-    <tr><td>{{ r.resource_id }}</td><td>{{ r.recommendation.split('(')[1].split('h/')[0] }}</td><td>{{ r.recommendation.split('/')[1].split('h')[0] }}</td><td>{{ r.recommendation }}</td></tr>
+    <tr><td>{{ r.resource_id }}</td><td>{{ r.idle_hours }}</td><td>{{ r.total_hours }}</td><td>{{ r.recommendation }}</td></tr>
     {% endfor %}
     </table>
     {% else %}<p>No idle EC2 instances detected.</p>{% endif %}
     <h2>Before vs After Optimization</h2>
     {{ bar_html | safe }}
     <h2>Raw Data</h2>
-    {{ df.to_html(index=False) }}
+    {% if df|length > raw_rows %}<p>Top {{ raw_rows }} of {{ df|length }} service/region rows by cost.</p>{% endif %}
+    {{ df.nlargest(raw_rows, 'cost').to_html(index=False) }}
     </body></html>
     '''
     env = jinja2.Environment()
@@ -201,7 +534,8 @@ def generate_html_report(df, recs, output_path, ec2_idle=None):
         pie_html=pie_html,
         bar_html=bar_html,
         recs=recs,
-        df=df
+        df=df,
+        raw_rows=RAW_DATA_ROWS
     )
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     with open(output_path, 'w', encoding='utf-8') as f:
@@ -211,18 +545,27 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="AWS Cost Explorer & Optimization Report")
     parser.add_argument('--profile', type=str, help='AWS CLI profile name', default=None)
     parser.add_argument('--output', type=str, help='Output HTML report file', default='reports/cost_report.html')
+    parser.add_argument('--cur-path', type=str, help='Exported Cost and Usage Report file or directory (gzip CSV or Parquet) for per-resource costs', default=None)
+    parser.add_argument('--cache-dir', type=str, help='Directory caching Cost Explorer results for closed months', default='.cost-cache')
     args = parser.parse_args()
 
     if args.profile:
         session = boto3.Session(profile_name=args.profile)
     else:
         session = boto3.Session()
+    # Rate-limit and retry throttled calls, as in a full run of main.py
+    from aws_security_scan.throttle import CallScheduler
+    scheduler = CallScheduler().install(session)
 
     today = datetime.utcnow().date()
     first = today.replace(day=1)
     last_month_end = first - timedelta(days=1)
     last_month_start = last_month_end.replace(day=1)
-    cost_data = get_cost_and_usage(str(last_month_start), str(last_month_end + timedelta(days=1)), session=session)
+    cost_data = get_cost_and_usage(str(last_month_start), str(last_month_end + timedelta(days=1)), session=session, cache_dir=args.cache_dir,
+                                   account_id=session.client('sts').get_caller_identity()['Account'])
     df = analyze_costs(cost_data)
-    recs = generate_recommendations(df, session=session, start_date=datetime.combine(last_month_start, datetime.min.time()), end_date=datetime.combine(last_month_end + timedelta(days=1), datetime.min.time()))
+    resource_costs = read_cur(args.cur_path, last_month_start, first) if args.cur_path else None
+    recs = generate_recommendations(df, session=session, start_date=datetime.combine(last_month_start, datetime.min.time()), end_date=datetime.combine(last_month_end + timedelta(days=1), datetime.min.time()), resource_costs=resource_costs)
     generate_html_report(df, recs, args.output)
+    for api, stat in scheduler.throttle_summary().items():
+        print(f"[INFO] {api} was throttled {stat['throttles']} times ({stat['retries']} retries)")
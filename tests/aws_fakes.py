@@ -0,0 +1,27 @@
+# Fake botocore transport and clock shared by the throttling and profiling tests
+from botocore.awsrequest import AWSResponse
+
+class FakeRaw:
+    def __init__(self, body):
+        self.body = body
+
+    def stream(self, **kwargs):
+        yield self.body
+
+def fake_transport(statuses):
+    # before-send handler answering each attempt with the next status (400 = throttled)
+    def respond(request, **kwargs):
+        status = statuses.pop(0)
+        if status == 400:
+            body = b'{"__type":"ThrottlingException","message":"Rate exceeded"}'
+        else:
+            body = b'{"clusterArns":[]}'
+        return AWSResponse(request.url, status, {}, FakeRaw(body))
+    return respond
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,228 @@
+import json
+import os
+import runpy
+import sys
+import tempfile
+import unittest
+import warnings
+from unittest import mock
+from datetime import date, datetime
+import pandas as pd
+from aws_security_scan.throttle import CallScheduler
+from reports import aws_cost_report as cost_mod
+
+class FakeCloudWatch:
+    def __init__(self, region, series, calls):
+        self.region = region
+        self.series = series
+        self.calls = calls
+
+    def get_metric_data(self, MetricDataQueries, StartTime, EndTime, NextToken=None):
+        self.calls.append((self.region, len(MetricDataQueries), NextToken))
+        results = []
+        for q in MetricDataQueries:
+            instance_id = q['MetricStat']['Metric']['Dimensions'][0]['Value']
+            values = self.series.get(instance_id, [])
+            # Serve each series in two pages to exercise NextToken handling
+            half = len(values) // 2
+            results.append({'Id': q['Id'], 'Values': values[half:] if NextToken else values[:half]})
+        return {'MetricDataResults': results, 'NextToken': None if NextToken else 'page2'}
+
+class FakeSession:
+    region_name = 'us-east-1'
+
+    def __init__(self, series):
+        self.series = series
+        self.calls = []
+
+    def client(self, service, region_name=None):
+        if service != 'cloudwatch':
+            raise AssertionError(f'unexpected {service} client; inventory should be reused')
+        return FakeCloudWatch(region_name, self.series, self.calls)
+
+class FakeCostExplorer:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def get_cost_and_usage(self, TimePeriod, Granularity, Metrics, GroupBy, NextPageToken=None):
+        self.calls.append((TimePeriod['Start'], NextPageToken))
+        # Each month's groups are split over two pages
+        service = 'EC2' if NextPageToken else 'S3'
+        group = {'Keys': [service, 'us-east-1'], 'Metrics': {'UnblendedCost': {'Amount': '1.5'}}}
+        return {
+            'ResultsByTime': [{'TimePeriod': dict(TimePeriod), 'Groups': [group]}],
+            'NextPageToken': None if NextPageToken else 'page2',
+        }
+
+class FakeCostSession:
+    region_name = 'us-east-1'
+
+    def __init__(self):
+        self.calls = []
+
+    def client(self, service, region_name=None):
+        return FakeCostExplorer(self.calls)
+
+class TestCostExplorerFetch(unittest.TestCase):
+    def test_month_windows(self):
+        self.assertEqual(cost_mod.month_windows('2024-11-15', '2025-02-01'),
+                         [('2024-11-15', '2024-12-01'), ('2024-12-01', '2025-01-01'), ('2025-01-01', '2025-02-01')])
+
+    def test_follows_pagination_and_caches_closed_months(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            session = FakeCostSession()
+            fetch = lambda: cost_mod.get_cost_and_usage('2024-02-01', '2025-03-01', session=session, cache_dir=cache_dir,
+                                                       account_id='123456789012', today=date(2025, 2, 10))
+            data = fetch()
+            self.assertEqual(len(data['ResultsByTime']), 13)
+            self.assertEqual([g['Keys'][0] for g in data['ResultsByTime'][0]['Groups']], ['S3', 'EC2'])
+            self.assertEqual(len(cost_mod.cost_time_series(data)), 26)
+            self.assertEqual(len(session.calls), 26)
+            # Only the still-open current month is downloaded again
+            session.calls.clear()
+            self.assertEqual(fetch(), data)
+            self.assertEqual({start for start, _ in session.calls}, {'2025-02-01'})
+
+def daily_cost_data(days, pairs, spike=None):
+    # spike: (day index, pair index, extra cost)
+    results = []
+    for d, day in enumerate(pd.date_range('2024-01-01', periods=days, freq='D')):
+        groups = []
+        for p in range(pairs):
+            amount = 10.0 + (p % 3) * 0.25 * (d % 2) + (spike[2] if spike and spike[:2] == (d, p) else 0.0)
+            groups.append({'Keys': [f'Service {p}', 'us-east-1' if p % 2 else 'eu-west-1'], 'Metrics': {'UnblendedCost': {'Amount': str(amount)}}})
+        results.append({'TimePeriod': {'Start': day.strftime('%Y-%m-%d')}, 'Groups': groups})
+    return {'ResultsByTime': results}
+
+class TestCostAnalytics(unittest.TestCase):
+    def test_month_and_week_over_week_changes(self):
+        series = cost_mod.cost_time_series(daily_cost_data(70, 2))
+        mom = cost_mod.period_changes(series, 'MS')
+        feb = mom[(mom['period'] == pd.Timestamp('2024-02-01')) & (mom['service'] == 'Service 0')].iloc[0]
+        self.assertAlmostEqual(feb['previous'], 310.0)
+        self.assertAlmostEqual(feb['change'], -20.0)
+        wow = cost_mod.period_changes(series, 'W-MON')
+        self.assertEqual(wow['period'].min(), pd.Timestamp('2024-01-01'))
+        self.assertTrue((wow[wow['period'] == pd.Timestamp('2024-01-08')]['change'].abs() < 1).all())
+
+    def test_detects_spike_against_rolling_baseline(self):
+        series = cost_mod.cost_time_series(daily_cost_data(365, 200, spike=(300, 7, 40.0)))
+        anomalies = cost_mod.detect_anomalies(series)
+        self.assertEqual(len(anomalies), 1)
+        self.assertEqual((anomalies['date'][0], anomalies['service'][0]), (pd.Timestamp('2024-10-27'), 'Service 7'))
+        analytics = cost_mod.cost_analytics(series, date(2024, 11, 5))
+        self.assertEqual(analytics['month'], pd.Timestamp('2024-10-01'))
+        self.assertEqual(len(analytics['anomalies']), 1)
+        df = cost_mod.cost_totals(series, '2024-10-01', '2024-11-01')
+        recs = cost_mod.generate_recommendations(df)
+        # Past spend above baseline cannot be saved, so anomalies are not recommendations
+        self.assertFalse([r for r in recs if 'resource_id' in r])
+        html = cost_mod.generate_html_fragment(df, recs, account_id='123456789012', analytics=analytics)
+        self.assertIn('Cost Anomalies', html)
+        self.assertIn('2024-10-27', html)
+
+class TestEc2IdleAnalysis(unittest.TestCase):
+    def test_batches_respect_query_limit(self):
+        ids = [f'i-{n}' for n in range(1203)]
+        session = FakeSession({})
+        instances = [{'Region': 'us-east-1', 'Instances': [{'InstanceId': i} for i in ids]}]
+        idle = cost_mod.analyze_ec2_idle(session, cost_mod.instance_ids_by_region(instances), datetime(2025, 1, 1), datetime(2025, 2, 1))
+        first_pages = sorted(n for _, n, token in session.calls if token is None)
+        self.assertEqual(first_pages, [203, 500, 500])
+        self.assertEqual(list(idle['instance_id']), ids)
+        self.assertEqual(idle['total_hours'].sum(), 0)
+
+    def test_recommendations_reuse_inventory(self):
+        session = FakeSession({'i-idle': [1.0, 2.0, 50.0, 3.0], 'i-busy': [80.0, 90.0]})
+        instances = [
+            {'Region': 'us-east-1', 'Instances': [{'InstanceId': 'i-idle'}]},
+            {'Region': 'eu-west-1', 'Instances': [{'InstanceId': 'i-busy'}]},
+        ]
+        df = pd.DataFrame([{'service': 'Amazon Elastic Compute Cloud - Compute', 'region': 'us-east-1', 'cost': 100.0}])
+        recs = cost_mod.generate_recommendations(df, session=session, start_date=datetime(2025, 1, 1),
+                                                 end_date=datetime(2025, 2, 1), instances=instances)
+        ec2 = [r for r in recs if r['service'] == 'EC2']
+        self.assertEqual([r['resource_id'] for r in ec2], ['i-idle'])
+        self.assertIn('(3h/4h)', ec2[0]['recommendation'])
+        self.assertEqual((ec2[0]['idle_hours'], ec2[0]['total_hours']), (3, 4))
+        self.assertEqual({region for region, _, _ in session.calls}, {'us-east-1', 'eu-west-1'})
+
+class TestCurIngestion(unittest.TestCase):
+    def write_cur(self, directory, relative=os.path.join('20250101-20250201', 'cur-00001.csv.gz'), month=1, days=(1,), cost=1.25):
+        rows = [
+            {'identity/LineItemId': n, 'lineItem/ProductCode': 'AmazonEC2', 'lineItem/ResourceId': f'i-{n % 3}',
+             'lineItem/UsageStartDate': f'2025-{month:02d}-{days[n % len(days)]:02d}T00:00:00Z',
+             'lineItem/UnblendedCost': cost, 'lineItem/UsageType': 'BoxUsage'} for n in range(30)
+        ]
+        rows.append({'identity/LineItemId': 30, 'lineItem/ProductCode': 'AWSSupport', 'lineItem/ResourceId': None,
+                     'lineItem/UsageStartDate': '2025-01-01T00:00:00Z', 'lineItem/UnblendedCost': 100.0, 'lineItem/UsageType': 'Support'})
+        path = os.path.join(directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pd.DataFrame(rows).to_csv(path, index=False, compression='gzip')
+        return path
+
+    def test_chunked_read_aggregates_per_resource(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_cur(directory)
+            costs = cost_mod.read_cur(directory, chunk_rows=7)
+        self.assertEqual(sorted(costs['resource_id']), ['i-0', 'i-1', 'i-2'])
+        self.assertTrue((costs['cost'] == 12.5).all())
+        self.assertEqual(set(costs['product_code']), {'AmazonEC2'})
+
+    def test_filters_line_items_to_the_usage_period(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.write_cur(directory, days=(1, 31))
+            self.write_cur(directory, relative=os.path.join('20250201-20250301', 'cur-00001.csv.gz'), month=2, cost=5.0)
+            january = cost_mod.read_cur(directory, datetime(2025, 1, 1), date(2025, 2, 1))
+            first_days = cost_mod.read_cur(directory, date(2025, 1, 1), date(2025, 1, 31))
+            everything = cost_mod.read_cur(directory)
+        self.assertEqual(january['cost'].sum(), 30 * 1.25)
+        # The end date is exclusive: line items starting on Jan 31 are left out
+        self.assertEqual(first_days['cost'].sum(), 15 * 1.25)
+        self.assertEqual(everything['cost'].sum(), 30 * 1.25 + 30 * 5.0)
+
+    def test_reads_only_the_latest_assembly_per_period(self):
+        with tempfile.TemporaryDirectory() as directory:
+            old = self.write_cur(directory, relative=os.path.join('report', '20250101-20250201', 'aaa', 'cur-1.csv.gz'), cost=1.0)
+            self.write_cur(directory, relative=os.path.join('report', '20250101-20250201', 'bbb', 'cur-1.csv.gz'), cost=2.0)
+            os.utime(old, (0, 0))
+            # Without a manifest the most recently written assembly wins
+            self.assertEqual(cost_mod.read_cur(directory)['cost'].sum(), 30 * 2.0)
+            with open(os.path.join(directory, 'report', '20250101-20250201', 'report-Manifest.json'), 'w') as f:
+                json.dump({'assemblyId': 'aaa'}, f)
+            # The period's manifest names the current assembly
+            self.assertEqual(cost_mod.read_cur(directory)['cost'].sum(), 30 * 1.0)
+
+    def test_rejects_files_without_cur_columns(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'other.csv')
+            pd.DataFrame({'a': [1]}).to_csv(path, index=False)
+            with self.assertRaises(ValueError):
+                cost_mod.read_cur(path)
+
+    def test_idle_savings_use_resource_cost(self):
+        session = FakeSession({'i-0': [1.0, 1.0, 50.0, 1.0], 'i-9': [1.0, 1.0]})
+        instances = [{'Region': 'us-east-1', 'Instances': [{'InstanceId': 'i-0'}, {'InstanceId': 'i-9'}]}]
+        df = pd.DataFrame([{'service': 'Amazon Elastic Compute Cloud - Compute', 'region': 'us-east-1', 'cost': 100.0}])
+        with tempfile.TemporaryDirectory() as directory:
+            resource_costs = cost_mod.read_cur(self.write_cur(directory))
+        recs = cost_mod.generate_recommendations(df, session=session, start_date=datetime(2025, 1, 1), end_date=datetime(2025, 2, 1),
+                                                 instances=instances, resource_costs=resource_costs)
+        savings = {r['resource_id']: r['potential_savings'] for r in recs if r['service'] == 'EC2'}
+        # i-0: 3 of 4 hours idle of $12.50; i-9 is not billed in the CUR and saves nothing
+        self.assertEqual(savings, {'i-0': 9.38, 'i-9': 0.0})
+
+class TestStandalone(unittest.TestCase):
+    def test_standalone_report_rate_limits_its_session(self):
+        class Installed(Exception):
+            pass
+        def install(scheduler, session):
+            raise Installed(session)
+        with mock.patch.object(CallScheduler, 'install', install), mock.patch.object(sys, 'argv', ['aws_cost_report']), warnings.catch_warnings():
+            # The module is already imported by this test module
+            warnings.simplefilter('ignore', RuntimeWarning)
+            with self.assertRaises(Installed):
+                runpy.run_module('reports.aws_cost_report', run_name='__main__')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import tempfile
+import unittest
+from aws_security_scan.scanner import paginate
+from aws_security_scan.throttle import CallScheduler
+from benchmarks.backend import SyntheticBackend
+from benchmarks.run import compare, previous_result, run_benchmark, save_result
+from benchmarks.synthetic import SyntheticAccount, resolve_scale
+
+class TestSyntheticBackend(unittest.TestCase):
+    def test_account_matches_requested_scale(self):
+        account = SyntheticAccount('tiny')
+        counts = account.counts()
+        scale = resolve_scale('tiny')
+        self.assertEqual(counts['instances'], scale['instances'])
+        self.assertEqual(counts['security_group_rules'], scale['security_group_rules'])
+        self.assertEqual(counts['buckets'], scale['buckets'])
+        self.assertEqual(len(account.cost_results), scale['cost_days'])
+
+    def test_unknown_scale_parameter_rejected(self):
+        with self.assertRaises(ValueError):
+            resolve_scale('tiny', widgets=3)
+
+    def test_throttled_calls_are_retried_by_the_scheduler(self):
+        account = SyntheticAccount(dict(resolve_scale('tiny'), instances=600))
+        backend = SyntheticBackend(account, throttle_rate=0.3, seed=1)
+        session = backend.session()
+        scheduler = CallScheduler(base_delay=0.0, sleep=lambda seconds: None).install(session)
+        ec2 = session.client('ec2', region_name=account.regions[0])
+        reservations = list(paginate(ec2, 'describe_instances', 'Reservations'))
+        self.assertEqual(reservations, account.reservations[account.regions[0]])
+        self.assertGreater(sum(backend.throttles.values()), 0)
+        self.assertEqual(scheduler.stats[('ec2', 'DescribeInstances')]['retries'], sum(backend.throttles.values()))
+
+class TestBenchmarkRun(unittest.TestCase):
+    def test_phases_timed_and_regressions_detected(self):
+        result = run_benchmark('tiny')
+        # Production client-side rate limits apply unless the unlimited variant is requested
+        self.assertEqual(result['rate_limits'], 'default')
+        for phase in ('discovery', 'evaluation', 'incremental', 'cost_analysis', 'report'):
+            self.assertIn('seconds', result['phases'][phase])
+        self.assertEqual(result['counts']['instances'], 20)
+        self.assertGreater(result['counts']['findings'], 0)
+        self.assertGreater(result['counts']['report_bytes'], 0)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertIsNone(previous_result(result, tmp))
+            save_result(result, tmp)
+            baseline = previous_result(result, tmp)
+            self.assertEqual(baseline['phases'], result['phases'])
+            slower = dict(result, phases=dict(result['phases'], report={'seconds': baseline['phases']['report']['seconds'] * 2 + 1}))
+            self.assertEqual([phase for phase, _, _ in compare(slower, baseline)], ['report'])
+            self.assertIsNone(previous_result(dict(result, latency=0.5), tmp))
+            self.assertIsNone(previous_result(dict(result, rate_limits='unlimited'), tmp))
+
+    def test_unlimited_variant_is_opt_in(self):
+        self.assertEqual(run_benchmark('tiny', unlimited=True)['rate_limits'], 'unlimited')
+
+if __name__ == '__main__':
+    unittest.main()
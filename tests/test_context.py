@@ -0,0 +1,27 @@
+import unittest
+from aws_security_scan.context import AwsContext
+from aws_security_scan.scanner import Scanner
+from test_scanner import FakeSession
+
+class TestAwsContext(unittest.TestCase):
+    def test_clients_and_identity_are_cached(self):
+        session = FakeSession()
+        context = AwsContext(session=session)
+        self.assertIs(context.client('ec2'), context.client('ec2', 'us-east-1'))
+        self.assertIsNot(context.client('ec2'), context.client('ec2', 'eu-west-1'))
+        self.assertEqual(context.account_id, '123456789012')
+        self.assertEqual(context.account_id, '123456789012')
+        self.assertEqual(session.created.count(('sts', 'us-east-1')), 1)
+
+    def test_scanner_reuses_context_clients(self):
+        session = FakeSession()
+        context = AwsContext(session=session)
+        context.client('ec2')
+        Scanner(context=context, regions=['us-east-1', 'eu-west-1']).run_all_checks()
+        Scanner(context=context, regions=['us-east-1', 'eu-west-1']).run_all_checks()
+        # Every (service, region) client is created exactly once across both scans
+        self.assertEqual(len(session.created), len(set(session.created)))
+        self.assertEqual(session.created.count(('sts', 'us-east-1')), 1)
+
+if __name__ == '__main__':
+    unittest.main()
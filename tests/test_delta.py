@@ -0,0 +1,82 @@
+import unittest
+from unittest import mock
+from aws_security_scan.delta import IncrementalEvaluator, diff_findings
+from aws_security_scan.report import ReportGenerator
+from aws_security_scan.rules import RULES, Rule, evaluate_all_rules
+
+def resources(instances, open_groups=()):
+    return {
+        'ec2_instances': [{'Instances': [i]} for i in instances],
+        'security_groups': [{'GroupId': g, 'IpPermissions': [
+            {'FromPort': 22, 'ToPort': 22, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}]} for g in open_groups],
+        'cloudtrails': [],
+    }
+
+class TestIncrementalEvaluator(unittest.TestCase):
+    def test_first_run_matches_full_evaluation(self):
+        res = resources([{'InstanceId': 'i-1', 'PublicIpAddress': '1.1.1.1'}], ['sg-1'])
+        self.assertEqual(IncrementalEvaluator().evaluate(res), evaluate_all_rules(res))
+
+    def test_only_changed_resources_are_evaluated(self):
+        first = IncrementalEvaluator()
+        first.evaluate(resources([{'InstanceId': 'i-1', 'PublicIpAddress': '1.1.1.1'}, {'InstanceId': 'i-2'},
+                                  {'InstanceId': 'i-4', 'PublicIpAddress': '4.4.4.4'}], ['sg-1']))
+        state = first.state('123')
+
+        second = IncrementalEvaluator(state)
+        stats = {}
+        # Security groups are unchanged: ec2-public-ip also reads them
+        current = resources([{'InstanceId': 'i-1', 'PublicIpAddress': '1.1.1.1'}, {'InstanceId': 'i-2', 'PublicIpAddress': '2.2.2.2'},
+                             {'InstanceId': 'i-3'}], ['sg-1'])
+        findings = second.evaluate(current, stats=stats)
+        self.assertEqual(findings, evaluate_all_rules(current))
+        self.assertEqual((stats['ec2-public-ip']['evaluated'], stats['ec2-public-ip']['carried']), (2, 1))
+        delta = second.delta()
+        self.assertEqual([f['resource_id'] for f in delta['new']], ['i-2'])
+        self.assertEqual([f['resource_id'] for f in delta['resolved']], ['i-4'])
+        self.assertEqual(sorted(f['resource_id'] for f in delta['unchanged']), ['-', 'i-1', 'sg-1'])
+
+    def test_unchanged_inputs_are_carried_without_evaluation(self):
+        res = lambda: resources([{'InstanceId': 'i-1', 'PublicIpAddress': '1.1.1.1'}, {'InstanceId': 'i-2'}], ['sg-1'])
+        first = IncrementalEvaluator()
+        first.evaluate(res())
+        stats = {}
+        findings = IncrementalEvaluator(first.state('123')).evaluate(res(), stats=stats)
+        self.assertEqual(findings, evaluate_all_rules(res()))
+        self.assertEqual((stats['ec2-public-ip']['evaluated'], stats['ec2-public-ip']['carried']), (0, 2))
+        self.assertEqual(stats['sg-open-ingress']['evaluated'], 0)
+
+    def test_changed_rules_are_not_carried_forward(self):
+        res = lambda: resources([{'InstanceId': 'i-1', 'PublicIpAddress': '1.1.1.1'}, {'InstanceId': 'i-2'}], ['sg-1'])
+        first = IncrementalEvaluator()
+        first.evaluate(res())
+        original = RULES['ec2-public-ip']
+        def check_ec2_public_ip(resources):
+            # Same inputs, different logic: flags every instance
+            for reservation in resources['ec2_instances']:
+                for instance in reservation['Instances']:
+                    yield {'service': 'EC2', 'resource_id': instance['InstanceId'], 'finding': 'changed', 'severity': 'Low'}
+        for changed in (Rule('ec2-public-ip', original.resource_types, check_ec2_public_ip, original.group, optional=original.optional),
+                        Rule('ec2-public-ip', original.resource_types, original.fn, original.group, optional=original.optional, version=2)):
+            with mock.patch.dict(RULES, {'ec2-public-ip': changed}):
+                stats = {}
+                findings = IncrementalEvaluator(first.state('123')).evaluate(res(), stats=stats)
+                self.assertEqual(findings, evaluate_all_rules(res()))
+            self.assertEqual((stats['ec2-public-ip']['evaluated'], stats['ec2-public-ip']['carried']), (2, 0))
+            self.assertEqual(stats['sg-open-ingress']['evaluated'], 0)
+
+    def test_diff_findings(self):
+        a = {'rule_id': 'r', 'resource_id': 'x', 'finding': 'f'}
+        b = {'rule_id': 'r', 'resource_id': 'y', 'finding': 'f'}
+        self.assertEqual(diff_findings([a], [dict(a), b]), {'new': [b], 'unchanged': [a], 'resolved': []})
+
+    def test_report_marks_new_and_resolved(self):
+        delta = {'new': [], 'unchanged': [], 'resolved': [{'service': 'S3', 'resource_id': 'gone-bucket', 'finding': 'S3 bucket is public.', 'severity': 'High'}]}
+        finding = {'service': 'EC2', 'resource_id': 'i-9', 'finding': 'f', 'severity': 'Low'}
+        delta['new'].append(finding)
+        html = ReportGenerator([finding], '123', delta=delta).generate_html_string()
+        self.assertIn('gone-bucket', html)
+        self.assertIn('[null,"EC2","i-9","-","f","-","Low",null,"",true]', html)
+
+if __name__ == '__main__':
+    unittest.main()
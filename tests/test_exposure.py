@@ -0,0 +1,77 @@
+import unittest
+from aws_security_scan.exposure import is_internet_cidr, merge_intervals
+from aws_security_scan.rules import evaluate_all_rules
+
+def perm(from_port, to_port, cidr, protocol='tcp'):
+    ranges = {'Ipv6Ranges': [{'CidrIpv6': cidr}]} if ':' in cidr else {'IpRanges': [{'CidrIp': cidr}]}
+    return dict({'IpProtocol': protocol, 'FromPort': from_port, 'ToPort': to_port}, **ranges)
+
+def instance(instance_id, groups, public_ip=None):
+    inst = {'InstanceId': instance_id, 'SecurityGroups': [{'GroupId': g} for g in groups]}
+    if public_ip:
+        inst['PublicIpAddress'] = public_ip
+    return inst
+
+class TestCidrs(unittest.TestCase):
+    def test_internet_ranges(self):
+        for cidr in ('0.0.0.0/0', '::/0', '0.0.0.0/1', '128.0.0.0/1', '2000::/3'):
+            self.assertTrue(is_internet_cidr(cidr), cidr)
+        for cidr in ('10.0.0.0/8', '203.0.113.0/24', 'fc00::/7', '1.2.3.4/32', 'not-a-cidr'):
+            self.assertFalse(is_internet_cidr(cidr), cidr)
+
+    def test_merge_intervals(self):
+        self.assertEqual(merge_intervals([(443, 443), (80, 80), (8000, 8080), (81, 90), (8050, 9000)]),
+                         [(80, 90), (443, 443), (8000, 9000)])
+
+class TestExposureRules(unittest.TestCase):
+    def setUp(self):
+        self.resources = {
+            'security_groups': [
+                {'GroupId': 'sg-web', 'IpPermissions': [perm(80, 80, '::/0'), perm(443, 443, '0.0.0.0/0'), perm(-1, -1, '0.0.0.0/0', 'icmp')]},
+                {'GroupId': 'sg-ssh', 'IpPermissions': [perm(22, 22, '0.0.0.0/1'), perm(22, 22, '128.0.0.0/1')]},
+                {'GroupId': 'sg-internal', 'IpPermissions': [perm(0, 65535, '10.0.0.0/8')]},
+                {'GroupId': 'sg-dns', 'IpPermissions': [perm(53, 53, '0.0.0.0/0', 'udp')]},
+                {'GroupId': 'sg-any', 'IpPermissions': [{'IpProtocol': '-1', 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}]},
+            ],
+            'ec2_instances': [{'Region': 'us-east-1', 'Instances': [
+                instance('i-web', ['sg-web', 'sg-ssh'], '1.1.1.1'),
+                instance('i-internal', ['sg-internal'], '2.2.2.2'),
+                instance('i-unknown', ['sg-missing'], '3.3.3.3'),
+                instance('i-private', ['sg-any']),
+                {'InstanceId': 'i-eni', 'NetworkInterfaces': [
+                    {'NetworkInterfaceId': 'eni-1', 'Association': {'PublicIp': '4.4.4.4'}, 'Groups': [{'GroupId': 'sg-dns'}]},
+                    {'NetworkInterfaceId': 'eni-2', 'Groups': [{'GroupId': 'sg-any'}]}]},
+                instance('i-any', ['sg-any', 'sg-web'], '5.5.5.5'),
+            ]}],
+        }
+
+    def findings(self, rule_id):
+        return [f for f in evaluate_all_rules(self.resources) if f['rule_id'] == rule_id]
+
+    def test_reachable_ports_per_public_instance(self):
+        exposed = {(f['resource_id'], f['port_range']): f for f in self.findings('ec2-internet-exposure')}
+        self.assertEqual(sorted(exposed), [('i-any', 'all'), ('i-eni', '53/udp'), ('i-web', '22'), ('i-web', '443'), ('i-web', '80')])
+        self.assertEqual(exposed[('i-web', '22')]['severity'], 'High')
+        self.assertEqual(exposed[('i-web', '80')]['severity'], 'Medium')
+        self.assertEqual(exposed[('i-web', '22')]['metrics'], {'public_ips': ['1.1.1.1'], 'security_groups': ['sg-ssh', 'sg-web']})
+        self.assertEqual(exposed[('i-web', '22')]['region'], 'us-east-1')
+
+    def test_public_ip_rule_only_when_groups_unknown(self):
+        self.assertEqual([f['resource_id'] for f in self.findings('ec2-public-ip')], ['i-unknown'])
+        del self.resources['security_groups']
+        self.assertEqual([f['resource_id'] for f in self.findings('ec2-public-ip')], ['i-web', 'i-internal', 'i-unknown', 'i-any'])
+
+    def test_changed_security_groups_are_reevaluated(self):
+        self.findings('ec2-internet-exposure')
+        # The same list object, mutated between evaluations
+        self.resources['security_groups'][2]['IpPermissions'].append(perm(22, 22, '0.0.0.0/0'))
+        self.assertIn(('i-internal', '22'), [(f['resource_id'], f['port_range']) for f in self.findings('ec2-internet-exposure')])
+
+    def test_open_security_groups_include_ipv6_and_broad_ranges(self):
+        opened = sorted((f['resource_id'], f['finding']) for f in self.findings('sg-open-ingress'))
+        self.assertIn(('sg-web', 'Security group open to ::/0.'), opened)
+        self.assertIn(('sg-ssh', 'Security group open to 0.0.0.0/1.'), opened)
+        self.assertNotIn('sg-internal', [group for group, _ in opened])
+
+if __name__ == '__main__':
+    unittest.main()
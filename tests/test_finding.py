@@ -0,0 +1,125 @@
+import json
+import os
+import pickle
+import sys
+import tempfile
+import types
+import unittest
+from unittest import mock
+from aws_security_scan.finding import Finding, export_jsonl, export_parquet
+from aws_security_scan.rules import evaluate_all_rules
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+class StubArray:
+    def __init__(self, values, type):
+        self.values = values
+        self.type = type
+
+    def dictionary_encode(self):
+        return StubArray(self.values, ('dictionary', 'int32', self.type))
+
+class StubParquetWriter:
+    # Keeps the written batches instead of encoding a file
+    written = []
+
+    def __init__(self, path, schema):
+        self.schema = schema
+        StubParquetWriter.written = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def write_batch(self, batch):
+        self.written.append(batch)
+
+def stub_record_batch(arrays, schema):
+    # Same check pyarrow makes: every column has its schema type
+    assert [a.type for a in arrays] == [type for _, type in schema], 'column types do not match the schema'
+    return {name: array.values for (name, _), array in zip(schema, arrays)}
+
+def stub_pyarrow():
+    # Just enough of the pyarrow API for export_parquet, so its schema and
+    # batching are tested where pyarrow is not installed
+    parquet = types.SimpleNamespace(ParquetWriter=StubParquetWriter)
+    pa = types.SimpleNamespace(string=lambda: 'string', int32=lambda: 'int32', dictionary=lambda index, value: ('dictionary', index, value),
+                               schema=list, array=StubArray, RecordBatch=types.SimpleNamespace(from_arrays=stub_record_batch), parquet=parquet)
+    return {'pyarrow': pa, 'pyarrow.parquet': parquet}
+
+def make_finding(n=0):
+    return Finding(service='EC2', resource_id=f'i-{n}', region='us-east-1', finding='EC2 instance has a public IP address.',
+                   severity='Medium', recommendation='Remove public IP.', cis_control='CIS 4.1')
+
+class TestFinding(unittest.TestCase):
+    def test_behaves_like_a_dict(self):
+        f = make_finding()
+        self.assertEqual(f['severity'], 'Medium')
+        self.assertIsNone(f.get('port_range'))
+        self.assertNotIn('port_range', f)
+        f['account_id'] = '111111111111'
+        f['days_unused'] = 120
+        self.assertEqual(f['days_unused'], 120)
+        self.assertEqual(f.metrics, {'days_unused': 120})
+        self.assertEqual(f, dict(f))
+        self.assertEqual(Finding.from_dict(dict(f)), f)
+        self.assertFalse(hasattr(f, '__dict__'))
+
+    def test_text_fields_are_interned(self):
+        a = Finding.from_dict(json.loads(json.dumps(dict(make_finding(1)))))
+        self.assertIs(a['recommendation'], make_finding(2)['recommendation'])
+
+    def test_pickles_for_the_process_pool(self):
+        f = make_finding()
+        f['rule_id'] = 'ec2-public-ip'
+        self.assertEqual(pickle.loads(pickle.dumps(f)), f)
+
+    def test_rules_yield_findings(self):
+        resources = {'ec2_instances': [{'Instances': [{'InstanceId': 'i-1', 'PublicIpAddress': '1.2.3.4'}]}]}
+        findings = evaluate_all_rules(resources)
+        self.assertIsInstance(findings[0], Finding)
+        self.assertEqual(findings[0]['rule_id'], 'ec2-public-ip')
+
+class TestExport(unittest.TestCase):
+    def test_jsonl(self):
+        findings = [make_finding(n) for n in range(3)]
+        findings[1]['days_unused'] = 95
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.findings.jsonl')
+            self.assertEqual(export_jsonl(iter(findings), path), 3)
+            with open(path, encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f]
+        self.assertEqual([r['resource_id'] for r in rows], ['i-0', 'i-1', 'i-2'])
+        self.assertEqual(rows[1]['metrics'], {'days_unused': 95})
+
+    @unittest.skipIf(pq is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        findings = [make_finding(n) for n in range(5)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.findings.parquet')
+            self.assertEqual(export_parquet(findings, path, batch_rows=2), 5)
+            table = pq.read_table(path)
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column('resource_id').to_pylist(), [f'i-{n}' for n in range(5)])
+
+    def test_parquet_schema_and_batches(self):
+        findings = [make_finding(n) for n in range(5)]
+        findings[1]['metrics'] = {'days_unused': 95}
+        with tempfile.TemporaryDirectory() as directory, mock.patch.dict(sys.modules, stub_pyarrow()):
+            self.assertEqual(export_parquet(findings, os.path.join(directory, 'report.findings.parquet'), batch_rows=2), 5)
+            batches = StubParquetWriter.written
+            # An empty export still writes one (empty) batch so the file has a schema
+            self.assertEqual(export_parquet([], os.path.join(directory, 'empty.findings.parquet')), 0)
+            empty = StubParquetWriter.written
+        self.assertEqual([len(batch['resource_id']) for batch in batches], [2, 2, 1])
+        self.assertEqual([r for batch in batches for r in batch['resource_id']], [f'i-{n}' for n in range(5)])
+        self.assertEqual(batches[0]['metrics'], [None, '{"days_unused": 95}'])
+        self.assertEqual([batch['resource_id'] for batch in empty], [[]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from aws_security_scan.finding import Finding
+from aws_security_scan.history import HistoryStore
+from aws_security_scan.report import history_html
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+def finding(rule_id, resource_id, severity='High', region='us-east-1'):
+    return Finding(service='EC2', resource_id=resource_id, finding=f'{rule_id} finding', severity=severity, region=region, rule_id=rule_id)
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'history', 'runs.db')
+        self.store = HistoryStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp.cleanup()
+
+    def record(self, day, findings, **kwargs):
+        kwargs.setdefault('account_ids', ['111'])
+        return self.store.record_run(findings, scanned_at=START + timedelta(days=day), **kwargs)
+
+    def test_open_resolved_and_reopened_findings(self):
+        self.record(0, [finding('sg-open', 'sg-1'), finding('ec2-public', 'i-1', 'Medium'), finding('iam-root', 'root', region=None)])
+        self.record(3, [finding('sg-open', 'sg-1')])
+        # A run that did not evaluate sg-open cannot resolve it
+        self.record(5, [finding('ec2-public', 'i-1', 'Medium')], rules=['ec2-public', 'iam-root'])
+        self.record(10, [], regions=['eu-west-1'])
+        over_time = {(r['run_id'], r['severity']): (r['open'], r['new'], r['resolved']) for r in self.store.open_findings_over_time('111')}
+        self.assertEqual(over_time, {
+            (1, 'High'): (2, 2, 0), (1, 'Medium'): (1, 1, 0),
+            (2, 'High'): (1, 0, 1), (2, 'Medium'): (0, 0, 1),
+            (3, 'Medium'): (1, 1, 0),
+            (4, ''): (0, 0, 0),
+        })
+        remediation = {(r['rule_id'], r['severity']): (r['remediated'], r['mean_days']) for r in self.store.time_to_remediate()}
+        self.assertEqual(remediation, {('ec2-public', 'Medium'): (1, 3.0), ('iam-root', 'High'): (1, 3.0)})
+        # The us-east-1 findings stay open after a run that only scanned eu-west-1
+        open_issues = [(i['resource_id'], i['open_since']) for i in self.store.open_issues('111')]
+        self.assertEqual(open_issues, [('sg-1', '2026-01-01T00:00:00Z'), ('i-1', '2026-01-06T00:00:00Z')])
+
+    def test_accounts_are_tracked_separately(self):
+        mine, other = finding('sg-open', 'sg-1'), finding('sg-open', 'sg-1')
+        mine['account_id'], other['account_id'] = '111', '222'
+        self.record(0, [mine, other], account_ids=['111', '222'])
+        self.record(1, [], account_ids=['111'])
+        self.assertEqual([i['account_id'] for i in self.store.open_issues()], ['222'])
+        self.assertEqual(sum(r['open'] for r in self.store.open_findings_over_time(since=START + timedelta(days=1))), 0)
+
+    def test_regions_scanned_per_account(self):
+        mine, other = finding('sg-open', 'sg-1'), finding('sg-open', 'sg-2')
+        mine['account_id'], other['account_id'] = '111', '222'
+        self.record(0, [mine, other], account_ids=['111', '222'])
+        # Only account 222 scanned us-east-1 this time
+        self.record(1, [], account_ids=['111', '222'], regions={'111': ['eu-west-1'], '222': ['us-east-1']})
+        self.assertEqual([i['account_id'] for i in self.store.open_issues()], ['111'])
+
+    def test_global_service_findings_resolve_outside_scanned_regions(self):
+        # S3 is collected account-wide; findings carry the bucket's home region
+        bucket = Finding(service='S3', resource_id='eu-bucket', finding='S3 bucket is public.', severity='High',
+                         region='eu-west-1', rule_id='s3-public-acl')
+        self.record(0, [bucket], regions=['us-east-1'])
+        self.record(1, [], regions=['us-east-1'])
+        self.assertEqual(self.store.open_issues('111'), [])
+        self.assertEqual([r['rule_id'] for r in self.store.time_to_remediate()], ['s3-public-acl'])
+
+    def test_cost_trend_uses_latest_run_per_month(self):
+        self.record(0, None, costs=[('111', '2026-01', 'EC2', 'us-east-1', 10.0), ('111', '2026-01', 'EC2', 'eu-west-1', 5.0)])
+        self.record(20, None, costs=[('111', '2026-01', 'EC2', 'us-east-1', 40.0), ('111', '2026-02', 'S3', 'us-east-1', 2.0)])
+        self.assertEqual(self.store.cost_trend('111'), [
+            {'month': '2026-01', 'service': 'EC2', 'cost': 40.0},
+            {'month': '2026-02', 'service': 'S3', 'cost': 2.0},
+        ])
+        self.assertEqual(self.store.open_findings_over_time(), [])
+
+    def test_history_persists_and_renders(self):
+        self.record(0, [finding('sg-open', 'sg-1')])
+        self.record(2, [])
+        self.store.close()
+        self.store = HistoryStore(self.path)
+        self.assertEqual(len(self.store.open_findings_over_time()), 2)
+        page = history_html(self.store.open_findings_over_time(), self.store.time_to_remediate(), self.store.cost_trend())
+        self.assertIn('sg-open', page)
+        with sqlite3.connect(self.path) as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM findings').fetchone()[0], 1)
+
+if __name__ == '__main__':
+    unittest.main()
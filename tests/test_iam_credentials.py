@@ -0,0 +1,61 @@
+import datetime
+import unittest
+from botocore.exceptions import ClientError
+from aws_security_scan.iam_credentials import collect_from_credential_report, parse_credential_report
+from aws_security_scan.rules import evaluate_all_rules
+
+HEADER = (b'user,arn,user_creation_time,password_enabled,mfa_active,access_key_1_active,access_key_1_last_rotated,'
+          b'access_key_1_last_used_date,access_key_2_active,access_key_2_last_rotated,access_key_2_last_used_date\n')
+
+def report(*rows):
+    return HEADER + b''.join(row.encode() + b'\n' for row in rows)
+
+def iso(days_ago):
+    return (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days_ago)).isoformat()
+
+class FakeIam:
+    def __init__(self, states, content=b'', error=None):
+        self.states = list(states)
+        self.content = content
+        self.error = error
+
+    def generate_credential_report(self):
+        if self.error:
+            raise ClientError({'Error': {'Code': self.error}}, 'GenerateCredentialReport')
+        return {'State': self.states.pop(0)}
+
+    def get_credential_report(self):
+        return {'Content': self.content}
+
+class TestCredentialReport(unittest.TestCase):
+    def test_parse_report(self):
+        content = report(
+            f'<root_account>,arn:aws:iam::1:root,{iso(900)},not_supported,true,false,N/A,N/A,false,N/A,N/A',
+            f'alice,arn:aws:iam::1:user/alice,{iso(400)},true,true,true,{iso(300)},{iso(1)},false,N/A,N/A',
+            f'bob,arn:aws:iam::1:user/bob,{iso(400)},false,false,true,{iso(200)},N/A,false,{iso(100)},{iso(95)}',
+        )
+        resources = parse_credential_report(content)
+        self.assertEqual([u['UserName'] for u in resources['iam_users']], ['alice', 'bob'])
+        self.assertEqual(resources['iam_mfa'], {'alice': {'MFAActive': True}, 'bob': {'MFAActive': False}})
+        bob_keys = resources['iam_access_keys']['bob']
+        self.assertEqual([k['AccessKeyId'] for k in bob_keys], ['access_key_1', 'access_key_2'])
+        self.assertIsNone(bob_keys[0]['LastUsedDate'])
+        self.assertEqual(bob_keys[1]['Status'], 'Inactive')
+
+        findings = evaluate_all_rules(resources)
+        mfa = [f['resource_id'] for f in findings if f['finding'] == 'User has no MFA enabled.']
+        self.assertEqual(mfa, ['bob'])
+        # alice's key is old but was used yesterday; bob's keys are stale
+        stale = sorted(f['resource_id'] for f in findings if f['service'] == 'IAM' and f['severity'] == 'Low')
+        self.assertEqual(stale, ['bob:access_key_1', 'bob:access_key_2'])
+
+    def test_waits_for_report(self):
+        iam = FakeIam(['STARTED', 'INPROGRESS', 'COMPLETE'], report())
+        self.assertEqual(collect_from_credential_report(iam, poll_interval=0), {'iam_users': [], 'iam_mfa': {}, 'iam_access_keys': {}})
+
+    def test_unavailable_report_returns_none(self):
+        self.assertIsNone(collect_from_credential_report(FakeIam([], error='AccessDenied'), poll_interval=0))
+        self.assertIsNone(collect_from_credential_report(FakeIam(['STARTED'] * 5), poll_interval=0, timeout=-1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+from botocore.exceptions import ClientError
+from aws_security_scan.iam_policies import analyze_document, collect_role_policies
+from aws_security_scan.rules import evaluate_all_rules
+
+ROLE = 'arn:aws:iam::123456789012:role/service-role/{}'
+BASIC = 'arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole'
+ADMIN = 'arn:aws:iam::aws:policy/AdministratorAccess'
+
+def allow(action, resource='*', **extra):
+    return {'Version': '2012-10-17', 'Statement': [dict({'Effect': 'Allow', 'Action': action, 'Resource': resource}, **extra)]}
+
+class FakeIam:
+    # Roles: {name: ([managed ARNs], {inline name: document})}; managed: {ARN: document}
+    def __init__(self, roles, managed):
+        self.roles = roles
+        self.managed = managed
+        self.calls = []
+
+    def get_paginator(self, method):
+        def paginate(RoleName):
+            self.calls.append((method, RoleName))
+            if RoleName not in self.roles:
+                raise ClientError({'Error': {'Code': 'AccessDenied'}}, method)
+            attached, inline = self.roles[RoleName]
+            if method == 'list_attached_role_policies':
+                return [{'AttachedPolicies': [{'PolicyArn': arn} for arn in attached]}]
+            return [{'PolicyNames': list(inline)}]
+        return mock.Mock(paginate=paginate)
+
+    def get_role_policy(self, RoleName, PolicyName):
+        return {'PolicyDocument': self.roles[RoleName][1][PolicyName]}
+
+    def get_policy(self, PolicyArn):
+        self.calls.append(('get_policy', PolicyArn))
+        return {'Policy': {'DefaultVersionId': 'v3'}}
+
+    def get_policy_version(self, PolicyArn, VersionId):
+        return {'PolicyVersion': {'Document': self.managed[PolicyArn]}}
+
+class TestAnalyzeDocument(unittest.TestCase):
+    def test_admin_wildcards_and_sensitive_actions(self):
+        self.assertTrue(analyze_document(allow('*'))['admin'])
+        self.assertFalse(analyze_document(allow('*', 'arn:aws:s3:::bucket/*'))['admin'])
+        s3 = analyze_document(allow(['s3:*', 'logs:PutLogEvents']))
+        self.assertEqual(s3['wildcard_actions'], {'s3:*'})
+        self.assertIn('s3:GetObject', s3['sensitive_actions'])
+        scoped = analyze_document(allow('S3:get*', 'arn:aws:s3:::bucket/*'))
+        self.assertEqual(scoped['sensitive_actions'], set())
+        self.assertIn('iam:PassRole', analyze_document(allow('iam:Pass*'))['sensitive_actions'])
+
+    def test_deny_and_not_action(self):
+        self.assertEqual(analyze_document({'Statement': {'Effect': 'Deny', 'Action': '*', 'Resource': '*'}}),
+                         {'admin': False, 'wildcard_actions': set(), 'sensitive_actions': set()})
+        doc = {'Statement': [{'Effect': 'Allow', 'NotAction': 'iam:*', 'Resource': '*'}]}
+        granted = analyze_document(doc)
+        self.assertIn('NotAction', granted['wildcard_actions'])
+        self.assertIn('s3:DeleteBucket', granted['sensitive_actions'])
+        self.assertNotIn('iam:PassRole', granted['sensitive_actions'])
+
+class TestLambdaLeastPrivilege(unittest.TestCase):
+    def setUp(self):
+        self.iam = FakeIam({
+            'basic': ([BASIC], {}),
+            'data': ([BASIC], {'data-access': allow('s3:*')}),
+            'admin': ([BASIC, ADMIN], {}),
+        }, {BASIC: allow(['logs:CreateLogStream', 'logs:PutLogEvents']), ADMIN: allow('*')})
+        self.functions = [{'FunctionName': f'fn-{i}', 'Region': 'us-east-1', 'Role': ROLE.format(name)}
+                          for i, name in enumerate(['basic', 'data', 'admin', 'missing', 'data', 'basic'])]
+
+    def test_roles_and_managed_policies_fetched_once(self):
+        collected = collect_role_policies(self.iam, [fn['Role'] for fn in self.functions], max_workers=2)
+        self.assertEqual(sorted(collected['iam_managed_policies']), [ADMIN, BASIC])
+        self.assertEqual(collected['iam_role_policies'][ROLE.format('missing')], {'Error': 'AccessDenied'})
+        self.assertEqual(sorted(c for c in self.iam.calls if c[0] == 'get_policy'), [('get_policy', ADMIN), ('get_policy', BASIC)])
+        self.assertEqual(len([c for c in self.iam.calls if c[0] == 'list_role_policies']), 3)
+
+    def test_findings_per_function(self):
+        resources = dict(collect_role_policies(self.iam, [fn['Role'] for fn in self.functions]), lambda_functions=self.functions)
+        findings = sorted((f['resource_id'], f['severity'], f['finding'])
+                          for f in evaluate_all_rules(resources) if f['rule_id'] == 'lambda-least-privilege')
+        self.assertEqual(findings, [
+            ('fn-1', 'Medium', 'Lambda function role allows sensitive actions on all resources.'),
+            ('fn-1', 'Medium', 'Lambda function role allows wildcard actions.'),
+            ('fn-2', 'High', 'Lambda function role grants full administrative access.'),
+            ('fn-3', 'Low', 'Lambda function role could not be analyzed.'),
+            ('fn-4', 'Medium', 'Lambda function role allows sensitive actions on all resources.'),
+            ('fn-4', 'Medium', 'Lambda function role allows wildcard actions.'),
+        ])
+
+if __name__ == '__main__':
+    unittest.main()
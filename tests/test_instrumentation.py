@@ -0,0 +1,39 @@
+import unittest
+import boto3
+from aws_security_scan.instrumentation import ApiProfiler
+from aws_security_scan.throttle import CallScheduler
+from aws_fakes import FakeClock, fake_transport
+
+class TestApiProfiler(unittest.TestCase):
+    def test_calls_attempts_throttles_and_bytes_per_operation(self):
+        session = boto3.Session(aws_access_key_id='x', aws_secret_access_key='y', region_name='us-east-1')
+        CallScheduler(sleep=lambda seconds: None, base_delay=0.0).install(session)
+        profiler = ApiProfiler().install(session)
+        client = session.client('ecs')
+        client.meta.events.register('before-send', fake_transport([400, 200]))
+        client.list_clusters()
+        stat = profiler.apis[('ecs', 'ListClusters')]
+        self.assertEqual((stat['calls'], stat['attempts'], stat['retries'], stat['throttles'], stat['errors']), (1, 2, 1, 1, 0))
+        self.assertGreater(stat['bytes'], 0)
+        self.assertEqual(sum(stat['histogram']), 1)
+        profile = profiler.profile()
+        self.assertEqual(profile['totals']['calls'], 1)
+        self.assertIn('ListClusters', profiler.diagnostics_html())
+
+    def test_phases_accumulate_and_running_phases_are_reported(self):
+        clock, cpu = FakeClock(), FakeClock()
+        profiler = ApiProfiler(clock=clock, cpu_clock=cpu)
+        for _ in range(2):
+            with profiler.phase('discovery'):
+                clock.now += 2
+                cpu.now += 1
+        with profiler.phase('report'):
+            clock.now += 5
+            phases = {p['name']: p for p in profiler.profile()['phases']}
+            self.assertEqual((phases['discovery']['seconds'], phases['discovery']['cpu_seconds']), (4, 2))
+            self.assertTrue(phases['report']['running'])
+            self.assertIn('report (still running)', profiler.diagnostics_html())
+        self.assertFalse(profiler.profile()['phases'][-1]['running'])
+
+if __name__ == '__main__':
+    unittest.main()
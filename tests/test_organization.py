@@ -0,0 +1,42 @@
+import unittest
+from aws_security_scan.organization import OrganizationScanner
+from aws_security_scan.report import ReportGenerator
+from test_scanner import FakeSession
+
+class TestOrganizationScanner(unittest.TestCase):
+    def setUp(self):
+        self.assumed = []
+
+    def session_factory(self, session, account_id, role_name):
+        self.assumed.append((account_id, role_name))
+        if account_id == '999999999999':
+            raise RuntimeError('AccessDenied')
+        return FakeSession()
+
+    def test_accounts_scanned_in_parallel_with_failures_isolated(self):
+        org = OrganizationScanner(FakeSession(), ['111111111111', '123456789012', '999999999999'], role_name='Audit',
+                                  max_accounts=3, session_factory=self.session_factory)
+        findings = org.run_all_checks()
+        # The caller's own account (123456789012 in FakeSession) needs no role assumption
+        self.assertEqual(sorted(self.assumed), [('111111111111', 'Audit'), ('999999999999', 'Audit')])
+        self.assertEqual({f['account_id'] for f in findings}, {'111111111111', '123456789012'})
+        self.assertEqual(list(org.failed_accounts()), ['999999999999'])
+        self.assertIn('AccessDenied', org.failed_accounts()['999999999999'])
+        self.assertEqual(org.results['111111111111']['findings'], sum(1 for f in findings if f['account_id'] == '111111111111'))
+        # Regions each account actually scanned, for the history store
+        self.assertEqual(org.results['111111111111']['regions'], ['us-east-1'])
+
+    def test_report_has_per_account_rollup(self):
+        findings = [
+            {'service': 'EC2', 'resource_id': 'i-1', 'finding': 'f', 'severity': 'High', 'account_id': '111111111111'},
+            {'service': 'IAM', 'resource_id': 'bob', 'finding': 'f', 'severity': 'Low', 'account_id': '222222222222'},
+        ]
+        report = ReportGenerator(findings, 'Organization (3 accounts)', account_errors={'333333333333': 'AccessDenied'})
+        summary = report._generate_summary(report._aggregate())
+        self.assertEqual([row['account_id'] for row in summary['account_table']], ['111111111111', '222222222222'])
+        html = report.generate_html_string()
+        self.assertIn('Findings by Account', html)
+        self.assertIn('333333333333', html)
+
+if __name__ == '__main__':
+    unittest.main()
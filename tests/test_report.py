@@ -0,0 +1,72 @@
+import json
+import os
+import re
+import tempfile
+import unittest
+from plotly.offline import get_plotlyjs
+from aws_security_scan.report import ReportGenerator, write_combined_report
+
+def finding_pages(html):
+    return [json.loads(page) for page in re.findall(r'<script type="application/json" class="findings-chunk">(.*?)</script>', html)]
+
+class TestStreamingReport(unittest.TestCase):
+    def setUp(self):
+        self.findings = [{'service': 'EC2', 'resource_id': f'i-{n}', 'region': 'us-east-1', 'finding': 'f',
+                          'severity': 'High', 'recommendation': 'r'} for n in range(1201)]
+        self.findings[0]['finding'] = '</script><script>alert(1)</script>'
+
+    def test_findings_are_paginated_and_escaped(self):
+        html = ReportGenerator(self.findings, '123', page_size=500).generate_html_string()
+        pages = finding_pages(html)
+        self.assertEqual([len(p) for p in pages], [500, 500, 201])
+        self.assertEqual(pages[2][-1][2], 'i-1200')
+        self.assertEqual(pages[0][0][4], '</script><script>alert(1)</script>')
+        self.assertNotIn('<script>alert(1)', html)
+
+    def test_combined_report_is_streamed_to_file(self):
+        report = ReportGenerator(self.findings, '123')
+        chunks = report.iter_html()
+        self.assertFalse(isinstance(chunks, str))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'out', 'report.html')
+            write_combined_report(path, [
+                {'id': 'Security', 'title': 'Security Report', 'chunks': chunks},
+                {'id': 'Cost', 'title': 'Cost Report', 'chunks': ['<h2>AWS Cost Report</h2>']},
+            ])
+            with open(path, encoding='utf-8') as f:
+                html = f.read()
+        self.assertIn('id="defaultOpen" onclick="openTab(event, \'Security\')"', html)
+        self.assertIn('<h2>AWS Cost Report</h2>', html)
+        self.assertEqual(sum(len(p) for p in finding_pages(html)), 1201)
+
+class TestAggregation(unittest.TestCase):
+    def test_summary_and_charts_come_from_one_aggregate(self):
+        findings = [{'service': s, 'severity': sev, 'resource_id': 'r', 'finding': 'f'}
+                    for s, sev, n in [('EC2', 'High', 3), ('EC2', 'Low', 1), ('S3', 'High', 2)] for _ in range(n)]
+        report = ReportGenerator(findings, '123')
+        aggregates = report._aggregate()
+        self.assertEqual(len(aggregates), 3)
+        summary = report._generate_summary(aggregates)
+        self.assertEqual((summary['total'], summary['high'], summary['medium'], summary['low']), (6, 5, 0, 1))
+        self.assertEqual(summary['service_table'], [{'service': 'EC2', 'High': 3, 'Low': 1}, {'service': 'S3', 'High': 2, 'Low': 0}])
+        self.assertEqual(summary['account_table'], [])
+
+    def test_empty_report(self):
+        html = ReportGenerator([], '123').generate_html_string()
+        self.assertIn('Total Findings:</b> 0', html)
+
+    def test_offline_bundle_is_embedded_once(self):
+        marker = get_plotlyjs()[:200]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.html')
+            tabs = [{'id': 'Security', 'title': 'Security Report',
+                     'chunks': ReportGenerator([{'service': 'EC2', 'severity': 'High'}], '123', plotly_js='none').iter_html()}]
+            write_combined_report(path, tabs, plotly_js='embed')
+            with open(path, encoding='utf-8') as f:
+                html = f.read()
+        self.assertEqual(html.count(marker), 1)
+        self.assertEqual(html.count('src="https://cdn.plot.ly'), 0)
+        self.assertEqual(html.count('Plotly.newPlot'), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,5 @@
 import unittest
-from aws_security_scan.rules import evaluate_all_rules
+from aws_security_scan.rules import RULES, evaluate_all_rules, select_rules
 
 class TestRules(unittest.TestCase):
     def test_ec2_public_ip(self):
@@ -13,5 +13,37 @@ class TestRules(unittest.TestCase):
         self.assertTrue(any(f['resource_id'] == 'i-123' for f in findings))
         self.assertFalse(any(f['resource_id'] == 'i-456' for f in findings))
 
+    def test_rules_dispatch_only_for_collected_resources(self):
+        stats = {}
+        findings = evaluate_all_rules({'ec2_instances': [], 'cloudtrails': []}, stats=stats)
+        self.assertEqual(set(stats), {'ec2-public-ip', 'cloudtrail-enabled'})
+        self.assertEqual([f['rule_id'] for f in findings], ['cloudtrail-enabled'])
+        self.assertEqual(stats['cloudtrail-enabled']['findings'], 1)
+
+    def test_enable_and_disable_by_id_or_group(self):
+        self.assertEqual([r.rule_id for r in select_rules(enabled=['iam'])], ['iam-user-mfa', 'iam-stale-access-key'])
+        self.assertNotIn('ec2-public-ip', [r.rule_id for r in select_rules(disabled=['ec2-public-ip'])])
+        self.assertEqual(len(select_rules()), len(RULES))
+        with self.assertRaises(ValueError):
+            select_rules(enabled=['no-such-rule'])
+
+    def test_parallel_evaluation_matches_serial(self):
+        open_perm = {'FromPort': 22, 'ToPort': 22, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}
+        resources = {
+            'regions': ['us-east-1'],
+            'ec2_instances': [{'Instances': [{'InstanceId': f'i-{n}', 'PublicIpAddress': '1.2.3.4'}]} for n in range(50)],
+            'security_groups': [{'GroupId': f'sg-{n}', 'IpPermissions': [open_perm] if n % 3 else []} for n in range(50)],
+            'iam_users': [{'UserName': f'u{n}'} for n in range(30)],
+            'iam_mfa': {},
+            'iam_access_keys': {f'u{n}': [] for n in range(30)},
+            'cloudtrails': [],
+            'guardduty': {},
+        }
+        serial = evaluate_all_rules(resources)
+        stats = {}
+        parallel = evaluate_all_rules(resources, stats=stats, workers=2, chunk_size=7)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(stats['sg-open-ingress']['findings'], sum(1 for f in serial if f['rule_id'] == 'sg-open-ingress'))
+
 if __name__ == '__main__':
     unittest.main()
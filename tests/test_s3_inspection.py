@@ -0,0 +1,78 @@
+import unittest
+from botocore.exceptions import ClientError, EndpointConnectionError
+from aws_security_scan.s3_inspection import BucketInspector, bucket_region
+
+def client_error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'Operation')
+
+class FakeS3:
+    def __init__(self, region, calls):
+        self.region = region
+        self.calls = calls
+
+    def _record(self, operation, bucket):
+        self.calls.append((self.region, operation, bucket))
+
+    def get_bucket_location(self, Bucket):
+        self._record('location', Bucket)
+        return {'LocationConstraint': {'eu-bucket': 'EU'}.get(Bucket)}
+
+    def get_bucket_acl(self, Bucket):
+        self._record('acl', Bucket)
+        if Bucket == 'broken':
+            raise client_error('AccessDenied')
+        return {'Grants': [], 'Owner': {'ID': 'o'}, 'ResponseMetadata': {}}
+
+    def get_bucket_policy(self, Bucket):
+        self._record('policy', Bucket)
+        if Bucket == 'eu-bucket':
+            return {'Policy': '{"Statement": []}'}
+        raise client_error('NoSuchBucketPolicy')
+
+    def get_public_access_block(self, Bucket):
+        self._record('public_access_block', Bucket)
+        raise client_error('NoSuchPublicAccessBlockConfiguration')
+
+    def get_bucket_encryption(self, Bucket):
+        self._record('encryption', Bucket)
+        if Bucket == 'unreachable':
+            raise EndpointConnectionError(endpoint_url='https://unreachable.s3.amazonaws.com')
+        return {'ServerSideEncryptionConfiguration': {'Rules': []}}
+
+class TestBucketInspector(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.inspector = BucketInspector(lambda service, region=None: FakeS3(region, self.calls), max_workers=4)
+
+    def test_bucket_region(self):
+        self.assertEqual(bucket_region(None), 'us-east-1')
+        self.assertEqual(bucket_region('EU'), 'eu-west-1')
+        self.assertEqual(bucket_region('ap-south-1'), 'ap-south-1')
+
+    def test_one_call_per_attribute_in_home_region(self):
+        buckets = [{'Name': 'eu-bucket'}, {'Name': 'us-bucket'}, {'Name': 'tagged', 'BucketRegion': 'ap-south-1'}]
+        resources = self.inspector.inspect(buckets)
+        for name in ['eu-bucket', 'us-bucket', 'tagged']:
+            for attribute in ['acl', 'policy', 'public_access_block', 'encryption']:
+                self.assertEqual(sum(1 for c in self.calls if c[1:] == (attribute, name)), 1)
+        self.assertNotIn(('location', 'tagged'), [c[1:] for c in self.calls])
+        self.assertIn(('eu-west-1', 'acl', 'eu-bucket'), self.calls)
+        self.assertEqual([b['Region'] for b in resources['s3_buckets']], ['eu-west-1', 'us-east-1', 'ap-south-1'])
+        self.assertEqual(resources['s3_bucket_policies'], {'eu-bucket': '{"Statement": []}'})
+        self.assertNotIn('ResponseMetadata', resources['s3_bucket_acls']['us-bucket'])
+        self.assertIsNone(resources['s3_public_access_blocks']['us-bucket'])
+        self.assertEqual(resources['s3_bucket_errors'], {})
+
+    def test_errors_are_recorded_per_bucket(self):
+        resources = self.inspector.inspect([{'Name': 'broken'}, {'Name': 'eu-bucket'}])
+        self.assertEqual(resources['s3_bucket_errors'], {'broken': {'acl': 'AccessDenied'}})
+        self.assertIn('eu-bucket', resources['s3_bucket_acls'])
+        self.assertIn('eu-bucket', resources['s3_bucket_policies'])
+
+    def test_connection_errors_are_recorded_per_bucket(self):
+        resources = self.inspector.inspect([{'Name': 'unreachable'}, {'Name': 'us-bucket'}])
+        self.assertEqual(resources['s3_bucket_errors'], {'unreachable': {'encryption': 'EndpointConnectionError'}})
+        self.assertIn('us-bucket', resources['s3_bucket_encryption'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+import time
+import unittest
+from aws_security_scan.scanner import Scanner
+
+class FakePaginator:
+    def __init__(self, client, operation):
+        self.client = client
+        self.operation = operation
+
+    def paginate(self, **kwargs):
+        for page in FAKE_PAGES.get(self.operation, [FAKE_RESPONSES[self.operation]]):
+            time.sleep(self.client.delay)
+            self.client.pages_served.append(self.operation)
+            yield page
+
+class FakeClient:
+    def __init__(self, service, delay):
+        self.service = service
+        self.delay = delay
+        self.pages_served = []
+
+    def get_paginator(self, operation):
+        return FakePaginator(self, operation)
+
+    def __getattr__(self, name):
+        def call(**kwargs):
+            time.sleep(self.delay)
+            return FAKE_RESPONSES[name]
+        return call
+
+FAKE_PAGES = {
+    'describe_security_groups': [
+        {'SecurityGroups': [{'GroupId': 'sg-1', 'IpPermissions': []}]},
+        {'SecurityGroups': [{'GroupId': 'sg-2', 'IpPermissions': [
+            {'FromPort': 22, 'ToPort': 22, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}]}]},
+    ],
+}
+
+class FakeSession:
+    region_name = 'us-east-1'
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.created = []
+        self.clients = []
+
+    def client(self, service, region_name=None, **kwargs):
+        self.created.append((service, region_name))
+        client = FakeClient(service, self.delay)
+        self.clients.append(client)
+        return client
+
+    def get_partition_for_region(self, region):
+        return 'aws'
+
+FAKE_RESPONSES = {
+    'get_caller_identity': {'Account': '123456789012'},
+    'describe_instances': {'Reservations': [{'Instances': [{'InstanceId': 'i-1', 'PublicIpAddress': '1.2.3.4'}]}]},
+    'describe_security_groups': {'SecurityGroups': []},
+    'describe_vpcs': {'Vpcs': []},
+    'list_buckets': {'Buckets': []},
+    'list_users': {'Users': [{'UserName': 'alice'}]},
+    'list_mfa_devices': {'MFADevices': []},
+    'list_access_keys': {'AccessKeyMetadata': []},
+    'describe_db_instances': {'DBInstances': []},
+    'list_functions': {'Functions': []},
+    'describe_trails': {'trailList': []},
+    'list_detectors': {'DetectorIds': []},
+    'list_clusters': {'clusterArns': [], 'clusters': ['prod']},
+    'generate_credential_report': {'State': 'COMPLETE'},
+    'get_credential_report': {'Content': (
+        b'user,arn,user_creation_time,password_enabled,mfa_active,access_key_1_active,access_key_1_last_rotated,'
+        b'access_key_1_last_used_date,access_key_2_active,access_key_2_last_rotated,access_key_2_last_used_date\n'
+        b'alice,arn:aws:iam::123456789012:user/alice,2020-01-01T00:00:00+00:00,true,false,false,N/A,N/A,false,N/A,N/A\n'
+    )},
+    'describe_regions': {'Regions': [{'RegionName': 'us-east-1'}, {'RegionName': 'eu-west-1'}]},
+}
+
+class TestScanner(unittest.TestCase):
+    def test_discover_resources_fills_all_keys(self):
+        scanner = Scanner(session=FakeSession())
+        resources = scanner.discover_resources()
+        for key in ['ec2_instances', 'security_groups', 's3_buckets', 'iam_mfa', 'rds_instances',
+                    'lambda_functions', 'cloudtrails', 'guardduty', 'ecs_clusters', 'eks_clusters']:
+            self.assertIn(key, resources)
+        expected = set(scanner.global_collectors()) | {f"{n}@us-east-1" for n in scanner.regional_collectors()} | {'lambda-roles'}
+        self.assertEqual(set(scanner.timings), expected)
+        self.assertEqual(resources['regions'], ['us-east-1'])
+
+    def test_lambda_roles_collected_only_for_selected_rules(self):
+        session = FakeSession()
+        scanner = Scanner(session=session)
+        resources = scanner.discover_resources(disabled_rules=['lambda-least-privilege'])
+        self.assertNotIn('iam_role_policies', resources)
+        self.assertNotIn('lambda-roles', scanner.timings)
+        resources = scanner.discover_resources(enabled_rules=['lambda'])
+        self.assertIn('iam_role_policies', resources)
+
+    def test_collectors_run_concurrently(self):
+        scanner = Scanner(session=FakeSession(delay=0.05), max_workers=16)
+        start = time.perf_counter()
+        scanner.discover_resources()
+        elapsed = time.perf_counter() - start
+        # Serially this would be well over a second of fake round-trips
+        self.assertLess(elapsed, sum(scanner.timings.values()))
+
+    def test_run_all_checks(self):
+        findings, account_id = Scanner(session=FakeSession()).run_all_checks()
+        self.assertEqual(account_id, '123456789012')
+        self.assertTrue(any(f['resource_id'] == 'i-1' for f in findings))
+
+    def test_all_regions_are_scanned_and_tagged(self):
+        session = FakeSession()
+        scanner = Scanner(session=session, regions='all')
+        resources = scanner.discover_resources()
+        self.assertEqual(resources['regions'], ['eu-west-1', 'us-east-1'])
+        self.assertEqual(sorted(r['Region'] for r in resources['ec2_instances']), ['eu-west-1', 'us-east-1'])
+        self.assertIn('arn:aws:eks:eu-west-1:123456789012:cluster/prod', resources['eks_clusters'])
+        # Global services are collected once, regional ones once per region
+        self.assertEqual(session.created.count(('iam', 'us-east-1')), 1)
+        self.assertEqual({r for s, r in session.created if s == 'rds'}, {'us-east-1', 'eu-west-1'})
+
+    def test_findings_are_tagged_with_region(self):
+        findings, _ = Scanner(session=FakeSession(), regions=['us-east-1', 'eu-west-1']).run_all_checks()
+        ec2_regions = sorted(f['region'] for f in findings if f['service'] == 'EC2')
+        self.assertEqual(ec2_regions, ['eu-west-1', 'us-east-1'])
+        guardduty_regions = sorted(f['region'] for f in findings if f['service'] == 'GuardDuty')
+        self.assertEqual(guardduty_regions, ['eu-west-1', 'us-east-1'])
+
+    def test_every_page_is_collected(self):
+        resources = Scanner(session=FakeSession()).discover_resources()
+        self.assertEqual([sg['GroupId'] for sg in resources['security_groups']], ['sg-1', 'sg-2'])
+
+    def test_stream_mode_fetches_pages_lazily(self):
+        session = FakeSession()
+        resources = Scanner(session=session).discover_resources(stream=True)
+        served = lambda: sum(c.pages_served.count('describe_security_groups') for c in session.clients)
+        self.assertEqual(served(), 0)
+        groups = resources['security_groups']
+        self.assertEqual(next(groups)['GroupId'], 'sg-1')
+        self.assertEqual(served(), 1)
+        self.assertEqual(next(groups)['Region'], 'us-east-1')
+        self.assertEqual(served(), 2)
+
+    def test_stream_mode_findings_match_materialized(self):
+        streamed, _ = Scanner(session=FakeSession()).run_all_checks(stream=True)
+        materialized, _ = Scanner(session=FakeSession()).run_all_checks()
+        self.assertEqual(streamed, materialized)
+
+    def test_stream_mode_keeps_instances_streamed_with_default_rules(self):
+        scanner = Scanner(session=FakeSession())
+        scanner.run_all_checks(stream=True)
+        # Every EC2 rule shares one pass over the stream instead of materializing it
+        self.assertIn('ec2-internet-exposure', scanner.rule_stats)
+        self.assertNotIsInstance(scanner.resources['ec2_instances'], list)
+        self.assertNotIsInstance(scanner.resources['security_groups'], list)
+
+    def test_stream_mode_records_instances_for_the_cost_report(self):
+        scanner = Scanner(session=FakeSession(), regions=['us-east-1', 'eu-west-1'])
+        scanner.run_all_checks(stream=True)
+        expected = [{'Region': 'us-east-1', 'Instances': [{'InstanceId': 'i-1'}]}, {'Region': 'eu-west-1', 'Instances': [{'InstanceId': 'i-1'}]}]
+        self.assertEqual(scanner.instance_inventory(), expected)
+        # Pages no selected rule read are fetched for the inventory
+        scanner = Scanner(session=FakeSession(), regions=['us-east-1', 'eu-west-1'])
+        scanner.run_all_checks(stream=True, enabled_rules=['s3'])
+        self.assertEqual(scanner.instance_inventory(), expected)
+
+    def test_iam_uses_credential_report(self):
+        session = FakeSession()
+        resources = Scanner(session=session).discover_resources()
+        self.assertEqual([u['UserName'] for u in resources['iam_users']], ['alice'])
+        self.assertEqual(resources['iam_mfa'], {'alice': {'MFAActive': False}})
+        iam_pages = [p for c in session.clients if c.service == 'iam' for p in c.pages_served]
+        self.assertNotIn('list_mfa_devices', iam_pages)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from aws_security_scan.rules import evaluate_all_rules
+from aws_security_scan.snapshot import find_latest_snapshot, load_snapshot, parse_age, prune_snapshots, region_key, save_snapshot
+
+RESOURCES = {
+    'regions': ['us-east-1'],
+    'ec2_instances': [{'Region': 'us-east-1', 'Instances': [{'InstanceId': 'i-1', 'PublicIpAddress': '1.2.3.4'}]}],
+    'iam_access_keys': {'alice': [{'AccessKeyId': 'AKIA1', 'CreateDate': datetime(2020, 1, 1, tzinfo=timezone.utc)}]},
+    'cloudtrails': [],
+}
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_preserves_resources_and_findings(self):
+        path = save_snapshot(RESOURCES, '123456789012', self.dir)
+        self.assertTrue(path.endswith('.json.gz'))
+        self.assertIn(os.path.join('123456789012', 'us-east-1'), path)
+        snapshot = load_snapshot(path)
+        self.assertEqual(snapshot['resources'], RESOURCES)
+        self.assertEqual(snapshot['account_id'], '123456789012')
+        self.assertEqual(evaluate_all_rules(snapshot['resources']), evaluate_all_rules(RESOURCES))
+
+    def test_version_mismatch_is_rejected(self):
+        path = os.path.join(self.dir, 'old.json.gz')
+        with gzip.open(path, 'wt') as f:
+            json.dump({'version': 0, 'resources': {}}, f)
+        with self.assertRaises(ValueError):
+            load_snapshot(path)
+
+    def test_find_latest_respects_max_age(self):
+        now = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+        save_snapshot(RESOURCES, '1', self.dir, created_at=now - timedelta(hours=5))
+        newest = save_snapshot(RESOURCES, '1', self.dir, created_at=now - timedelta(hours=2))
+        save_snapshot(RESOURCES, '2', self.dir, regions=['eu-west-1'], created_at=now - timedelta(hours=3))
+        self.assertEqual(find_latest_snapshot(self.dir, '1', ['us-east-1'], now=now), newest)
+        self.assertEqual(find_latest_snapshot(self.dir, max_age=timedelta(hours=3), now=now), newest)
+        self.assertIsNone(find_latest_snapshot(self.dir, '1', max_age=timedelta(hours=1), now=now))
+        self.assertIsNone(find_latest_snapshot(self.dir, '1', ['eu-west-1'], now=now))
+
+    def test_prune_keeps_the_newest_snapshots(self):
+        now = datetime(2025, 6, 1, 12, tzinfo=timezone.utc)
+        paths = [save_snapshot(RESOURCES, '1', self.dir, created_at=now - timedelta(hours=h)) for h in (1, 4, 2, 3)]
+        other = save_snapshot(RESOURCES, '1', self.dir, regions=['eu-west-1'], created_at=now - timedelta(hours=9))
+        self.assertEqual(prune_snapshots(self.dir, '1', ['us-east-1'], keep=0), [])
+        self.assertEqual(prune_snapshots(self.dir, '1', ['us-east-1'], keep=2), [paths[1], paths[3]])
+        self.assertEqual([p for p in paths + [other] if os.path.exists(p)], [paths[0], paths[2], other])
+
+    def test_parse_age_and_region_key(self):
+        self.assertEqual(parse_age('90'), timedelta(seconds=90))
+        self.assertEqual(parse_age('6h'), timedelta(hours=6))
+        self.assertEqual(parse_age('2d'), timedelta(days=2))
+        with self.assertRaises(ValueError):
+            parse_age('soon')
+        self.assertEqual(region_key(['us-east-1', 'eu-west-1']), 'eu-west-1_us-east-1')
+        self.assertTrue(region_key([f'r{n}' for n in range(17)]).startswith('17-regions-'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+HEAVY_MODULES = ('boto3', 'botocore', 'pandas', 'numpy', 'plotly', 'jinja2')
+
+def run_python(code):
+    return subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+
+class TestStartup(unittest.TestCase):
+    # Guards CLI startup time: heavy dependencies must only load in the phases that use them
+    def test_help_does_not_import_heavy_dependencies(self):
+        out = run_python(
+            "import sys, contextlib, io, main\n"
+            "with contextlib.redirect_stdout(io.StringIO()), contextlib.suppress(SystemExit):\n"
+            "    main.main(['--help'])\n"
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        self.assertEqual(out.strip(), '')
+
+    def test_security_scan_modules_do_not_import_cost_stack(self):
+        out = run_python(
+            "import sys, aws_security_scan.scanner, aws_security_scan.organization\n"
+            "print(','.join(m for m in ('pandas', 'plotly', 'reports.aws_cost_report') if m in sys.modules))"
+        )
+        self.assertEqual(out.strip(), '')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import boto3
+from botocore.exceptions import ClientError
+from aws_security_scan.throttle import CallScheduler, TokenBucket, is_throttle_error
+from aws_fakes import FakeClock, fake_transport
+
+def session_with_transport(statuses, scheduler):
+    session = boto3.Session(aws_access_key_id='x', aws_secret_access_key='y', region_name='us-east-1')
+    scheduler.install(session)
+    client = session.client('ecs')
+    # Registered after the scheduler so the scheduler's rate limiting runs first
+    client.meta.events.register('before-send', fake_transport(statuses))
+    return client
+
+class TestTokenBucket(unittest.TestCase):
+    def test_waits_once_burst_is_spent_and_adapts(self):
+        clock = FakeClock()
+        bucket = TokenBucket(2, max_rate=4, clock=clock)
+        self.assertEqual([bucket.reserve(), bucket.reserve()], [0.0, 0.0])
+        self.assertAlmostEqual(bucket.reserve(), 0.5)
+        bucket.on_throttle()
+        self.assertEqual(bucket.rate, 1.0)
+        # Grows past the starting rate, up to the ceiling
+        for _ in range(100):
+            bucket.on_success()
+        self.assertEqual(bucket.rate, 4.0)
+
+class TestCallScheduler(unittest.TestCase):
+    def test_throttled_calls_are_retried_with_backoff(self):
+        sleeps = []
+        scheduler = CallScheduler(sleep=sleeps.append, base_delay=0.0)
+        client = session_with_transport([400, 400, 200], scheduler)
+        self.assertEqual(client.list_clusters()['clusterArns'], [])
+        stat = scheduler.stats[('ecs', 'ListClusters')]
+        self.assertEqual((stat['calls'], stat['throttles'], stat['retries']), (3, 2, 2))
+        self.assertLess(scheduler.bucket('ecs', 'ListClusters').rate, scheduler.bucket('ecs').rate)
+        self.assertIn('ecs.ListClusters', scheduler.throttle_summary())
+
+    def test_successful_calls_raise_rates_above_the_start(self):
+        scheduler = CallScheduler(sleep=lambda s: None, service_rates={'ecs': 5}, service_ceilings={'ecs': 10})
+        client = session_with_transport([200] * 20, scheduler)
+        for _ in range(20):
+            client.list_clusters()
+        self.assertGreater(scheduler.bucket('ecs').rate, 5)
+        self.assertGreater(scheduler.bucket('ecs', 'ListClusters').rate, 5)
+        self.assertLessEqual(scheduler.bucket('ecs', 'ListClusters').rate, 10)
+
+    def test_gives_up_after_max_attempts(self):
+        scheduler = CallScheduler(sleep=lambda s: None, base_delay=0.0, max_attempts=2)
+        client = session_with_transport([400, 400, 400], scheduler)
+        with self.assertRaises(ClientError) as ctx:
+            client.list_clusters()
+        self.assertTrue(is_throttle_error(ctx.exception))
+        self.assertEqual(scheduler.stats[('ecs', 'ListClusters')]['calls'], 2)
+
+if __name__ == '__main__':
+    unittest.main()